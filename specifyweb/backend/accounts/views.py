@@ -28,6 +28,7 @@ from specifyweb.backend.accounts.permissions_types import InviteLinkPT, SetPassw
 from specifyweb.backend.accounts.types import ExternalUser, InviteToken, OAuthLogin, ProviderConf, ProviderInfo
 from specifyweb.middleware.general import require_GET, require_http_methods
 
+from specifyweb.backend.context.context_cache import context_changed
 from specifyweb.backend.permissions.permissions import check_permission_targets
 from specifyweb.specify import models as spmodels
 from specifyweb.specify.views import login_maybe_required, openapi
@@ -507,6 +508,10 @@ def set_user_agents(request, userid: int):
         spmodels.Agent.objects.filter(
             pk__in=new_agentids).update(specifyuser_id=userid)
 
+        # Bulk updates send no signals, so the cached agents of the user
+        # are dropped explicitly.
+        context_changed()
+
         # check for multiple agents assigned to the user
         # NOTE: This is too aggressive (and inefficient) of a test.
         # By the time we are here, we can just check if the current agents (in new_agentids)
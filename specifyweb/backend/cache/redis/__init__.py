@@ -2,6 +2,7 @@ from .store import (
     set_bytes,
     set_string,
     get_bytes,
+    increment,
     get_string,
     add_to_set,
     delete_key,
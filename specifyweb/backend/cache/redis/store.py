@@ -1,4 +1,4 @@
-from .utils import _set_string, _get_string, _delete_key, _add_to_set, _remove_from_set, _set_elements, _redis_type, format_key
+from .utils import _set_string, _get_string, _increment, _delete_key, _add_to_set, _remove_from_set, _set_elements, _redis_type, format_key
 
 # REFACTOR: Replace these with RedisConnection adapters
 
@@ -18,6 +18,10 @@ def get_bytes(key: str | bytes, delete_key=False) -> bytes:
     return _get_string(format_key(key), delete_key=delete_key, decode_responses=False)
 
 
+def increment(key: str | bytes) -> int:
+    return _increment(format_key(key))
+
+
 def add_to_set(key: str | bytes, *elements: str):
     return _add_to_set(format_key(key), *elements)
 
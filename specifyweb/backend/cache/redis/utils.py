@@ -37,7 +37,7 @@ def _set_string(key: str, value: str, time_to_live=None, override_existing=True,
         "ex": time_to_live,
         "nx": not override_existing
     }
-    host.set(key, value, **flags)
+    return host.set(key, value, **flags)
 
 
 @overload
@@ -55,6 +55,10 @@ def _get_string(key: str, delete_key: bool=False, decode_responses=True) -> str
     
     return host.get(key)
 
+def _increment(key: str) -> int:
+    host = redis_connection(decode_responses=True)
+    return host.incr(key)
+
 def _add_to_set(key: str, *elements: str):
     if len(elements) <= 0:
         return 0
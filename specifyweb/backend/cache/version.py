@@ -0,0 +1,109 @@
+"""
+Version counters for caches shared between processes.
+
+A cache built on a CacheVersion keys its entries by a counter kept in
+Redis. Bumping the counter once the transaction that changed the cached
+records commits makes every process load them again. Until then the
+thread that changed them bypasses the cache, so it sees its own
+uncommitted changes without sharing them.
+
+If the counter can't be bumped, the process that made the change
+bypasses the cache until a retry of the bump succeeds, so it never
+serves records it knows to be stale. Other processes may serve them
+until the retry or until the entries expire.
+
+Example usage:
+```py
+collection_version = CacheVersion("specify:{database}:collection_version", "collection")
+
+def get_collection(id):
+    if collection_version.should_bypass():
+        return load_collection(id)
+    key = f"specify:{{database}}:collection:{collection_version.current()}:{id}"
+    ...
+
+@receiver(signals.post_save, sender=Collection)
+def collection_saved(sender, **kwargs):
+    collection_version.changed()
+```
+"""
+
+import logging
+from contextvars import ContextVar
+from typing import Callable
+
+from django.db import connection, transaction
+from redis.exceptions import RedisError
+
+from specifyweb.backend.cache.redis import get_string, increment
+from specifyweb.backend.cache.thread import ThreadCache
+
+logger = logging.getLogger(__name__)
+
+
+class CacheVersion:
+
+    def __init__(self, redis_key: str, name: str, on_bump: Callable[[], None] | None = None) -> None:
+        """redis_key holds the counter, name describes the cache in log
+        messages and on_bump is called whenever this process bumps the
+        counter, to drop entries held in memory."""
+        self.redis_key = redis_key
+        self.name = name
+        self.on_bump = on_bump
+        # Holds the version while active, so it is read from Redis once
+        # per request rather than once per lookup.
+        self._thread_cache = ThreadCache[str, str](
+            ContextVar(f"{name}_version_cache", default=None)
+        )
+        # Set while a bump of the counter by this process has failed.
+        self._bump_failed = False
+
+    def activate(self):
+        return self._thread_cache.activate()
+
+    def current(self) -> str:
+        """The version cached entries are keyed by. Raises RedisError if
+        Redis can't be reached."""
+        return self._thread_cache.get_or_set(
+            'version', lambda: get_string(self.redis_key) or '0'
+        )
+
+    def has_pending_change(self) -> bool:
+        """Whether the current transaction has changed cached records."""
+        return connection.in_atomic_block and any(
+            hook[1] == self.bump for hook in connection.run_on_commit
+        )
+
+    def should_bypass(self) -> bool:
+        """Whether cached records may be stale for this thread, because
+        the current transaction has changed them or a bump of the
+        counter hasn't succeeded yet."""
+        if self._bump_failed:
+            self.bump()
+        return self._bump_failed or self.has_pending_change()
+
+    def bump(self) -> None:
+        """Makes every process load the cached records again."""
+        if self.on_bump is not None:
+            self.on_bump()
+        self._thread_cache.remove('version')
+        try:
+            increment(self.redis_key)
+        except RedisError as e:
+            if not self._bump_failed:
+                logger.error(
+                    "could not bump the %s cache version, bypassing the cache until it is: %s",
+                    self.name, e,
+                )
+            self._bump_failed = True
+        else:
+            self._bump_failed = False
+
+    def changed(self) -> None:
+        """Bumps the version once the current transaction commits."""
+        if not connection.in_atomic_block:
+            self.bump()
+            return
+
+        if not self.has_pending_change():
+            transaction.on_commit(self.bump)
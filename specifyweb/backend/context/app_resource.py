@@ -7,12 +7,14 @@ database or the filesystem with database resources taking precedence over the fi
 import errno
 import logging
 import os
+from functools import lru_cache
 from xml.etree import ElementTree
-from xml.sax.saxutils import quoteattr
 
 from django.conf import settings
+from django.utils.encoding import force_bytes
 
 from specifyweb.specify.models import Spappresourcedir, Spappresourcedata
+from . import xml_cache
 
 logger = logging.getLogger(__name__)
 
@@ -157,7 +159,7 @@ def load_registry(path, registry_filename='app_resources.xml'):
     """
     pathname = os.path.join(path, registry_filename)
     try:
-        return ElementTree.parse(pathname)
+        return xml_cache.parse_file(pathname)
     except OSError as e:
         if e.errno == errno.ENOENT: return None
         else: raise
@@ -167,11 +169,11 @@ def load_resource(path, registry, resource_name):
     and registry.
     Returns the resource data and mimetype as a pair.
     """
-    resource = registry.find('file[@name=%s]' % quoteattr(resource_name))
+    resource = registry.find_by('file', 'name', resource_name)
     if resource is None: return None
     pathname = os.path.join(path, resource.attrib['file'])
     try:
-        return open(pathname).read(), resource.attrib['mimetype'], None
+        return xml_cache.read_file(pathname), resource.attrib['mimetype'], None
     except OSError as e:
         if e.errno == errno.ENOENT: return None
         else: raise
@@ -249,7 +251,12 @@ def merge_formatters(custom_xml, default_xml):
     and merges them by adding any formatters from the default XML that are not already present in
     the custom XML. It returns the merged XML as a string.
     """
-    
+    # The merge is cached. Resources from the database and the filesystem
+    # are normalized to bytes so both can be used as keys.
+    return _merge_formatters(force_bytes(custom_xml), force_bytes(default_xml))
+
+@lru_cache(maxsize=16)
+def _merge_formatters(custom_xml: bytes, default_xml: bytes) -> str:
     custom_root = ElementTree.fromstring(custom_xml)
     default_root = ElementTree.fromstring(default_xml)
     
@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class ContextConfig(AppConfig):
+    name = "specifyweb.backend.context"
+
+    def ready(self) -> None:
+        # Registers the signal receivers that invalidate the request
+        # context cache.
+        from specifyweb.backend.context import context_cache # noqa: F401
@@ -0,0 +1,98 @@
+"""
+Cache of the records every request is resolved against.
+
+ContextMiddleware attaches the collection (with its discipline, division
+and institution), the user and the user's agent in the collection to each
+request. Loading them costs up to three queries per request, which
+dominates light API calls such as polling notifications or expanding tree
+nodes, so the loaded records are kept in Redis and shared by every web
+worker.
+
+The cached records are keyed by a context version counter kept in Redis.
+Saving or deleting a collection, discipline, division, institution, user
+or agent bumps the counter once the transaction commits, which makes every
+request load them again. Until then the thread that changed them bypasses
+the cache, so it sees its own uncommitted changes without sharing them.
+
+If Redis can't be reached, or REQUEST_CONTEXT_CACHE_TTL is None, the
+records are queried from the database for every request as before.
+"""
+
+import logging
+import pickle
+from typing import Any, Callable, TypeVar
+
+from django.conf import settings
+from django.db.models import signals
+from django.dispatch import receiver
+from redis.exceptions import RedisError
+
+from specifyweb.backend.cache.redis import get_bytes, set_bytes
+from specifyweb.backend.cache.version import CacheVersion
+from specifyweb.specify.models import (
+    Agent,
+    Collection,
+    Discipline,
+    Division,
+    Institution,
+    Specifyuser,
+)
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_VERSION_REDIS_KEY = "specify:{database}:context:version"
+CONTEXT_REDIS_KEY = "specify:{database}:context:{version}:{name}"
+
+T = TypeVar("T")
+
+context_version = CacheVersion(CONTEXT_VERSION_REDIS_KEY, "request context")
+
+
+def cache_context_version():
+    return context_version.activate()
+
+
+def get_or_load(name: str, load: Callable[[], T]) -> T:
+    """The cached record under the name, or the result of load, which is
+    cached if it doesn't raise. The result may be None."""
+    ttl = getattr(settings, 'REQUEST_CONTEXT_CACHE_TTL', None)
+    if not ttl or context_version.should_bypass():
+        return load()
+
+    try:
+        key = CONTEXT_REDIS_KEY.format(database="{database}", version=context_version.current(), name=name)
+        cached = get_bytes(key)
+    except RedisError as e:
+        logger.warning("request context cache unavailable: %s", e)
+        return load()
+
+    if cached is not None:
+        return pickle.loads(cached)
+
+    value = load()
+    try:
+        set_bytes(key, pickle.dumps(value), time_to_live=ttl)
+    except RedisError as e:
+        logger.warning("request context cache unavailable: %s", e)
+    return value
+
+
+def context_changed() -> None:
+    """Bumps the context version once the current transaction commits."""
+    context_version.changed()
+
+
+@receiver(signals.post_save, sender=Collection)
+@receiver(signals.post_delete, sender=Collection)
+@receiver(signals.post_save, sender=Discipline)
+@receiver(signals.post_delete, sender=Discipline)
+@receiver(signals.post_save, sender=Division)
+@receiver(signals.post_delete, sender=Division)
+@receiver(signals.post_save, sender=Institution)
+@receiver(signals.post_delete, sender=Institution)
+@receiver(signals.post_save, sender=Specifyuser)
+@receiver(signals.post_delete, sender=Specifyuser)
+@receiver(signals.post_save, sender=Agent)
+@receiver(signals.post_delete, sender=Agent)
+def context_saved_or_deleted(sender, **kwargs: Any) -> None:
+    context_changed()
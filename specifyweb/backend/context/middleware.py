@@ -9,6 +9,8 @@ from django.utils.functional import SimpleLazyObject
 from specifyweb.specify.api.filter_by_col import filter_by_collection
 from specifyweb.specify.models import Collection, Specifyuser, Agent
 
+from .context_cache import cache_context_version, get_or_load
+
 
 def get_cached(attr, func, request):
     if not hasattr(request, attr):
@@ -19,7 +21,9 @@ def get_user(request):
     if request.user.is_authenticated:
         return request.user
     elif settings.ANONYMOUS_USER:
-        return Specifyuser.objects.get(name=settings.ANONYMOUS_USER)
+        return get_or_load(
+            'user:anonymous',
+            lambda: Specifyuser.objects.get(name=settings.ANONYMOUS_USER))
     else:
         return None
 
@@ -31,17 +35,23 @@ def get_collection(request):
     try:
         collection_id = int(request.COOKIES.get('collection', ''))
     except ValueError:
-        return qs.all()[0]
+        return get_or_load('collection:default', lambda: qs.all()[0])
     else:
-        return qs.get(id=collection_id)
+        return get_or_load(f'collection:{collection_id}', lambda: qs.get(id=collection_id))
 
 def get_agent(request):
-    try:
-        return filter_by_collection(Agent.objects, request.specify_collection) \
-            .select_related('specifyuser') \
-            .get(specifyuser=request.specify_user)
-    except Agent.DoesNotExist:
-        return None
+    def load():
+        try:
+            return filter_by_collection(Agent.objects, request.specify_collection) \
+                .select_related('specifyuser') \
+                .get(specifyuser=request.specify_user)
+        except Agent.DoesNotExist:
+            return None
+
+    user = request.specify_user
+    if not user:
+        return load()
+    return get_or_load(f'agent:{user.id}:{request.specify_collection.id}', load)
 
 def get_readonly(request):
     return (
@@ -58,7 +68,10 @@ class ContextMiddleware:
         request.specify_user_agent = SimpleLazyObject(lambda: get_cached('_cached_agent', get_agent, request))
         request.specify_user       = SimpleLazyObject(lambda: get_cached('_cached_specify_user', get_user, request))
 
-        return self.get_response(request)
+        # The context version is read once for all the records of the
+        # request.
+        with cache_context_version():
+            return self.get_response(request)
 
     def process_template_response(self, request, response):
         collection = getattr(request, 'specify_collection', None)
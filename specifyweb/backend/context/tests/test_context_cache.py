@@ -0,0 +1,124 @@
+import json
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+
+from specifyweb.backend.cache import version
+from specifyweb.specify.models import Agent
+from specifyweb.specify.tests.test_api import ApiTests
+
+from .. import context_cache
+from ..middleware import get_agent, get_collection
+
+
+@override_settings(REQUEST_CONTEXT_CACHE_TTL=300)
+class ContextCacheTests(ApiTests):
+
+    def setUp(self):
+        super().setUp()
+        self._commit()
+        store = {}
+
+        def increment(key):
+            store[key] = str(int(store.get(key, 0)) + 1)
+            return int(store[key])
+
+        for module, name, fake in (
+            (version, 'get_string', lambda key: store.get(key)),
+            (context_cache, 'get_bytes', lambda key: store.get(key)),
+            (context_cache, 'set_bytes', lambda key, value, time_to_live=None: store.__setitem__(key, value)),
+            (version, 'increment', increment),
+        ):
+            patcher = patch.object(module, name, side_effect=fake)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _commit(self) -> None:
+        """Runs the pending invalidation as if the test transaction had
+        committed."""
+        for hook in list(connection.run_on_commit):
+            if hook[1] == context_cache.context_version.bump:
+                connection.run_on_commit.remove(hook)
+                hook[1]()
+
+    def _context(self):
+        request = SimpleNamespace(
+            COOKIES={'collection': str(self.collection.id)},
+            specify_user=self.specifyuser,
+        )
+        with context_cache.cache_context_version():
+            request.specify_collection = get_collection(request)
+            return request.specify_collection, get_agent(request)
+
+    def test_records_are_cached(self) -> None:
+        collection, agent = self._context()
+        self.assertEqual(collection.id, self.collection.id)
+        self.assertEqual(agent.id, self.agent.id)
+
+        with self.assertNumQueries(0):
+            collection, agent = self._context()
+            self.assertEqual(collection.discipline.division.institution.id, self.institution.id)
+            self.assertEqual(agent.id, self.agent.id)
+
+    def test_changes_invalidate_cache(self) -> None:
+        self._context()
+
+        self.agent.lastname = 'Changed'
+        self.agent.save()
+        # Until the change commits, it is only seen by its own transaction.
+        with self.assertNumQueries(2):
+            _, agent = self._context()
+        self.assertEqual(agent.lastname, 'Changed')
+
+        self._commit()
+        with self.assertNumQueries(2):
+            _, agent = self._context()
+        self.assertEqual(agent.lastname, 'Changed')
+        with self.assertNumQueries(0):
+            self._context()
+
+    @patch("specifyweb.backend.accounts.views.check_collection_access_against_agents", lambda userid: None)
+    def test_reassigned_agent_is_resolved(self) -> None:
+        new_agent = Agent.objects.create(
+            agenttype=0,
+            firstname="New",
+            lastname="Agent",
+            division=self.division,
+        )
+        self._commit()
+        self._context()
+        with self.assertNumQueries(0):
+            _, agent = self._context()
+        self.assertEqual(agent.id, self.agent.id)
+
+        # Reassigns the agents with bulk updates, which send no signals.
+        client = Client()
+        client.force_login(self.specifyuser)
+        response = client.post(
+            f"/accounts/set_agents/{self.specifyuser.id}/",
+            json.dumps([new_agent.id]),
+            content_type='application/x-www-form-urlencoded',
+        )
+        self.assertEqual(response.status_code, 204)
+
+        self._commit()
+        _, agent = self._context()
+        self.assertEqual(agent.id, new_agent.id)
+
+    def test_login_does_not_invalidate_cache(self) -> None:
+        self._context()
+        # Recording the last login is skipped by Specifyuser.save, so
+        # logging in doesn't make every request load the records again.
+        self.specifyuser.save(update_fields=['last_login'])
+        self.assertFalse(context_cache.context_version.has_pending_change())
+        with self.assertNumQueries(0):
+            self._context()
+
+    @override_settings(REQUEST_CONTEXT_CACHE_TTL=None)
+    def test_disabled_cache(self) -> None:
+        self._context()
+        with self.assertNumQueries(2):
+            self._context()
@@ -0,0 +1,96 @@
+import hashlib
+import os
+import tempfile
+
+from django.test import SimpleTestCase, TestCase
+
+from specifyweb.backend.context import xml_cache
+from specifyweb.specify.models import Spappresourcedata
+
+
+VIEWSET = """<viewset name="Test">
+  <views>
+    <view name="One" class="edu.ku.brc.specify.datamodel.Agent"/>
+    <view name="Two" class="edu.ku.brc.specify.datamodel.Agent"/>
+  </views>
+</viewset>"""
+
+
+class XmlCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        xml_cache.clear()
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "test.views.xml")
+        with open(self.path, "w") as f:
+            f.write(VIEWSET)
+
+    def tearDown(self):
+        self.dir.cleanup()
+        xml_cache.clear()
+
+    def test_index_lookups(self):
+        viewset = xml_cache.parse_file(self.path)
+        self.assertEqual(
+            [view.get("name") for view in viewset.find_all_by("views/view", "class", "edu.ku.brc.specify.datamodel.Agent")],
+            ["One", "Two"],
+        )
+        self.assertEqual(viewset.find_by("views/view", "name", "Two").get("name"), "Two")
+        self.assertIsNone(viewset.find_by("views/view", "name", "Three"))
+
+    def test_file_is_parsed_once(self):
+        self.assertIs(xml_cache.parse_file(self.path), xml_cache.parse_file(self.path))
+
+    def test_changed_file_is_parsed_again(self):
+        before = xml_cache.parse_file(self.path)
+        with open(self.path, "w") as f:
+            f.write(VIEWSET.replace('name="Two"', 'name="Three"'))
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        after = xml_cache.parse_file(self.path)
+        self.assertIsNot(before, after)
+        self.assertIsNotNone(after.find_by("views/view", "name", "Three"))
+
+    def test_missing_file(self):
+        with self.assertRaises(OSError):
+            xml_cache.parse_file(os.path.join(self.dir.name, "missing.xml"))
+
+    def test_resource_data_is_parsed_again_when_its_data_changes(self):
+        class ResourceData:
+            id = 1
+            data = VIEWSET.encode()
+            data_md5 = hashlib.md5(data).hexdigest()
+
+        resource_data = ResourceData()
+        before = xml_cache.parse_resource_data(resource_data)
+        self.assertIs(before, xml_cache.parse_resource_data(resource_data))
+
+        resource_data.data = VIEWSET.replace('name="Two"', 'name="Three"').encode()
+        resource_data.data_md5 = hashlib.md5(resource_data.data).hexdigest()
+        after = xml_cache.parse_resource_data(resource_data)
+        self.assertIsNot(before, after)
+        self.assertIsNotNone(after.find_by("views/view", "name", "Three"))
+
+
+class ResourceDataDigestTests(TestCase):
+
+    def setUp(self):
+        xml_cache.clear()
+        self.addCleanup(xml_cache.clear)
+
+    def _parse(self, resource_data):
+        [fetched] = xml_cache.with_data_digest(Spappresourcedata.objects.filter(id=resource_data.id))
+        return xml_cache.parse_resource_data(fetched)
+
+    def test_save_without_version_change_is_seen(self):
+        resource_data = Spappresourcedata.objects.create(data=VIEWSET.encode())
+        before = self._parse(resource_data)
+        self.assertIs(before, self._parse(resource_data))
+
+        # Saved without bumping the version, within the same second.
+        Spappresourcedata.objects.filter(id=resource_data.id).update(
+            data=VIEWSET.replace('name="Two"', 'name="Three"').encode())
+        after = self._parse(resource_data)
+        self.assertIsNot(before, after)
+        self.assertIsNotNone(after.find_by("views/view", "name", "Three"))
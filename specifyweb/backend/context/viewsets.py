@@ -6,14 +6,13 @@ import itertools
 import logging
 import os
 from xml.etree import ElementTree
-from xml.sax.saxutils import quoteattr
 
 from django.conf import settings
 from django.http import Http404
-from django.utils.encoding import force_bytes
 
 from specifyweb.specify.models import Spappresourcedata
 from . import app_resource as AR
+from . import xml_cache
 
 logger = logging.getLogger(__name__)
 
@@ -28,9 +27,9 @@ def get_views(collection, user, viewname, limit=None, table=None):
     logger.debug("get_view %s %s %s", collection, user, viewname)
 
     if viewname is not None:
-        xpath = 'views/view[@name=%s]' % quoteattr(viewname)
+        attr, value = 'name', viewname
     elif table is not None:
-        xpath = 'views/view[@class=%s]' % quoteattr(f'edu.ku.brc.specify.datamodel.{table}')
+        attr, value = 'class', f'edu.ku.brc.specify.datamodel.{table}'
     else:
         raise ValueError("Must specify viewname or table")
 
@@ -43,7 +42,7 @@ def get_views(collection, user, viewname, limit=None, table=None):
                # then in the viewset files in a given directory level
                for id, viewset in get_viewsets(collection, user, level)
                # finally in the list of views in the file
-               for view in viewset.findall(xpath))
+               for view in viewset.find_all_by('views/view', attr, value))
 
     limited_matches = matches if limit is None or limit==0 else itertools.islice(matches, limit)
     return [process_view(view) for view in limited_matches]
@@ -56,8 +55,8 @@ def process_view(match):
     # make a set of the viewdefs the view points to
     viewdefs = {viewdef
                    for altview in altviews
-                   for viewdef in viewset.findall(
-        'viewdefs/viewdef[@name=%s]' % quoteattr(altview.attrib['viewdef']))}
+                   for viewdef in viewset.find_all_by(
+        'viewdefs/viewdef', 'name', altview.attrib['viewdef'])}
 
     # some viewdefs reference other viewdefs through the 'definition' attribute
     # we will need to make sure those viewdefs are also sent to the client
@@ -65,7 +64,7 @@ def process_view(match):
         definition = viewdef.find('definition')
         if definition is None: return
         definition_viewdef = \
-            viewset.find('viewdefs/viewdef[@name=%s]' % quoteattr(definition.text))
+            viewset.find_by('viewdefs/viewdef', 'name', definition.text)
         if definition_viewdef is None:
             raise Http404("no viewdef: {} for definition of viewdef: {}".format(
                 definition.text, viewdef.attrib['name']))
@@ -88,7 +87,7 @@ def process_view(match):
 
     # these properties are useful to see where the view was found for debugging
     data['view'] = ElementTree.tostring(view, encoding="unicode")
-    data['viewsetName'] = viewset.attrib['name']
+    data['viewsetName'] = viewset.root.attrib['name']
     data['viewsetLevel'] = level
     data['viewsetSource'] = source
     if type(id) is int:
@@ -108,14 +107,13 @@ def get_viewsets_from_db(collection, user, level):
 
     # Pull out all the SpAppResourceDatas that have an associated SpViewsetObj in
     # the SpAppResourceDirs we just found.
-    objs = Spappresourcedata.objects.filter(spviewsetobj__spappresourcedir__in=dirs)
+    # The data is only loaded for view sets that aren't cached already.
+    objs = xml_cache.with_data_digest(
+        Spappresourcedata.objects.filter(spviewsetobj__spappresourcedir__in=dirs))
     def viewsets():
         for o in objs:
             try:
-                # Like default parser, but preserves comments
-                parser = ElementTree.XMLParser(
-                    target=ElementTree.TreeBuilder(insert_comments=True))
-                yield o.spviewsetobj.id, ElementTree.fromstring(force_bytes(o.data), parser=parser)
+                yield o.spviewsetobj_id, xml_cache.parse_resource_data(o, preserve_comments=True)
             except Exception as e:
                 logger.error("Bad XML in view set: %s\n%s  id = %s", e, o, o.id)
 
@@ -133,7 +131,7 @@ def load_viewsets(collection, user, level):
 
     # Load them all.
     def viewsets():
-        for f in registry.findall('file'):
+        for f in registry.root.findall('file'):
             try:
                 file_name = f.attrib['file']
                 relative_path = os.path.join(os.path.relpath(path, settings.SPECIFY_CONFIG_DIR),file_name)
@@ -144,13 +142,10 @@ def load_viewsets(collection, user, level):
     return viewsets()
 
 def get_viewset_from_file(path, filename):
-    """Just load the XML for a viewset from path and pull out the root."""
+    """Just load the XML for a viewset from path."""
     file_path = os.path.join(path, filename)
     try:
-        # Like default parser, but preserves comments
-        parser = ElementTree.XMLParser(
-            target=ElementTree.TreeBuilder(insert_comments=True))
-        return ElementTree.parse(file_path, parser).getroot()
+        return xml_cache.parse_file(file_path, preserve_comments=True)
     except Exception as e:
         logger.error("Couldn't load viewset from %s\n$s", file_path, e)
         raise
@@ -0,0 +1,150 @@
+"""
+Process wide cache of the parsed XML of app resources and view sets.
+
+Parsing the registries, view sets and formatters for every request is much
+slower than looking them up, so parsed documents are kept for the life of
+the process along with indexes of their elements by attribute value.
+Files are parsed again when their modification time or size changes and
+database resources when the digest of their data does.
+
+The cached documents are shared between requests and must not be modified.
+"""
+
+import logging
+import os
+import threading
+from collections.abc import Callable
+from functools import lru_cache
+from typing import Any, TypeVar
+from xml.etree import ElementTree
+from xml.etree.ElementTree import Element
+
+from django.db.models import CharField
+from django.db.models.functions import MD5
+from django.utils.encoding import force_bytes
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Each cache is emptied when it holds more entries than this.
+MAX_CACHE_ENTRIES = 1000
+
+
+class IndexedXml:
+    """A parsed XML document with lookups of elements by attribute value,
+    e.g. ``find_all_by('views/view', 'name', 'CollectionObject')`` in place
+    of ``findall('views/view[@name="CollectionObject"]')``.
+    """
+
+    def __init__(self, root: Element):
+        self.root = root
+        self._indexes: dict[tuple[str, str], dict[str, list[Element]]] = {}
+
+    def find_all_by(self, path: str, attr: str, value: str) -> list[Element]:
+        index = self._indexes.get((path, attr))
+        if index is None:
+            index = {}
+            for element in self.root.iterfind(path):
+                key = element.get(attr)
+                if key is not None:
+                    index.setdefault(key, []).append(element)
+            self._indexes[(path, attr)] = index
+        return index.get(value, [])
+
+    def find_by(self, path: str, attr: str, value: str) -> Element | None:
+        elements = self.find_all_by(path, attr, value)
+        return elements[0] if elements else None
+
+
+def _parser(preserve_comments: bool) -> ElementTree.XMLParser:
+    # Like the default parser, but can preserve comments.
+    return ElementTree.XMLParser(
+        target=ElementTree.TreeBuilder(insert_comments=preserve_comments))
+
+
+class _SignedCache:
+    """Values cached by key, valid as long as the signature they were
+    computed for is current."""
+
+    def __init__(self):
+        self._entries: dict[Any, tuple[Any, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, signature, compute: Callable[[], T]) -> T:
+        cached = self._entries.get(key)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        value = compute()
+        with self._lock:
+            if len(self._entries) >= MAX_CACHE_ENTRIES:
+                self._entries.clear()
+            self._entries[key] = (signature, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_files = _SignedCache()
+_resources = _SignedCache()
+
+
+def _file_signature(pathname: str) -> tuple[int, int]:
+    stat = os.stat(pathname)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def parse_file(pathname: str, preserve_comments: bool = False) -> IndexedXml:
+    """The parsed XML file. Raises OSError if it can't be read."""
+    def parse():
+        return IndexedXml(ElementTree.parse(pathname, _parser(preserve_comments)).getroot())
+    return _files.get(('xml', pathname, preserve_comments), _file_signature(pathname), parse)
+
+
+def read_file(pathname: str) -> str:
+    """The text of the file. Raises OSError if it can't be read."""
+    def read():
+        with open(pathname) as f:
+            return f.read()
+    return _files.get(('text', pathname), _file_signature(pathname), read)
+
+
+def with_data_digest(queryset):
+    """Defers the data of the Spappresourcedata queryset and annotates it
+    with the digest parse_resource_data compares instead."""
+    return queryset.defer('data').annotate(data_md5=MD5('data', output_field=CharField()))
+
+
+def parse_resource_data(resource_data, preserve_comments: bool = False) -> IndexedXml:
+    """The parsed XML of the Spappresourcedata from a with_data_digest
+    queryset. Its data field is only read when it has changed.
+
+    The digest is computed by the database, so the cache sees every save,
+    even ones that don't change the version or the modification time."""
+    def parse():
+        return IndexedXml(ElementTree.fromstring(
+            force_bytes(resource_data.data), parser=_parser(preserve_comments)))
+    return _resources.get(
+        (resource_data.id, preserve_comments),
+        resource_data.data_md5,
+        parse,
+    )
+
+
+@lru_cache(maxsize=32)
+def _parse_bytes(data: bytes) -> IndexedXml:
+    return IndexedXml(ElementTree.fromstring(data))
+
+
+def parse_string(data: str | bytes) -> IndexedXml:
+    """The parsed XML string, for documents whose source isn't tracked,
+    such as resources merged from several levels."""
+    return _parse_bytes(force_bytes(data))
+
+
+def clear() -> None:
+    _files.clear()
+    _resources.clear()
+    _parse_bytes.cache_clear()
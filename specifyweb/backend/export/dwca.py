@@ -1,20 +1,27 @@
+import io
 import os
 import errno
 import logging
 import re
 import shutil
-from tempfile import mkdtemp
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
 from collections import namedtuple
 from uuid import uuid4
 from datetime import date
+from django.conf import settings
+from django.db import connection
 from django.utils.translation import gettext as _
+from sqlalchemy import sql
 
 from xml.etree import ElementTree as ET
 from xml.dom import minidom
 
-from specifyweb.backend.stored_queries.execution import query_to_csv
+from specifyweb.backend.stored_queries.execution import BuildQueryProps, build_query, query_to_csv_file
 from specifyweb.backend.stored_queries.queryfield import QueryField, EphemeralField
 from specifyweb.backend.stored_queries.models import session_context
+from specifyweb.backend.inheritance.api import DefaultQueryProcessors, do_nothing
 
 logger = logging.getLogger(__name__)
 ET.register_namespace('eml', 'eml://ecoinformatics.org/eml-2.1.1')
@@ -180,56 +187,170 @@ class ConstantField(namedtuple('ConstantField', 'value term')):
 
 
 def make_dwca(collection, user, definition, output_file, eml=None):
-    output_dir = mkdtemp()
-    try:
-        element_tree = ET.fromstring(definition)
-
-        core_stanza = Stanza.from_xml(element_tree.find('core'))
-        extension_stanzas = [Stanza.from_xml(node) for node in element_tree.findall('extension')]
-
-        output_node = ET.Element('archive')
-        output_node.set('xmlns', "http://rs.tdwg.org/dwc/text/")
-        output_node.set('xmlns:xsi', "http://www.w3.org/2001/XMLSchema-instance")
-        output_node.set('xmlns:xs', "http://www.w3.org/2001/XMLSchema")
-        output_node.set('xsi:schemaLocation', "http://rs.tdwg.org/dwc/text/ http://rs.tdwg.org/dwc/text/tdwg_dwc_text.xsd")
-
-        if eml is not None:
-            output_node.set('metadata', 'eml.xml')
-            write_eml(eml, os.path.join(output_dir, 'eml.xml'))
-
-        output_node.append(core_stanza.to_xml())
-        for stanza in extension_stanzas:
-            output_node.append(stanza.to_xml())
-
-        with open(os.path.join(output_dir, 'meta.xml'), 'w') as meta_xml:
-            meta_xml.write(prettify(output_node))
-
+    element_tree = ET.fromstring(definition)
+
+    core_stanza = Stanza.from_xml(element_tree.find('core'))
+    extension_stanzas = [Stanza.from_xml(node) for node in element_tree.findall('extension')]
+
+    output_node = ET.Element('archive')
+    output_node.set('xmlns', "http://rs.tdwg.org/dwc/text/")
+    output_node.set('xmlns:xsi', "http://www.w3.org/2001/XMLSchema-instance")
+    output_node.set('xmlns:xs', "http://www.w3.org/2001/XMLSchema")
+    output_node.set('xsi:schemaLocation', "http://rs.tdwg.org/dwc/text/ http://rs.tdwg.org/dwc/text/tdwg_dwc_text.xsd")
+
+    if eml is not None:
+        output_node.set('metadata', 'eml.xml')
+
+    output_node.append(core_stanza.to_xml())
+    for stanza in extension_stanzas:
+        output_node.append(stanza.to_xml())
+
+    # Extension rows are kept if their core id is one of the core's ids.
+    # That is checked in SQL, so the extension queries don't have to wait
+    # for the core ids and can run alongside the core queries.
+    queries = [query for stanza in [core_stanza, *extension_stanzas] for query in stanza.queries]
+    if any(post_processes_rows(collection, user, query) for query in queries):
+        # The ids written for some rows aren't the ones the query selects,
+        # so they are matched after processing as the rows are written.
         core_ids = set()
         def collect_ids(row):
             core_ids.add(row[core_stanza.id_field_idx + 1])
             return True
 
-        with session_context() as session:
-            for query in core_stanza.queries:
-                path = os.path.join(output_dir, query.file_name)
-                query_to_csv(session, collection, user, query.tableid, query.get_field_specs(), path,
-                             strip_id=True, row_filter=collect_ids)
-
-            for stanza in extension_stanzas:
-                def filter_ids(row):
-                    return row[stanza.id_field_idx + 1] in core_ids
-
-                for query in stanza.queries:
-                    path = os.path.join(output_dir, query.file_name)
-                    query_to_csv(session, collection, user, query.tableid, query.get_field_specs(), path,
-                                 strip_id=True, row_filter=filter_ids)
-
-        basename = re.sub(r'\.zip$', '', output_file)
-        shutil.make_archive(basename, 'zip', output_dir, logger=logger)
+        def filter_ids(id_field_idx):
+            return lambda row: row[id_field_idx + 1] in core_ids
+
+        exports = [(query, None, collect_ids) for query in core_stanza.queries] + [
+            (query, None, filter_ids(stanza.id_field_idx))
+            for stanza in extension_stanzas
+            for query in stanza.queries
+        ]
+        sequential = True
+    else:
+        exports = [(query, None, None) for query in core_stanza.queries] + [
+            (query, core_id_filter(collection, user, core_stanza, stanza.id_field_idx), None)
+            for stanza in extension_stanzas
+            for query in stanza.queries
+        ]
+        sequential = False
+
+    archive_path = re.sub(r'\.zip$', '', output_file) + '.zip'
+    try:
+        with zipfile.ZipFile(archive_path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            if eml is not None:
+                with archive.open('eml.xml', 'w') as eml_xml:
+                    write_eml(eml, eml_xml)
+
+            archive.writestr('meta.xml', prettify(output_node))
+
+            write_exports(collection, user, archive, exports, sequential)
+    except:
+        if os.path.exists(archive_path):
+            os.remove(archive_path)
+        raise
+
+def core_id_filter(collection, user, core_stanza, id_field_idx):
+    """Returns a function that makes, for a session, the query_filter
+    restricting an extension query to the rows whose id column, at
+    id_field_idx, is one of the ids of the core.
+    """
+    def make_filter(session):
+        core_ids = []
+        for query in core_stanza.queries:
+            core_query, _ = build_query(
+                session, collection, user, query.tableid, query.get_field_specs(),
+                BuildQueryProps(replace_nulls=True),
+            )
+            core_ids.append(
+                core_query.with_entities(query_column(core_query, core_stanza.id_field_idx)).statement
+            )
+
+        def query_filter(query):
+            id_column = query_column(query, id_field_idx)
+            return query.filter(sql.or_(*(id_column.in_(ids) for ids in core_ids)))
+
+        return query_filter
+
+    return make_filter
+
+def post_processes_rows(collection, user, query) -> bool:
+    """Whether the rows of the query are changed after they are fetched,
+    e.g. to inherit catalog numbers, so the values written can't be
+    matched in SQL."""
+    processors = DefaultQueryProcessors(query.tableid, query.get_field_specs(), collection, user)
+    return any(processor is not do_nothing for processor in processors)
+
+def query_column(query, field_idx):
+    # The first column of the query results is the id of the base table.
+    return query.column_descriptions[field_idx + 1]['expr']
+
+def write_exports(collection, user, archive, exports, sequential=False):
+    """Writes the CSV file of each query into the archive.
+
+    With DWCA_EXPORT_WORKERS above one, the first query is streamed
+    straight into the archive while the others run alongside it, each on
+    its own database session. Only one file of a zip can be written at a
+    time, so those are buffered in anonymous spooled files, which stay in
+    memory up to DWCA_EXPORT_SPOOL_SIZE bytes, and copied into the archive
+    as the previous file is done. With sequential, e.g. when the row
+    filters of later queries depend on the rows of earlier ones, the
+    queries are run one at a time.
+    """
+    workers = settings.DWCA_EXPORT_WORKERS
+    if sequential or workers is None or workers <= 1:
+        for query, make_filter, row_filter in exports:
+            with io.TextIOWrapper(archive.open(query.file_name, 'w'), encoding='utf-8', newline='') as csv_file:
+                export_query(collection, user, query, make_filter, row_filter, csv_file)
+        return
+
+    (first_query, first_filter, first_row_filter), rest = exports[0], exports[1:]
+    with ThreadPoolExecutor(max_workers=workers - 1) as executor:
+        spooled = [
+            (query, executor.submit(spool_query, collection, user, query, make_filter, row_filter))
+            for query, make_filter, row_filter in rest
+        ]
+        try:
+            with io.TextIOWrapper(archive.open(first_query.file_name, 'w'), encoding='utf-8', newline='') as csv_file:
+                export_query(collection, user, first_query, first_filter, first_row_filter, csv_file)
+
+            for query, future in spooled:
+                with future.result() as spool, archive.open(query.file_name, 'w') as entry:
+                    shutil.copyfileobj(spool, entry)
+        except:
+            executor.shutdown(wait=True, cancel_futures=True)
+            for _, future in spooled:
+                if future.done() and future.exception() is None:
+                    future.result().close()
+            raise
+
+def spool_query(collection, user, query, make_filter, row_filter):
+    spool = SpooledTemporaryFile(max_size=settings.DWCA_EXPORT_SPOOL_SIZE)
+    try:
+        csv_file = io.TextIOWrapper(spool, encoding='utf-8', newline='')
+        export_query(collection, user, query, make_filter, row_filter, csv_file)
+        csv_file.flush()
+        csv_file.detach()
+    except:
+        spool.close()
+        raise
     finally:
-        shutil.rmtree(output_dir)
+        # Django opens a connection per thread, which has to be closed
+        # by the thread.
+        connection.close()
+    spool.seek(0)
+    return spool
+
+def export_query(collection, user, query, make_filter, row_filter, csv_file):
+    with session_context() as session:
+        query_to_csv_file(
+            session, collection, user, query.tableid, query.get_field_specs(), csv_file,
+            strip_id=True,
+            row_filter=row_filter,
+            query_filter=None if make_filter is None else make_filter(session),
+        )
 
 def write_eml(source, output_path, pub_date=None, package_id=None):
+    "Writes the EML to output_path, which can be a path or a binary file."
     if pub_date is None:
         pub_date = date.today()
 
@@ -5,7 +5,23 @@ when you run "manage.py test".
 Replace this with more appropriate tests for your application.
 """
 
+import csv
+import io
+import os
+import tempfile
+import zipfile
+from unittest.mock import patch
+
+from django.conf import settings
 from django.test import TestCase
+from django.test.utils import override_settings
+
+from specifyweb.backend.stored_queries.tests.tests import SQLAlchemySetup, setup_sqlalchemy
+from specifyweb.specify.models import Determination
+from specifyweb.specify.tests.test_api import ApiTransactionTests
+
+from . import dwca
+from .dwca import make_dwca
 
 
 class SimpleTest(TestCase):
@@ -14,3 +30,104 @@ class SimpleTest(TestCase):
         Tests that 1 + 1 always equals 2.
         """
         self.assertEqual(1 + 1, 2)
+
+
+def definition_field(tag, string_id, term=None, oper=8, value='', is_rel='false'):
+    term_attr = f' term="{term}"' if term is not None else ''
+    return (
+        f'<{tag} stringId="{string_id}" isRelFld="{is_rel}" oper="{oper}" '
+        f'value="{value}" isNot="false"{term_attr}/>'
+    )
+
+# Collection objects with 'core' in text1 are the core records. The
+# extension lists the determinations of every collection object, keyed by
+# the catalog number of their collection object.
+DEFINITION = f"""
+<archive>
+  <core rowType="http://rs.tdwg.org/dwc/terms/Occurrence">
+    <queries>
+      <query contextTableId="1" name="occurrence.csv">
+        {definition_field('id', '1.collectionobject.catalogNumber')}
+        {definition_field('field', '1.collectionobject.catalogNumber', term='http://rs.tdwg.org/dwc/terms/catalogNumber')}
+        {definition_field('field', '1.collectionobject.text1', oper=1, value='core')}
+      </query>
+    </queries>
+  </core>
+  <extension rowType="http://rs.gbif.org/terms/1.0/Identification">
+    <queries>
+      <query contextTableId="9" name="identification.csv">
+        {definition_field('id', '9,1.collectionobject.catalogNumber')}
+        {definition_field('field', '9.determination.remarks', term='http://rs.tdwg.org/dwc/terms/identificationRemarks')}
+      </query>
+    </queries>
+  </extension>
+</archive>
+"""
+
+
+class DwCAExportMixin:
+
+    def setUp(self):
+        super().setUp()
+        for co in self.collectionobjects[:2]:
+            co.text1 = 'core'
+            co.save()
+        for co in self.collectionobjects[:3]:
+            Determination.objects.create(collectionobject=co, iscurrent=True, remarks=f'det {co.catalognumber}')
+
+    def _export(self):
+        with tempfile.TemporaryDirectory() as directory, \
+                patch('specifyweb.backend.export.dwca.session_context',
+                      side_effect=lambda: self.__class__.test_session_context()):
+            path = os.path.join(directory, 'archive.zip')
+            make_dwca(self.collection, self.specifyuser, DEFINITION, path)
+            with zipfile.ZipFile(path) as archive:
+                return {
+                    name: list(csv.reader(io.TextIOWrapper(archive.open(name), encoding='utf-8')))
+                    for name in ('occurrence.csv', 'identification.csv')
+                }
+
+    def _assert_extension_matches_core(self, files) -> None:
+        core_ids = [row[0] for row in files['occurrence.csv']]
+        self.assertCountEqual(core_ids, [co.catalognumber for co in self.collectionobjects[:2]])
+        self.assertCountEqual(
+            files['identification.csv'],
+            [[id, f'det {id}'] for id in core_ids],
+        )
+
+
+@override_settings(DWCA_EXPORT_WORKERS=1)
+class DwCAExtensionTests(DwCAExportMixin, SQLAlchemySetup):
+
+    def test_extension_rows_match_core_ids(self) -> None:
+        self._assert_extension_matches_core(self._export())
+
+    def test_post_processed_ids_are_matched_as_written(self) -> None:
+        with patch('specifyweb.backend.export.dwca.post_processes_rows', return_value=True), \
+                patch('specifyweb.backend.export.dwca.core_id_filter') as core_id_filter:
+            files = self._export()
+
+        core_id_filter.assert_not_called()
+        self._assert_extension_matches_core(files)
+
+
+class DwCAParallelExportTests(DwCAExportMixin, ApiTransactionTests):
+    """The extension queries run on threads with their own database
+    connections, which only see committed records."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.engine, cls.test_session_context = setup_sqlalchemy(settings.SA_TEST_DB_URL)
+
+    def test_parallel_export_matches_serial(self) -> None:
+        with override_settings(DWCA_EXPORT_WORKERS=1):
+            serial = self._export()
+
+        with override_settings(DWCA_EXPORT_WORKERS=2), \
+                patch('specifyweb.backend.export.dwca.spool_query', wraps=dwca.spool_query) as spool_query:
+            parallel = self._export()
+
+        spool_query.assert_called_once()
+        self.assertEqual(serial, parallel)
+        self._assert_extension_matches_core(parallel)
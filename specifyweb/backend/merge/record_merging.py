@@ -19,6 +19,7 @@ from specifyweb.celery_tasks import LogErrorsTask, app
 from specifyweb.specify import models as spmodels
 from specifyweb.specify.models_utils.build_models import orderings
 from specifyweb.specify.api.crud import delete_obj, put_resource
+from specifyweb.backend.workbench.upload.auditlog import buffered_audit_log
 from specifyweb.specify.models_utils.load_datamodel import Table, FieldDoesNotExistError
 from celery.utils.log import get_task_logger # type: ignore
 from specifyweb.specify.models_utils.relationships import is_dependent_field
@@ -166,6 +167,7 @@ def fix_record_data(new_record_data, current_model: Table, target_model_name: st
 RESTRICT_UPDATE_FIELDS = {'spappresourcedata'}
 
 @transaction.atomic
+@buffered_audit_log()
 def record_merge_fx(model_name: str, old_model_ids: list[int], new_model_id: int,
                     progress: Progress | None=None,
                     new_record_info: dict[str, Any]=None):
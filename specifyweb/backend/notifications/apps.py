@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class NotificationsConfig(AppConfig):
+    name = "specifyweb.backend.notifications"
+
+    def ready(self) -> None:
+        # Registers the signal receiver that publishes new messages.
+        from specifyweb.backend.notifications import push # noqa: F401
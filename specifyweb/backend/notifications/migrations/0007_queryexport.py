@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('specify', '__first__'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('notifications', '0006_localityupdate_localityupdaterowresult'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueryExport',
+            fields=[
+                ('taskid', models.CharField(max_length=256)),
+                ('status', models.CharField(max_length=256)),
+                ('timestampcreated', models.DateTimeField(default=django.utils.timezone.now)),
+                ('timestampmodified', models.DateTimeField(auto_now=True)),
+                ('id', models.AutoField(db_column='QueryExportID', primary_key=True, serialize=False, verbose_name='queryexportid')),
+                ('exporttype', models.CharField(max_length=32)),
+                ('filename', models.CharField(max_length=256)),
+                ('query', models.JSONField()),
+                ('host', models.TextField(null=True)),
+                ('collection', models.ForeignKey(db_column='CollectionID', on_delete=django.db.models.deletion.CASCADE, to='specify.collection')),
+                ('createdbyagent', models.ForeignKey(db_column='CreatedByAgentID', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='specify.agent')),
+                ('modifiedbyagent', models.ForeignKey(db_column='ModifiedByAgentID', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='specify.agent')),
+                ('specifyuser', models.ForeignKey(db_column='SpecifyUserID', on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'queryexport',
+            },
+        ),
+    ]
@@ -74,3 +74,15 @@ class LocalityUpdateRowResult(models.Model):
 
     class Meta:
         db_table = 'localityupdaterowresult'
+
+
+class QueryExport(AsyncTask):
+    id = models.AutoField('queryexportid',
+                          primary_key=True, db_column='QueryExportID')
+    exporttype = models.CharField(max_length=32)
+    filename = models.CharField(max_length=256)
+    query = models.JSONField()
+    host = models.TextField(null=True)
+
+    class Meta:
+        db_table = 'queryexport'
@@ -0,0 +1,161 @@
+"""
+Push delivery of notification messages.
+
+Once a transaction that creates messages commits, the time of the commit
+is recorded in Redis as the latest message time of each recipient, and
+published on the recipient's channel. This lets polls for new messages
+answer without querying the database when the user has none, and lets
+long polls wait on the channel until a message arrives, so export,
+upload and merge completion notifications are delivered as soon as they
+are created.
+
+The recorded time is only trusted for LATEST_MESSAGE_GRACE_SECONDS, after
+which the messages are queried from the database again and the time of
+the query is recorded instead. So a message whose time couldn't be
+recorded is still delivered within that time.
+
+If Redis can't be reached, messages are queried from the database as
+before.
+"""
+
+import logging
+import threading
+import time
+
+from django.db import connection, transaction
+from django.db.models import signals
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from redis.exceptions import RedisError
+
+from specifyweb.backend.cache.redis.connect import RedisConnection
+from specifyweb.backend.cache.redis.utils import format_key
+
+from .models import Message
+
+logger = logging.getLogger(__name__)
+
+# Sorted set scoring each user id by the time of their latest message.
+LATEST_MESSAGE_REDIS_KEY = "specify:{database}:notifications:latest"
+MESSAGES_CHANNEL = "specify:{database}:notifications:messages:{user_id}"
+
+# Number of seconds a recorded time is trusted for.
+LATEST_MESSAGE_GRACE_SECONDS = 60
+
+
+def _latest_message_time(redis: RedisConnection, user_id: int) -> float | None:
+    return redis.connection.zscore(format_key(LATEST_MESSAGE_REDIS_KEY), str(user_id))
+
+
+def _parse_since(since: str) -> float | None:
+    try:
+        parsed = parse_datetime(since)
+    except ValueError:
+        return None
+    return None if parsed is None else parsed.timestamp()
+
+
+def may_have_messages_since(user_id: int, since: str, redis: RedisConnection | None = None) -> bool:
+    """Whether the user may have messages created after since. False only
+    if Redis knows that they don't."""
+    since_time = _parse_since(since)
+    if since_time is None:
+        return True
+    try:
+        latest = _latest_message_time(redis or RedisConnection(decode_responses=True), user_id)
+    except (RedisError, ValueError) as e:
+        logger.warning("notification push unavailable: %s", e)
+        return True
+    # Users that haven't been sent or checked for messages since Redis was
+    # (re)started aren't recorded, so they may have older ones.
+    if latest is None or timezone.now().timestamp() - latest > LATEST_MESSAGE_GRACE_SECONDS:
+        return True
+    return latest > since_time
+
+
+def messages_checked(user_id: int, checked_at: float) -> None:
+    """Records that the user had no messages other than those queried
+    from the database at checked_at."""
+    try:
+        RedisConnection(decode_responses=True).connection.zadd(
+            format_key(LATEST_MESSAGE_REDIS_KEY), {str(user_id): checked_at}, gt=True
+        )
+    except (RedisError, ValueError) as e:
+        logger.warning("notification push unavailable: %s", e)
+
+
+def wait_for_messages(user_id: int, since: str, timeout: float) -> None:
+    """Blocks for up to timeout seconds until the user may have messages
+    created after since."""
+    try:
+        redis = RedisConnection(decode_responses=True)
+        pubsub = redis.connection.pubsub(ignore_subscribe_messages=True)
+        # Subscribes before checking, so a message created in between is
+        # not missed.
+        pubsub.subscribe(format_key(MESSAGES_CHANNEL.format(database="{database}", user_id=user_id)))
+    except (RedisError, ValueError) as e:
+        logger.warning("notification push unavailable: %s", e)
+        return
+
+    try:
+        if may_have_messages_since(user_id, since, redis):
+            return
+        deadline = time.monotonic() + timeout
+        while (remaining := deadline - time.monotonic()) > 0:
+            if pubsub.get_message(timeout=remaining) is not None:
+                return
+    except RedisError as e:
+        logger.warning("notification push unavailable: %s", e)
+    finally:
+        pubsub.close()
+
+
+def messages_created(user_ids: set[int]) -> None:
+    """Records and publishes that the users have new messages."""
+    if not user_ids:
+        return
+    score = timezone.now().timestamp()
+    try:
+        redis = RedisConnection(decode_responses=True).connection
+    except ValueError as e:
+        logger.warning("could not publish notification messages: %s", e)
+        return
+
+    try:
+        # Only moves the time forward, in case commits are published out
+        # of order.
+        redis.zadd(format_key(LATEST_MESSAGE_REDIS_KEY), {str(id): score for id in user_ids}, gt=True)
+        for user_id in user_ids:
+            redis.publish(format_key(MESSAGES_CHANNEL.format(database="{database}", user_id=user_id)), score)
+    except RedisError as e:
+        logger.warning("could not publish notification messages: %s", e)
+        # Forgets the earlier time of the users, so their messages are
+        # queried from the database. If this fails too, they are once the
+        # time is older than LATEST_MESSAGE_GRACE_SECONDS.
+        try:
+            redis.zrem(format_key(LATEST_MESSAGE_REDIS_KEY), *(str(id) for id in user_ids))
+        except RedisError as e:
+            logger.warning("could not forget the latest notification message time: %s", e)
+
+
+# The users with messages created by the current transaction.
+_pending = threading.local()
+
+
+def _publish_after_commit() -> None:
+    user_ids, _pending.user_ids = _pending.user_ids, set()
+    messages_created(user_ids)
+
+
+@receiver(signals.post_save, sender=Message)
+def message_saved(sender, instance, created, **kwargs) -> None:
+    if not created:
+        return
+    if not connection.in_atomic_block:
+        messages_created({instance.user_id})
+        return
+    if not any(hook[1] is _publish_after_commit for hook in connection.run_on_commit):
+        _pending.user_ids = set()
+        transaction.on_commit(_publish_after_commit)
+    _pending.user_ids.add(instance.user_id)
@@ -3,6 +3,9 @@ import json
 import logging
 from specifyweb.backend.notifications.models import Message
 from django.test import Client
+from django.test.utils import override_settings
+from unittest.mock import patch
+from redis.exceptions import RedisError
 logger = logging.getLogger(__name__)
 
 from specifyweb.specify.tests.test_api import ApiTests
@@ -59,4 +62,89 @@ class NotificationsTests(ApiTests):
         self.assertEqual(response.content.decode(), 'OK')
 
         # Check if the messages have been deleted
-        self.assertFalse(Message.objects.filter(id__in=message_ids).exists())
\ No newline at end of file
+        self.assertFalse(Message.objects.filter(id__in=message_ids).exists())
+
+@patch('specifyweb.backend.notifications.push.RedisConnection')
+class NotificationsPushTests(ApiTests):
+    def setUp(self):
+        super().setUp()
+        self.client = Client()
+        self.client.force_login(self.specifyuser)
+        self.since = datetime.now() - timedelta(seconds=30)
+
+    def _create_message(self):
+        return Message.objects.create(
+            user=self.specifyuser,
+            content=json.dumps({'type': 'query-export-to-csv-complete', 'file': 'results.csv'}),
+        )
+
+    def _get(self, url):
+        return self.client.get(url, {'since': self.since.strftime('%Y-%m-%d %H:%M:%S')})
+
+    def test_creating_message_is_published(self, RedisConnection):
+        redis = RedisConnection.return_value.connection
+        with self.captureOnCommitCallbacks(execute=True):
+            self._create_message()
+            self._create_message()
+
+        redis.zadd.assert_called_once()
+        self.assertEqual(list(redis.zadd.call_args.args[1]), [str(self.specifyuser.id)])
+        redis.publish.assert_called_once()
+
+    def test_no_query_without_new_messages(self, RedisConnection):
+        self._create_message()
+        RedisConnection.return_value.connection.zscore.return_value = (self.since - timedelta(seconds=1)).timestamp()
+
+        response = self._get('/notifications/messages/')
+
+        self.assertEqual(json.loads(response.content), [])
+
+    def test_messages_queried_after_grace_window(self, RedisConnection):
+        redis = RedisConnection.return_value.connection
+        message = self._create_message()
+        # A message whose time couldn't be recorded is found once the
+        # recorded time is too old to be trusted.
+        redis.zscore.return_value = (self.since - timedelta(minutes=2)).timestamp()
+
+        response = self._get('/notifications/messages/')
+
+        self.assertEqual([m['message_id'] for m in json.loads(response.content)], [message.id])
+        # The time of the query is recorded instead.
+        redis.zadd.assert_called_once()
+        [checked_at] = redis.zadd.call_args.args[1].values()
+        self.assertGreater(checked_at, self.since.timestamp())
+
+    def test_failed_publish_forgets_time(self, RedisConnection):
+        redis = RedisConnection.return_value.connection
+        redis.zadd.side_effect = RedisError('down')
+        with self.captureOnCommitCallbacks(execute=True):
+            self._create_message()
+
+        redis.zrem.assert_called_once()
+        self.assertEqual(redis.zrem.call_args.args[1:], (str(self.specifyuser.id),))
+
+    def test_messages_queried_after_new_message(self, RedisConnection):
+        message = self._create_message()
+        RedisConnection.return_value.connection.zscore.return_value = datetime.now().timestamp()
+
+        response = self._get('/notifications/messages/')
+
+        self.assertEqual([m['message_id'] for m in json.loads(response.content)], [message.id])
+
+    @override_settings(NOTIFICATION_WAIT_TIMEOUT=30)
+    def test_wait_returns_published_message(self, RedisConnection):
+        redis = RedisConnection.return_value.connection
+        redis.zscore.return_value = (self.since - timedelta(seconds=1)).timestamp()
+        pubsub = redis.pubsub.return_value
+
+        def publish(timeout):
+            # The message is created while the request waits.
+            self.message = self._create_message()
+            redis.zscore.return_value = datetime.now().timestamp()
+            return {'type': 'message', 'data': '1'}
+        pubsub.get_message.side_effect = publish
+
+        response = self._get('/notifications/messages/wait/')
+
+        self.assertEqual([m['message_id'] for m in json.loads(response.content)], [self.message.id])
+        pubsub.close.assert_called_once_with()
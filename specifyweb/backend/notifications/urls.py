@@ -4,6 +4,7 @@ from . import views
 
 urlpatterns = [
     path('messages/', views.get_messages),
+    path('messages/wait/', views.wait_for_messages),
     path('mark_read/', views.mark_read),
     path('delete/', views.delete),
     path("delete_all/", views.delete_all)
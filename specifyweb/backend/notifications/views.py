@@ -4,39 +4,66 @@ from datetime import datetime, timedelta
 from django.http import HttpResponse, HttpResponseBadRequest
 from django.views.decorators.http import require_POST
 from django.conf import settings
+from django.db import connection
+from django.utils import timezone
 
 from specifyweb.middleware.general import require_GET
 from specifyweb.specify.api.serializers import toJson
 from specifyweb.specify.views import login_maybe_required
 
+from . import push
 from .models import Message
 
+def serialize_message(m: Message) -> dict:
+    base = {'message_id': m.id, 'read': m.read, 'timestamp': m.timestampcreated}
+    try:
+        content = json.loads(m.content) if m.content else {}
+        if not isinstance(content, dict):
+            content = {'type': 'invalid-notification', 'raw': m.content}
+    except Exception:
+        content = {'type': 'invalid-notification', 'raw': m.content}
+    # Drop any conflicting keys from content
+    content.pop('timestamp', None)
+    content.pop('message_id', None)
+    content.pop('read', None)
+    base.update(content)
+    return base
+
+def messages_response(request) -> HttpResponse:
+    since = request.GET.get('since', None)
+    if since is not None and not push.may_have_messages_since(request.specify_user.id, since):
+        return HttpResponse(toJson([]), content_type='application/json')
+
+    checked_at = timezone.now().timestamp()
+    time_filter = {'timestampcreated__gt': since} if since is not None else {}
+    messages = Message.objects.filter(user=request.specify_user, **time_filter).order_by('timestampcreated')
+    response = HttpResponse(toJson([serialize_message(m) for m in messages]), content_type='application/json')
+    if since is not None:
+        push.messages_checked(request.specify_user.id, checked_at)
+    return response
+
 @require_GET
 @login_maybe_required
 def get_messages(request):
     """Returns a list of notification messages for the logged in user,
     optionally restricted to those created after the 'since' GET parameter.
     """
-    since = request.GET.get('since', None)
-    time_filter = {'timestampcreated__gt': since} if since is not None else {}
-    messages = Message.objects.filter(user=request.specify_user, **time_filter).order_by('timestampcreated')
-
-    def serialize(m: Message):
-        base = {'message_id': m.id, 'read': m.read, 'timestamp': m.timestampcreated}
-        try:
-            content = json.loads(m.content) if m.content else {}
-            if not isinstance(content, dict):
-                content = {'type': 'invalid-notification', 'raw': m.content}
-        except Exception:
-            content = {'type': 'invalid-notification', 'raw': m.content}
-        # Drop any conflicting keys from content
-        content.pop('timestamp', None)
-        content.pop('message_id', None)
-        content.pop('read', None)
-        base.update(content)
-        return base
+    return messages_response(request)
 
-    return HttpResponse(toJson([serialize(m) for m in messages]), content_type='application/json')
+@require_GET
+@login_maybe_required
+def wait_for_messages(request):
+    """Like get_messages, but waits up to NOTIFICATION_WAIT_TIMEOUT seconds
+    for a message created after the 'since' GET parameter before returning.
+    """
+    timeout = getattr(settings, 'NOTIFICATION_WAIT_TIMEOUT', None)
+    since = request.GET.get('since', None)
+    if timeout and since is not None:
+        # Waiting requests don't hold on to a database connection.
+        if not connection.in_atomic_block:
+            connection.close()
+        push.wait_for_messages(request.specify_user.id, since, timeout)
+    return messages_response(request)
 
 @require_POST
 @login_maybe_required
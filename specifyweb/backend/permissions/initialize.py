@@ -11,6 +11,7 @@ from django.apps import apps
 from specifyweb.specify.datamodel import datamodel
 from specifyweb.specify.models_utils.model_extras import is_legacy_admin
 from .permissions import CollectionAccessPT
+from .policy_cache import policies_changed
 
 logger = logging.getLogger(__name__)
 
@@ -45,6 +46,9 @@ def initialize(wipe: bool=False, apps=apps) -> None:
             assign_users_to_roles_during_testing(apps)
         else:
             assign_users_to_roles(apps)
+        # The historical models used here don't send the signals that
+        # invalidate the policy cache.
+        policies_changed()
 
 def create_admins(apps=apps) -> None:
     UserPolicy = apps.get_model('permissions', 'UserPolicy')
@@ -2,6 +2,7 @@ from django import http
 
 from .permissions import PermissionsException, CollectionAccessPT, \
     check_permission_targets
+from .policy_cache import cache_policy_version
 
 
 class PermissionsMiddleware:
@@ -9,7 +10,10 @@ class PermissionsMiddleware:
         self.get_response = get_response
 
     def __call__(self, request):
-        response = self.get_response(request)
+        # The policy version is read once for all the permission checks
+        # of the request.
+        with cache_policy_version():
+            response = self.get_response(request)
         return response
 
     def process_view(self, request, view_func, view_args, view_kwargs):
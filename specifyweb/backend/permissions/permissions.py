@@ -19,6 +19,7 @@ from specifyweb.specify.datamodel import Table
 from specifyweb.backend.cache.thread import ThreadCache
 
 from . import models
+from .policy_cache import cache_policy_version, get_policy_set
 
 registry: dict[str, list[str]] = dict()
 
@@ -238,19 +239,23 @@ def query(
     collectionid: int | None, userid: int, resource: str, action: str
 ) -> QueryResult:
     def get_query_result():
-        user_policies = _get_spuser_policies(
-            collectionid=collectionid,
-            userid=userid,
-            resource=resource,
-            action=action
-        )
+        policy_set = get_policy_set(collectionid, userid)
+        if policy_set is not None:
+            user_policies, role_policies = policy_set.matching(resource, action)
+        else:
+            user_policies = _get_spuser_policies(
+                collectionid=collectionid,
+                userid=userid,
+                resource=resource,
+                action=action
+            )
 
-        role_policies = _get_role_policies(
-            collectionid=collectionid,
-            userid=userid,
-            resource=resource,
-            action=action
-        )
+            role_policies = _get_role_policies(
+                collectionid=collectionid,
+                userid=userid,
+                resource=resource,
+                action=action
+            )
 
         return QueryResult(
             allowed=(bool(user_policies) or bool(role_policies)),
@@ -263,7 +268,8 @@ def query(
 @contextmanager
 def cache_permission_queries():
     with (
-        _permission_query_cache.activate()
+        _permission_query_cache.activate(),
+        cache_policy_version(),
     ):
         yield
 
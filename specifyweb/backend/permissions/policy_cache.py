@@ -0,0 +1,204 @@
+"""
+Cache of the policies that apply to a user in a collection.
+
+Instead of asking the database which policies match every resource and
+action that is checked, all policies of a (collection, user) pair are
+loaded at once and matched in Python. The loaded policies are kept in
+Redis, shared by every web and Celery worker, and in the memory of each
+process.
+
+Both caches are keyed by a policy version counter kept in Redis. Saving or
+deleting a user policy, role, role policy or user role bumps the counter
+once the transaction commits, which makes every process load the policies
+again. Until then the thread that changed the policies bypasses the caches,
+so it sees its own uncommitted changes without sharing them. If the
+counter can't be bumped, the process that changed the policies bypasses
+the caches until a retry succeeds, and logs an error, since other
+processes may keep using the old policies for up to
+PERMISSION_POLICY_CACHE_TTL seconds.
+
+If Redis can't be reached, or PERMISSION_POLICY_CACHE_TTL is None, the
+policies are queried from the database for every check as before.
+"""
+
+import json
+import logging
+import re
+import threading
+import time
+from functools import lru_cache
+from typing import NamedTuple
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import signals
+from django.dispatch import receiver
+from redis.exceptions import RedisError
+
+from specifyweb.backend.cache.redis import get_string, set_string
+from specifyweb.backend.cache.version import CacheVersion
+
+from . import models
+
+logger = logging.getLogger(__name__)
+
+POLICY_VERSION_REDIS_KEY = "specify:{database}:permissions:policy_version"
+POLICY_SET_REDIS_KEY = "specify:{database}:permissions:policies:{version}:{collection_id}:{user_id}"
+
+# The process cache is emptied when it holds more policy sets than this.
+PROCESS_CACHE_MAX_ENTRIES = 1000
+
+
+@lru_cache(maxsize=4096)
+def like_pattern(pattern: str) -> re.Pattern:
+    """Compiles a SQL LIKE pattern, as used in the resource and action
+    columns of the policy tables, into a regular expression. Like MySQL's
+    default collation the match ignores case."""
+    regex = []
+    chars = iter(pattern)
+    for char in chars:
+        if char == '\\':
+            regex.append(re.escape(next(chars, '\\')))
+        elif char == '%':
+            regex.append('.*')
+        elif char == '_':
+            regex.append('.')
+        else:
+            regex.append(re.escape(char))
+    return re.compile(''.join(regex), re.IGNORECASE | re.DOTALL)
+
+
+def _like(value: str, pattern: str) -> bool:
+    return like_pattern(pattern).fullmatch(value) is not None
+
+
+class PolicySet(NamedTuple):
+    user_policies: list[dict]
+    role_policies: list[dict]
+
+    def matching(self, resource: str, action: str) -> tuple[list[dict], list[dict]]:
+        """The user and role policies matching the resource and action."""
+        return (
+            [p for p in self.user_policies if _like(resource, p['resource']) and _like(action, p['action'])],
+            [p for p in self.role_policies if _like(resource, p['resource']) and _like(action, p['action'])],
+        )
+
+    def to_json(self) -> str:
+        return json.dumps({'user': self.user_policies, 'role': self.role_policies})
+
+    @classmethod
+    def from_json(cls, data: str) -> "PolicySet":
+        parsed = json.loads(data)
+        return cls(parsed['user'], parsed['role'])
+
+
+def load_policy_set(collectionid: int | None, userid: int) -> PolicySet:
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+        select collection_id, specifyuser_id, resource, action
+        from spuserpolicy
+        where (collection_id = %(collectionid)s or collection_id is null)
+        and (specifyuser_id = %(userid)s or specifyuser_id is null)
+        """,
+            {"collectionid": collectionid, "userid": userid},
+        )
+        user_policies = [
+            dict(zip(("collectionid", "userid", "resource", "action"), r))
+            for r in cursor.fetchall()
+        ]
+
+        cursor.execute(
+            """
+        select r.id, r.name, resource, action
+        from spuserrole ur
+        join sprole r on r.id = ur.role_id
+        join sprolepolicy rp on rp.role_id = r.id
+        where ur.specifyuser_id = %(userid)s
+        and collection_id = %(collectionid)s
+        """,
+            {"collectionid": collectionid, "userid": userid},
+        )
+        role_policies = [
+            dict(zip(("roleid", "rolename", "resource", "action"), r))
+            for r in cursor.fetchall()
+        ]
+
+    return PolicySet(user_policies, role_policies)
+
+
+# (collectionid, userid) -> (policy version, time loaded, policies)
+_process_cache: dict[tuple[int | None, int], tuple[str, float, PolicySet]] = {}
+_process_cache_lock = threading.Lock()
+
+
+def _clear_process_cache() -> None:
+    with _process_cache_lock:
+        _process_cache.clear()
+
+
+policy_version = CacheVersion(POLICY_VERSION_REDIS_KEY, "permission policy", on_bump=_clear_process_cache)
+
+
+def cache_policy_version():
+    return policy_version.activate()
+
+
+def get_policy_set(collectionid: int | None, userid: int) -> PolicySet | None:
+    """The cached policies of the user in the collection, or None if they
+    have to be queried from the database."""
+    ttl = getattr(settings, 'PERMISSION_POLICY_CACHE_TTL', None)
+    if not ttl or policy_version.should_bypass():
+        return None
+
+    try:
+        version = policy_version.current()
+    except RedisError as e:
+        logger.warning("permission policy cache unavailable: %s", e)
+        return None
+
+    key = (collectionid, userid)
+    cached = _process_cache.get(key)
+    if cached is not None and cached[0] == version and time.monotonic() - cached[1] < ttl:
+        return cached[2]
+
+    redis_key = POLICY_SET_REDIS_KEY.format(
+        database="{database}", version=version, collection_id=collectionid, user_id=userid
+    )
+    try:
+        shared = get_string(redis_key)
+    except RedisError as e:
+        logger.warning("permission policy cache unavailable: %s", e)
+        return None
+
+    if shared is not None:
+        policy_set = PolicySet.from_json(shared)
+    else:
+        policy_set = load_policy_set(collectionid, userid)
+        try:
+            set_string(redis_key, policy_set.to_json(), time_to_live=ttl)
+        except RedisError as e:
+            logger.warning("permission policy cache unavailable: %s", e)
+
+    with _process_cache_lock:
+        if len(_process_cache) >= PROCESS_CACHE_MAX_ENTRIES:
+            _process_cache.clear()
+        _process_cache[key] = (version, time.monotonic(), policy_set)
+    return policy_set
+
+
+def policies_changed() -> None:
+    """Bumps the policy version once the current transaction commits."""
+    policy_version.changed()
+
+
+@receiver(signals.post_save, sender=models.UserPolicy)
+@receiver(signals.post_delete, sender=models.UserPolicy)
+@receiver(signals.post_save, sender=models.Role)
+@receiver(signals.post_delete, sender=models.Role)
+@receiver(signals.post_save, sender=models.RolePolicy)
+@receiver(signals.post_delete, sender=models.RolePolicy)
+@receiver(signals.post_save, sender=models.UserRole)
+@receiver(signals.post_delete, sender=models.UserRole)
+def policy_saved_or_deleted(sender, **kwargs) -> None:
+    policies_changed()
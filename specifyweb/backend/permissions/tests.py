@@ -1,10 +1,17 @@
 import json
+from unittest.mock import patch
 
-from django.test import Client
+from django.db import connection
+from django.test import Client, SimpleTestCase
+from django.test.utils import override_settings
+from redis.exceptions import RedisError
 
 from specifyweb.specify.tests.test_api import ApiTests
 from specifyweb.specify import models as spmodels
 from . import models, permissions, initialize
+from specifyweb.backend.cache import version
+from . import policy_cache
+from .policy_cache import PolicySet, like_pattern
 
 class PermissionsApiTest(ApiTests):
     def setUp(self):
@@ -540,3 +547,63 @@ class PermissionsApiTest(ApiTests):
             content_type='application/json',
         )
         self.assertEqual(response.status_code, 204)
+
+
+class PolicyMatchingTest(SimpleTestCase):
+    def test_like_pattern(self) -> None:
+        self.assertTrue(like_pattern('%').fullmatch('/table/agent'))
+        self.assertTrue(like_pattern('/table/%').fullmatch('/table/agent'))
+        self.assertTrue(like_pattern('/table/agen_').fullmatch('/table/agent'))
+        self.assertTrue(like_pattern('/Table/Agent').fullmatch('/table/agent'))
+        self.assertFalse(like_pattern('/table/%').fullmatch('/field/agent'))
+        self.assertFalse(like_pattern('/table/agent').fullmatch('/table/agents'))
+        self.assertFalse(like_pattern(r'/table/agen\_').fullmatch('/table/agent'))
+
+    def test_policy_set_matching(self) -> None:
+        policy_set = PolicySet(
+            user_policies=[
+                {'collectionid': 1, 'userid': 1, 'resource': '/table/%', 'action': 'read'},
+                {'collectionid': None, 'userid': 1, 'resource': '/system/sp7/collection', 'action': 'access'},
+            ],
+            role_policies=[
+                {'roleid': 1, 'rolename': 'Editor', 'resource': '/table/agent', 'action': '%'},
+            ],
+        )
+
+        user_policies, role_policies = policy_set.matching('/table/agent', 'read')
+        self.assertEqual(['/table/%'], [p['resource'] for p in user_policies])
+        self.assertEqual(['/table/agent'], [p['resource'] for p in role_policies])
+
+        user_policies, role_policies = policy_set.matching('/table/locality', 'create')
+        self.assertEqual(([], []), (user_policies, role_policies))
+
+
+@override_settings(PERMISSION_POLICY_CACHE_TTL=300)
+class PolicyCacheTest(ApiTests):
+    def test_failed_bump_bypasses_cache(self) -> None:
+        store = {}
+
+        def increment(key):
+            store[key] = str(int(store.get(key, 0)) + 1)
+            return int(store[key])
+
+        with patch.object(version, 'get_string', side_effect=lambda key: store.get(key)), \
+                patch.object(policy_cache, 'get_string', side_effect=lambda key: store.get(key)), \
+                patch.object(policy_cache, 'set_string', side_effect=lambda key, value, time_to_live=None: store.__setitem__(key, value)), \
+                patch.object(version, 'increment', side_effect=increment):
+            # Runs the bumps of the test setup as if it had committed.
+            for hook in list(connection.run_on_commit):
+                if hook[1] == policy_cache.policy_version.bump:
+                    connection.run_on_commit.remove(hook)
+                    hook[1]()
+            self.assertIsNotNone(policy_cache.get_policy_set(self.collection.id, self.specifyuser.id))
+
+            with patch.object(version, 'increment', side_effect=RedisError('down')), \
+                    self.assertLogs(version.logger, 'ERROR'):
+                policy_cache.policy_version.bump()
+                self.assertIsNone(policy_cache.get_policy_set(self.collection.id, self.specifyuser.id))
+
+            bumps = store.get(policy_cache.POLICY_VERSION_REDIS_KEY)
+            # The next check retries the bump.
+            self.assertIsNotNone(policy_cache.get_policy_set(self.collection.id, self.specifyuser.id))
+            self.assertEqual(store[policy_cache.POLICY_VERSION_REDIS_KEY], str(int(bumps or 0) + 1))
@@ -78,6 +78,7 @@ def _required_treedef_id(tree_result: dict, tree_name: str) -> int:
 def setup_database_task(self, data: dict):
     """Execute all database setup steps in order."""
     from specifyweb.specify.models import Discipline
+    from specifyweb.backend.context.context_cache import context_changed
     self.update_state(state='STARTED', meta={'progress': api.get_setup_resource_progress()})
     def update_progress():
         self.update_state(state='STARTED', meta={'progress': api.get_setup_resource_progress()})
@@ -146,6 +147,7 @@ def setup_database_task(self, data: dict):
                 lithostrattreedef_id=lithostrat_treedef_id,
                 tectonicunittreedef_id=tectonicunit_treedef_id,
             )
+            context_changed()
             update_progress()
 
             logger.info('Creating collection')
@@ -193,6 +195,7 @@ def set_last_setup_error(error_text: Optional[str]):
 
 def create_discipline_and_trees_task(data: dict):
     from specifyweb.specify.models import Discipline
+    from specifyweb.backend.context.context_cache import context_changed
     """Create discipline and discipline's trees in the correct order. Similar to setup_database_task, but for the configuration tool."""
     try:
         with transaction.atomic():
@@ -251,6 +254,7 @@ def create_discipline_and_trees_task(data: dict):
                 tectonicunittreedef_id=tectonicunit_id,
                 geologictimeperiodtreedef_id=chronostrat_treedef_id,
             )
+            context_changed()
         
         # Pre-load trees
         logger.info('Starting default tree downloads')
@@ -5,11 +5,15 @@
 # However, using 1.11 makes things slower in other files.
 
 from functools import reduce
+from itertools import islice
+from tempfile import SpooledTemporaryFile
 from typing import (
+    IO,
     Any,
     NamedTuple,
 )
-from collections.abc import Callable
+from collections.abc import Callable, Iterator
+import pickle
 
 from specifyweb.backend.permissions.permissions import has_target_permission
 from specifyweb.backend.stored_queries.batch_edit_helper_classes import (
@@ -52,7 +56,8 @@ from .format import ObjectFormatterProps
 from specifyweb.backend.workbench.upload.upload_plan_schema import schema
 from jsonschema import validate
 
-from django.db import transaction
+from django.conf import settings
+from django.db import connection, transaction
 
 import logging
 
@@ -875,22 +880,40 @@ def run_batch_edit(collection, user, spquery, agent):
         omit_relationships=spquery.get("omitrelationships", False),
         treedefsfilter=spquery.get("treedefsfilter", None)
     )
-    (headers, rows, packs, json_upload_plan, visual_order) = run_batch_edit_query(props)
-    mapped_raws = [
-        [*row, json.dumps({"batch_edit": pack})] for (row, pack) in zip(rows, packs)
-    ]
-    # Skipping empty because we can have a funny case where all the query fields don't contain any data
-    regularized_rows = regularize_rows(len(headers), mapped_raws, skip_empty=False)
-    return make_dataset(
-        user=user,
-        collection=collection,
-        name=spquery["name"],
-        headers=headers,
-        regularized_rows=regularized_rows,
-        agent=agent,
-        json_upload_plan=json_upload_plan,
-        visual_order=visual_order,
-    )
+    with (
+        SpooledTemporaryFile(max_size=settings.BATCH_EDIT_SPOOL_SIZE) as records,
+        SpooledTemporaryFile(max_size=settings.BATCH_EDIT_SPOOL_SIZE) as data,
+    ):
+        result = stream_batch_edit_query(props, records)
+        write_dataset_rows(data, len(result.headers), result.rows)
+        return make_dataset(
+            user=user,
+            collection=collection,
+            name=spquery["name"],
+            headers=result.headers,
+            data=data,
+            agent=agent,
+            json_upload_plan=result.json_upload_plan,
+            visual_order=result.visual_order,
+        )
+
+# The number of data set rows regularized and written at a time.
+DATASET_ROWS_CHUNK_SIZE = 1000
+
+def write_dataset_rows(data: IO[bytes], ncols: int, rows: Iterator[tuple[list[Any], dict[str, Any] | None]]) -> None:
+    """Writes the rows with their batch edit packs to the file as the JSON
+    data of a data set, a chunk at a time."""
+    data.write(b"[")
+    separator = b""
+    while chunk := list(islice(rows, DATASET_ROWS_CHUNK_SIZE)):
+        mapped_raws = [
+            [*row, json.dumps({"batch_edit": pack})] for (row, pack) in chunk
+        ]
+        # Skipping empty because we can have a funny case where all the query fields don't contain any data
+        for regularized_row in regularize_rows(ncols, mapped_raws, skip_empty=False):
+            data.write(separator + json.dumps(regularized_row).encode())
+            separator = b","
+    data.write(b"]")
 
 def _get_table_and_field(field: QueryField):
     table_name = field.fieldspec.table.name
@@ -948,7 +971,41 @@ def rewrite_row(row, query_fields: list[QueryField]) -> tuple:
     mapped_rows = dict(zip(join_paths, row[1:]))
     return rewrite_coordinate_fields(row, mapped_rows, join_paths)
 
+class BatchEditQueryResult(NamedTuple):
+    headers: list[str]
+    # The data and batch edit pack of each row, read back from the spool.
+    rows: Iterator[tuple[list[Any], dict[str, Any] | None]]
+    json_upload_plan: dict[str, Any]
+    visual_order: list[int]
+
 def run_batch_edit_query(props: BatchEditProps):
+    with SpooledTemporaryFile(max_size=settings.BATCH_EDIT_SPOOL_SIZE) as records:
+        result = stream_batch_edit_query(props, records)
+        raw_rows = list(result.rows)
+
+    return (
+        result.headers,
+        Func.first(raw_rows),
+        Func.second(raw_rows),
+        result.json_upload_plan,
+        result.visual_order,
+    )
+
+def _read_records(records: IO[bytes]) -> Iterator["RowPlanCanonical"]:
+    records.seek(0)
+    while True:
+        try:
+            yield pickle.load(records)
+        except EOFError:
+            return
+
+def stream_batch_edit_query(props: BatchEditProps, records: IO[bytes]) -> BatchEditQueryResult:
+    """Runs the batch edit query, reading the results in batches. Each
+    record, merged from the result rows of its id, is written to the records
+    file as soon as it is complete, while the to-many planner is updated with
+    it. The rows are made from the records read back from the file once all
+    of them have been seen, so only one record is held in memory at a time.
+    """
 
     offset = 0
     tableid = int(props["contexttableid"])
@@ -1007,6 +1064,11 @@ def run_batch_edit_query(props: BatchEditProps):
         *[field for field in fields if not field.display],
     ]
 
+    to_many_planner = indexed.to_many_planner()
+
+    records_seen = 0
+    previous_id = None
+    previous_row = RowPlanCanonical(EMPTY_PACK)
     with props["session_maker"]() as session:
         rows = execute(
             session=session,
@@ -1028,39 +1090,37 @@ def run_batch_edit_query(props: BatchEditProps):
                 format_types=False,
                 numeric_catalog_number=False,
                 format_expr=False,
-            )
+            ),
+            stream=True,
         )
 
-    to_many_planner = indexed.to_many_planner()
-
-    visited_rows: list[RowPlanCanonical] = []
-    previous_id = None
-    previous_row = RowPlanCanonical(EMPTY_PACK)
-    for _row in rows["results"]:
-        row = rewrite_row(_row, query_fields)
-        _, new_row = previous_row.merge(row, indexed, query_with_hidden)
-        to_many_planner = new_row.update_to_manys(to_many_planner)
-        if previous_id != new_row.batch_edit_pack.id.value:
-            visited_rows.append(previous_row)
-            previous_id = new_row.batch_edit_pack.id.value
-        previous_row = new_row
-
+        for _row in rows["results"]:
+            row = rewrite_row(_row, query_fields)
+            _, new_row = previous_row.merge(row, indexed, query_with_hidden)
+            to_many_planner = new_row.update_to_manys(to_many_planner)
+            if previous_id != new_row.batch_edit_pack.id.value:
+                # The first previous row is the empty starting one.
+                if records_seen > 0:
+                    pickle.dump(previous_row, records, pickle.HIGHEST_PROTOCOL)
+                records_seen += 1
+                previous_id = new_row.batch_edit_pack.id.value
+            previous_row = new_row
+
+    assert records_seen > 0, "nothing to return!"
     # The very last row will not have anybody to commit by, so we need to add it.
     # At this point though, we _know_ we need to commit it
-    visited_rows.append(previous_row)
-
-    visited_rows = visited_rows[1:]
-    assert len(visited_rows) > 0, "nothing to return!"
+    pickle.dump(previous_row, records, pickle.HIGHEST_PROTOCOL)
 
-    raw_rows: list[tuple[list[Any], dict[str, Any] | None]] = []
-    for visited_row in visited_rows:
-        extend_row = visited_row.extend(to_many_planner, indexed)
-        row_data, row_batch_edit_pack = extend_row.flatten()
-        raw_rows.append((row_data, row_batch_edit_pack))
+    # All the rows are extended to the same shape, so the last one gives
+    # the upload plan.
+    extend_row = previous_row.extend(to_many_planner, indexed)
+    row_length = len(extend_row.flatten()[0])
 
-    assert (
-        len({len(raw_row[0]) for raw_row in raw_rows}) == 1
-    ), "Made irregular rows somewhere!"
+    def _rows():
+        for record in _read_records(records):
+            row_data, row_batch_edit_pack = record.extend(to_many_planner, indexed).flatten()
+            assert len(row_data) == row_length, "Made irregular rows somewhere!"
+            yield row_data, row_batch_edit_pack
 
     def _get_orig_column(string_id: str):
         try:
@@ -1101,12 +1161,11 @@ def run_batch_edit_query(props: BatchEditProps):
     json_upload_plan = upload_plan.unparse()
     validate(json_upload_plan, schema)
 
-    return (
-        headers,
-        Func.first(raw_rows),
-        Func.second(raw_rows),
-        json_upload_plan,
-        visual_order,
+    return BatchEditQueryResult(
+        headers=headers,
+        rows=_rows(),
+        json_upload_plan=json_upload_plan,
+        visual_order=visual_order,
     )
 
 def reorder_batch_edit_columns(key_and_headers: list[tuple[tuple[int, int], str]], visible_fields: list[int]) -> list[int]:
@@ -1189,7 +1248,7 @@ def make_dataset(
     collection,
     name,
     headers,
-    regularized_rows,
+    data: IO[bytes],
     agent,
     json_upload_plan,
     visual_order,
@@ -1202,7 +1261,7 @@ def make_dataset(
             collection=collection,
             name=name,
             columns=headers,
-            data=regularized_rows,
+            data=[],
             importedfilename=name,
             createdbyagent=agent,
             modifiedbyagent=agent,
@@ -1218,6 +1277,16 @@ def make_dataset(
         # Create the backer.
         ds.save()
 
+        # The rows are written as the JSON text they were spooled as, rather
+        # than loaded back into a list for the field to serialize.
+        data.seek(0)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"update {Spdataset._meta.db_table} set {Spdataset._meta.get_field('data').column} = %s "
+                f"where {Spdataset._meta.pk.column} in (%s, %s)",
+                [data.read().decode(), ds_id, ds.id],
+            )
+
     return (ds_id, ds_name)
 
 
@@ -29,6 +29,8 @@ from .query_construct import QueryConstruct
 from .relative_date_utils import apply_absolute_date
 from .field_spec_maps import apply_specify_user_name
 from .web_portal_export import query_to_web_portal_zip as _query_to_web_portal_zip, WebportalQueryResultProcessors
+from .pagination import keyset_order, apply_keyset, encode_cursor, cached_count, estimate_count
+from .series import SERIES_MAX_ROWS, series_rows, count_series
 from specifyweb.backend.notifications.models import Message
 from specifyweb.backend.permissions.permissions import check_table_permissions
 from specifyweb.specify.models import Loan, Loanpreparation, Loanreturnpreparation, Taxontreedef
@@ -41,7 +43,8 @@ from specifyweb.specify.datamodel import datamodel, is_tree_table
 
 logger = logging.getLogger(__name__)
 
-SERIES_MAX_ROWS = 10000
+# Exports report their progress every this many rows.
+EXPORT_PROGRESS_INTERVAL = 1000
 
 
 class QuerySort:
@@ -245,10 +248,13 @@ EphemeralField = namedtuple('EphemeralField', "stringId isRelFld operStart start
 
 #     return field_specs
 
-def do_export(spquery, collection, user, filename, exporttype, host):
+def do_export(spquery, collection, user, filename, exporttype, host, progress=None):
     """Executes the given deserialized query definition, sending the
     to a file, and creates "export completed" message when finished.
 
+    If given, progress is called with the number of rows exported so far
+    and None for the unknown total.
+
     See query_to_csv for details of the other accepted arguments.
     """
     recordsetid = spquery.get("recordsetid", None)
@@ -266,11 +272,13 @@ def do_export(spquery, collection, user, filename, exporttype, host):
                 query_to_csv(session, collection, user, tableid, field_specs, path,
                              recordsetid=recordsetid, 
                              captions=spquery['captions'], strip_id=True,
-                             distinct=spquery['selectdistinct'], delimiter=spquery['delimiter'], bom=spquery['bom'])
+                             distinct=spquery['selectdistinct'], delimiter=spquery['delimiter'], bom=spquery['bom'],
+                             progress=progress)
                 message_type = 'query-export-to-csv-complete'
             elif exporttype == 'kml':
                 query_to_kml(session, collection, user, tableid, field_specs, path, spquery['captions'], host,
-                             recordsetid=recordsetid, strip_id=False, selected_rows=spquery.get('selectedrows', None))
+                             recordsetid=recordsetid, strip_id=False, selected_rows=spquery.get('selectedrows', None),
+                             progress=progress)
                 message_type = 'query-export-to-kml-complete'
             elif exporttype == 'webportal':
                 query_to_web_portal_zip(
@@ -393,11 +401,51 @@ def query_to_csv(
     distinct=False,
     delimiter=",",
     bom=False,
+    progress=None,
+    query_filter=None,
 ):
     """Build a sqlalchemy query using the QueryField objects given by
     field_specs and send the results to a CSV file at the given
     file path.
 
+    See query_to_csv_file for details of the other accepted arguments.
+    """
+    encoding = 'utf-8'
+    if bom:
+        encoding = 'utf-8-sig'
+
+    with open(path, 'w', newline='', encoding=encoding) as f:
+        query_to_csv_file(
+            session, collection, user, tableid, field_specs, f,
+            recordsetid=recordsetid, captions=captions, strip_id=strip_id,
+            row_filter=row_filter, distinct=distinct, delimiter=delimiter,
+            progress=progress, query_filter=query_filter,
+        )
+
+
+def query_to_csv_file(
+    session,
+    collection,
+    user,
+    tableid,
+    field_specs,
+    csv_file,
+    recordsetid=None,
+    captions=False,
+    strip_id=False,
+    row_filter=None,
+    distinct=False,
+    delimiter=",",
+    progress=None,
+    query_filter=None,
+):
+    """Build a sqlalchemy query using the QueryField objects given by
+    field_specs and write the results as CSV to the open text file
+    csv_file.
+
+    query_filter, if given, is applied to the built query before it is
+    executed, e.g. to restrict it in SQL rather than with row_filter.
+
     See build_query for details of the other accepted arguments.
     """
     set_group_concat_max_len(session.connection())
@@ -409,6 +457,8 @@ def query_to_csv(
         field_specs,
         BuildQueryProps(recordsetid=recordsetid, replace_nulls=True, distinct=distinct),
     )
+    if query_filter is not None:
+        query = query_filter(query)
     query = query.order_by(*order_by_exprs)
     query_rows = apply_special_post_query_processing(
         query=query,
@@ -422,26 +472,23 @@ def query_to_csv(
 
     logger.debug("query_to_csv starting")
 
-    encoding = 'utf-8'
-    if bom:
-        encoding = 'utf-8-sig'
-
-    with open(path, 'w', newline='', encoding=encoding) as f:
-        csv_writer = csv.writer(f, delimiter=delimiter)
-        if captions:
-            header = captions
-            if not strip_id and not distinct:
-                header = ["id"] + header
-            csv_writer.writerow(header)
-
-        for row in query_rows:
-            if row_filter is not None and not row_filter(row):
-                    continue
-            encoded = [
-                re.sub("\r|\n", " ", str(f))
-                for f in (row[1:] if strip_id or distinct else row)
-            ]
-            csv_writer.writerow(encoded)
+    csv_writer = csv.writer(csv_file, delimiter=delimiter)
+    if captions:
+        header = captions
+        if not strip_id and not distinct:
+            header = ["id"] + header
+        csv_writer.writerow(header)
+
+    for i, row in enumerate(query_rows, start=1):
+        if progress is not None and i % EXPORT_PROGRESS_INTERVAL == 0:
+            progress(i, None)
+        if row_filter is not None and not row_filter(row):
+                continue
+        encoded = [
+            re.sub("\r|\n", " ", str(f))
+            for f in (row[1:] if strip_id or distinct else row)
+        ]
+        csv_writer.writerow(encoded)
 
     logger.debug("query_to_csv finished")
 
@@ -468,6 +515,7 @@ def query_to_kml(
     recordsetid=None,
     strip_id=False,
     selected_rows=None,
+    progress=None,
 ):
     """Build a sqlalchemy query using the QueryField objects given by
     field_specs and send the results to a kml file at the given
@@ -516,7 +564,9 @@ def query_to_kml(
 
     coord_cols = getCoordinateColumns(field_specs, table != None)
 
-    for row in query_rows:
+    for i, row in enumerate(query_rows, start=1):
+        if progress is not None and i % EXPORT_PROGRESS_INTERVAL == 0:
+            progress(i, None)
         if row_has_geocoords(coord_cols, row):
             placemarkElement = createPlacemark(
                 kmlDoc, row, coord_cols, table, captions, host
@@ -676,6 +726,8 @@ def run_ephemeral_query(collection, user, spquery):
     logger.info("ephemeral query: %s", spquery)
     limit = spquery.get("limit", 20)
     offset = spquery.get("offset", 0)
+    keyset = "cursor" in spquery
+    cursor = spquery.get("cursor", None) or None
     recordsetid = spquery.get("recordsetid", None)
     distinct = spquery["selectdistinct"]
     series = spquery.get('smushed', None)
@@ -700,6 +752,8 @@ def run_ephemeral_query(collection, user, spquery):
             offset=offset,
             recordsetid=recordsetid,
             formatauditobjs=format_audits,
+            keyset=keyset,
+            cursor=cursor,
         )
 
 
@@ -864,8 +918,18 @@ def execute(
     recordsetid=None,
     formatauditobjs=False,
     formatter_props=None,
+    keyset=False,
+    cursor=None,
+    stream=False,
 ):
-    "Build and execute a query, returning the results as a data structure for json serialization"
+    """Build and execute a query, returning the results as a data structure for json serialization
+
+    With keyset, pages are requested with the cursor returned along with the
+    previous page instead of an offset. See pagination.py.
+
+    With stream, the results are an iterator fetching the rows in batches,
+    which has to be consumed while the session is open.
+    """
 
     if formatter_props is None:
         formatter_props = DefaultQueryFormatterProps()
@@ -889,14 +953,15 @@ def execute(
 
     if count_only:
         if series:
-            cat_num_sort_type = 0
-            for field_spec in field_specs:
-                if field_spec.fieldspec.get_field() and field_spec.fieldspec.get_field().name.lower() == 'catalognumber':
-                    cat_num_sort_type = field_spec.sort_type
-                    break
-            return {'count': len(series_post_query(query, limit=SERIES_MAX_ROWS, offset=0, sort_type=cat_num_sort_type, is_count=True))}
+            # The order of the series doesn't change their number.
+            return cached_count(collection, query, lambda: {'count': count_series(query)})
         else:
-            return {'count': query.count()}
+            def count():
+                estimate = estimate_count(session, query)
+                if estimate is not None:
+                    return {'count': estimate, 'estimated': True}
+                return {'count': query.count()}
+            return cached_count(collection, query, count)
     else:
         cat_num_col_id = None
         cat_num_sort_type = None
@@ -922,8 +987,27 @@ def execute(
             # query = query.limit(SERIES_MAX_ROWS)
             return {'results': series_post_query(query, limit=limit, offset=offset, sort_type=cat_num_sort_type)}
         
-        logger.debug("order by: %s", order_by_exprs)
-        query = query.order_by(*order_by_exprs).offset(offset)
+        processors = DefaultQueryProcessors(
+            tableid=tableid,
+            field_specs=field_specs,
+            collection=collection,
+            user=user
+        )
+
+        order = (
+            keyset_order(order_by_exprs, models.models_by_tableid[tableid]._id)
+            # The id column of grouped and synonymized queries isn't a plain id.
+            if keyset and not distinct and not search_synonymy
+            else None
+        )
+        if order is not None:
+            logger.debug("keyset order: %s", order)
+            query = apply_keyset(query, order, cursor)
+            if cursor is None:
+                query = query.offset(offset)
+        else:
+            logger.debug("order by: %s", order_by_exprs)
+            query = query.order_by(*order_by_exprs).offset(offset)
 
         if limit:
             query = query.limit(limit)
@@ -933,18 +1017,26 @@ def execute(
 
         log_sqlalchemy_query(query) # Debugging
 
+        if order is None:
+            results = apply_special_post_query_processing(query=query, processors=processors)
+            return {"results": results if stream else list(results)}
+
+        last_keys = []
+
+        def strip_keys(row: list) -> list:
+            last_keys[:] = row[-len(order):]
+            return row[:-len(order)]
+
         results = list(
             apply_special_post_query_processing(
-                query=query,
-                processors=DefaultQueryProcessors(
-                    tableid=tableid,
-                    field_specs=field_specs,
-                    collection=collection,
-                    user=user
-                )
+                query=query, processors=[strip_keys, *processors]
             )
         )
-        return {"results": results}
+        has_more = bool(limit) and len(results) == limit
+        return {
+            "results": results,
+            "cursor": encode_cursor(last_keys) if has_more else None,
+        }
 
 def build_query(
     session,
@@ -1136,126 +1228,13 @@ def build_query(
     logger.debug("query: %s", query.query)
     return query.query, order_by_exprs
 
-def series_post_query(query, limit=40, offset=0, sort_type=0, co_id_cat_num_pair_col_index=0, is_count=False):
+def series_post_query(query, limit=40, offset=0, sort_type=0, co_id_cat_num_pair_col_index=0):
     """Transform the query results by removing the co_id:catnum pair column
     and adding a co_id colum and formatted catnum range column.
     Sort the results by the first catnum in the range."""
 
     log_sqlalchemy_query(query)
-
-    def parse_catalog_for_comparing(s):
-        def check_for_decimal(s):
-            decimal_match = re.search(r'\d+\.\d+', s)
-            if decimal_match:
-                return decimal_match.group()
-            return None
-
-        try:
-            num = int(s)
-            return (num, '', '')
-        except ValueError:
-            decimal_match_str = check_for_decimal(s)
-            if decimal_match_str:
-                num, dec = decimal_match_str.split('.')
-                match = re.search(rf'(\D*)({num}\.{dec})(.*)', s)
-                if match:
-                    prefix, number, postfix = match.groups()
-                    prefix = prefix if prefix else '' 
-                    postfix = postfix if postfix else '' 
-                    return (int(float(number)), prefix, postfix)
-            
-            # Match integer-integer string, like "1234-5678" so that the number 12345678 is parsed
-            match = re.search(r'^(\d+)-(\d+)$', s)
-            if match:
-                num1, num2 = match.groups()
-                combined_number = int(str(num1) + str(num2))  # Concatenate as strings, then convert to int
-                return (combined_number, '', '')
-            
-            # Match string-interger string, like "abc-1234" so that the number 1234 is parsed
-            match = re.search(r'(\D*)(\d+)', s)
-            if match:
-                prefix, number = match.groups()
-                prefix = prefix if prefix else '' 
-                return (int(number), prefix, '')
-
-            match = re.search(r'(\D*)(\d+)(.*)', s)
-            if match:
-                prefix, number, postfix = match.groups()
-                prefix = prefix if prefix else '' 
-                postfix = postfix if postfix else '' 
-                return (int(number), prefix, postfix)
-            
-            return (None, s, '')
-
-    # REFACTOR: Remove this if it really is and should be unused
-    def parse_catalog_for_sorting(catalog): # pragma: no cover
-        m = re.match(r'^([A-Za-z]*)(\d+)$', catalog)
-        if m:
-            return m.group(1), int(m.group(2))
-        else:
-            return catalog, None
-
-    def catalog_sort_key(x):
-        num, prefix, postfix = parse_catalog_for_comparing(x[1])
-        return (prefix, num, postfix if num is not None else x[1])
-
-    def are_adjacent(cat1, cat2):
-        num1, prefix1, postfix1 = parse_catalog_for_comparing(cat1)
-        num2, prefix2, postfix2 = parse_catalog_for_comparing(cat2)
-        return prefix1 == prefix2 and \
-               postfix1 == postfix2 and \
-               num1 is not None and \
-               num2 is not None and \
-               (num1 + 1 == num2 or num1 == num2)
-
-    def group_consecutive_ranges(lst):
-        def group_consecutives(acc, x):
-            if not acc or not are_adjacent(acc[-1][-1][1], x[1]):
-                acc.append([x])
-            else:
-                acc[-1].append(x)
-            return acc
-
-        grouped = reduce(group_consecutives, lst, [])
-        return [
-            (','.join([x[0] for x in group]),
-             f"{group[0][1]} - {group[-1][1]}" if len(group) > 1 else f"{group[0][1]}")
-            for group in grouped
-        ]
-
-    def process_row(row):
-        co_id_cat_num_seq = row[co_id_cat_num_pair_col_index]
-        if row[co_id_cat_num_pair_col_index] is None:
-            return []
-
-        sorted_pairs = sorted(
-            [[item if item else '0'
-              for item in pair.split(':')]
-              for pair in co_id_cat_num_seq.split(',') if isinstance(co_id_cat_num_seq, str)],
-            key=catalog_sort_key
-        )
-        co_id_cat_num_consecutive_pairs = group_consecutive_ranges(sorted_pairs)
-        return [
-            [co_id, cat_num_series] + (
-                list(row[1:]) if co_id_cat_num_pair_col_index == 0
-                else list(row[:co_id_cat_num_pair_col_index]) + list(row[co_id_cat_num_pair_col_index + 1:])
-            )
-            for co_id, cat_num_series in co_id_cat_num_consecutive_pairs
-        ]
-
-    # Process and flatten the results
-    results = [item for sublist in map(process_row, list(query)) for item in sublist]
-
-    # Reorder the final results based on sort_type
-    if sort_type == 2:
-        results = results[::-1]
-
-    if is_count:
-        return results
-
-    series_limit = limit if limit else SERIES_MAX_ROWS
-    offset = offset if offset else 0
-    return results[offset:offset + series_limit]
+    return series_rows(query, limit, offset, sort_type, co_id_cat_num_pair_col_index)
 
 def apply_special_post_query_processing(query,
                                         processors: list[Callable[[list], list]],
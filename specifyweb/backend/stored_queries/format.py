@@ -19,6 +19,7 @@ from sqlalchemy.exc import InvalidRequestError
 from sqlalchemy import types
 
 import specifyweb.backend.context.app_resource as app_resource
+from specifyweb.backend.context import xml_cache
 
 from specifyweb.specify.utils.agent_types import agent_types
 from specifyweb.specify.models import datamodel, Splocalecontainer
@@ -53,7 +54,9 @@ class ObjectFormatter:
     def __init__(self, collection, user, replace_nulls, props: ObjectFormatterProps = ObjectFormatterProps()):
 
         formattersXML, _, __ = app_resource.get_app_resource(collection, user, 'DataObjFormatters')
-        self.formattersDom = ElementTree.fromstring(formattersXML)
+        # Shared with other formatters for the same resource, so it must not
+        # be modified.
+        self.formattersDom = xml_cache.parse_string(formattersXML).root
         self.date_format = get_date_format()
         self.date_format_year = MYSQL_TO_YEAR.get(self.date_format)
         self.date_format_month = MYSQL_TO_MONTH.get(self.date_format)
@@ -0,0 +1,68 @@
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from specifyweb.backend.stored_queries.series import series_rows, count_series
+
+
+def synthetic_rows(n_catalog_numbers: int, group_size: int):
+    """Rows shaped like the grouped `co_id:catalog number` column of a series
+    query. Every eleventh catalog number is missing, so each row holds
+    several series, and the pairs are shuffled within the row the way
+    GROUP_CONCAT leaves them."""
+    row = []
+    for i in range(n_catalog_numbers):
+        if i % 11 != 10:
+            row.append(f"{i + 1}:{i + 1:09d}")
+        if len(row) == group_size:
+            yield (','.join(reversed(row)), f"Group {i // group_size}")
+            row = []
+    if row:
+        yield (','.join(reversed(row)), "Group last")
+
+
+class Command(BaseCommand):
+    help = (
+        'Time series grouping of a synthetic collection of catalog numbers: '
+        'the first page, a page deep into the results, the last page and the '
+        'count, with the peak memory of each.'
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('--catalog-numbers', type=int, default=1000000)
+        parser.add_argument(
+            '--group-size',
+            type=int,
+            default=100,
+            help='The number of catalog numbers grouped into each query row.'
+        )
+        parser.add_argument('--limit', type=int, default=40)
+
+    def handle(self, *args, **options) -> None:
+        n = options['catalog_numbers']
+        group_size = options['group_size']
+        limit = options['limit']
+
+        def rows():
+            return synthetic_rows(n, group_size)
+
+        def measure(label, fn):
+            tracemalloc.start()
+            tic = time.perf_counter()
+            result = fn()
+            toc = time.perf_counter()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self.stdout.write(
+                f"{label}: {toc - tic:.2f}s, peak memory {peak / 2**20:.1f} MiB"
+            )
+            return result
+
+        total = measure('count', lambda: count_series(rows()))
+        self.stdout.write(f"{n} catalog numbers form {total} series")
+
+        measure('first page', lambda: series_rows(rows(), limit, 0))
+        measure('middle page', lambda: series_rows(rows(), limit, total // 2))
+        measure('last page', lambda: series_rows(rows(), limit, total - limit))
+        measure('first page, descending', lambda: series_rows(rows(), limit, 0, sort_type=2))
@@ -0,0 +1,195 @@
+"""
+Keyset pagination and counting of query results.
+
+Paging with OFFSET makes the database produce and throw away every row
+before the requested page, so each page deep into a large result is slower
+than the last. In keyset mode the query is instead ordered by its sort
+columns followed by the base table id, and the next page starts right
+after the sort values of the last row returned, which are handed to the
+client as an opaque cursor.
+
+Counting a large result costs as much as running the whole query, so
+counts are cached per collection and query for a while, and can be
+replaced by the optimizer's estimate past a configurable size.
+"""
+
+import json
+import logging
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date, datetime, time
+from decimal import Decimal
+from hashlib import sha256
+from typing import Any, Callable
+
+from django.conf import settings
+from redis.exceptions import RedisError
+from sqlalchemy import sql
+from sqlalchemy.dialects import mysql as mysql_dialect
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import UnaryExpression
+
+from specifyweb.backend.cache.redis import get_string, set_string
+
+logger = logging.getLogger(__name__)
+
+QUERY_COUNT_REDIS_KEY = "specify:{database}:stored_queries:count:{collection_id}:{query_hash}"
+
+KeysetOrder = list[tuple[Any, bool]]
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def keyset_order(order_by_exprs: list, id_field) -> KeysetOrder | None:
+    """The (expression, descending) pairs the results are ordered by,
+    ending with the base table id so that the order is total. None if the
+    ordering can't be used for keyset pagination."""
+    order = []
+    for expr in order_by_exprs:
+        if not isinstance(expr, UnaryExpression) or expr.modifier not in (
+            operators.asc_op,
+            operators.desc_op,
+        ):
+            return None
+        order.append((expr.element, expr.modifier is operators.desc_op))
+    order.append((id_field, False))
+    return order
+
+
+def apply_keyset(query, order: KeysetOrder, cursor: str | None):
+    """Orders the query by the keyset and starts it after cursor.
+
+    The sort values are added as the last columns of the query, so that the
+    cursor of the next page can be built from the last row.
+    """
+    query = query.add_columns(*(expr for expr, _ in order)).order_by(
+        *(sql.desc(expr) if descending else sql.asc(expr) for expr, descending in order)
+    )
+    if cursor is None:
+        return query
+
+    values = decode_cursor(cursor)
+    if len(values) != len(order):
+        raise InvalidCursor("cursor does not match the query")
+    return query.filter(
+        sql.or_(
+            *(
+                sql.and_(
+                    *(
+                        _equal(expr, value)
+                        for (expr, _), value in zip(order[:i], values[:i])
+                    ),
+                    _after(*order[i], values[i]),
+                )
+                for i in range(len(order))
+            )
+        )
+    )
+
+
+def _equal(expr, value):
+    return expr.is_(None) if value is None else expr == value
+
+
+def _after(expr, descending: bool, value):
+    # MySQL sorts nulls first in ascending order, and last in descending order.
+    if descending:
+        return sql.false() if value is None else sql.or_(expr < value, expr.is_(None))
+    return expr.isnot(None) if value is None else expr > value
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"datetime": value.isoformat()}
+    if isinstance(value, date):
+        return {"date": value.isoformat()}
+    if isinstance(value, time):
+        return {"time": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"decimal": str(value)}
+    if isinstance(value, bytes):
+        return {"bytes": value.hex()}
+    return value
+
+
+def _decode_value(value):
+    if not isinstance(value, dict):
+        return value
+    ((kind, encoded),) = value.items()
+    return {
+        "datetime": datetime.fromisoformat,
+        "date": date.fromisoformat,
+        "time": time.fromisoformat,
+        "decimal": Decimal,
+        "bytes": bytes.fromhex,
+    }[kind](encoded)
+
+
+def encode_cursor(values) -> str:
+    data = json.dumps([_encode_value(value) for value in values], separators=(",", ":"))
+    return urlsafe_b64encode(data.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> list:
+    try:
+        values = json.loads(urlsafe_b64decode(cursor.encode()))
+        return [_decode_value(value) for value in values]
+    except (ValueError, TypeError, KeyError) as e:
+        raise InvalidCursor("invalid cursor") from e
+
+
+def query_hash(query) -> str:
+    compiled = query.statement.compile(dialect=mysql_dialect.dialect())
+    return sha256(
+        (str(compiled) + repr(sorted(compiled.params.items(), key=lambda p: p[0]))).encode()
+    ).hexdigest()
+
+
+def cached_count(collection, query, count: Callable[[], dict]) -> dict:
+    """Returns count(), cached for STORED_QUERY_COUNT_CACHE_TTL seconds."""
+    ttl = getattr(settings, "STORED_QUERY_COUNT_CACHE_TTL", None)
+    if not ttl:
+        return count()
+
+    key = QUERY_COUNT_REDIS_KEY.format(
+        database="{database}", collection_id=collection.id, query_hash=query_hash(query)
+    )
+    try:
+        cached = get_string(key)
+    except RedisError as e:
+        logger.warning("query count cache unavailable: %s", e)
+        return count()
+    if cached is not None:
+        return json.loads(cached)
+
+    result = count()
+    try:
+        set_string(key, json.dumps(result), time_to_live=ttl)
+    except RedisError as e:
+        logger.warning("query count cache unavailable: %s", e)
+    return result
+
+
+def estimate_count(session, query) -> int | None:
+    """The optimizer's estimate of the number of results, if it is at least
+    STORED_QUERY_COUNT_ESTIMATE_THRESHOLD."""
+    threshold = getattr(settings, "STORED_QUERY_COUNT_ESTIMATE_THRESHOLD", None)
+    if threshold is None:
+        return None
+
+    compiled = query.statement.compile(dialect=session.bind.dialect)
+    params = (
+        tuple(compiled.params[name] for name in compiled.positiontup)
+        if compiled.positional
+        else compiled.params
+    )
+    plan = session.connection().exec_driver_sql("EXPLAIN " + str(compiled), params)
+
+    estimate = 1.0
+    for row in plan.mappings():
+        if row["select_type"] not in ("SIMPLE", "PRIMARY"):
+            continue
+        estimate *= (row["rows"] or 1) * float(row.get("filtered") or 100) / 100
+    estimate = int(estimate)
+    return estimate if estimate >= threshold else None
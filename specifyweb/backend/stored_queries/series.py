@@ -0,0 +1,174 @@
+"""
+Grouping of catalog numbers into series for "smushed" Collection Object
+queries.
+
+Each result row of a series query carries a column of comma separated
+`co_id:catalog number` pairs. The pairs of a row are sorted by catalog
+number and runs of consecutive numbers with the same prefix and postfix
+are turned into one result row each, with the ids of the run and its
+catalog number range.
+
+The query is streamed in batches and the series are generated one row at a
+time, so a page of results only reads as far into the query as it needs,
+and counting never holds more than one row's pairs in memory. The parsing
+rules for catalog numbers have no portable SQL equivalent, so the grouping
+itself stays in Python.
+"""
+
+import re
+from collections import deque
+from collections.abc import Iterable, Iterator
+from typing import Any, NamedTuple
+
+from sqlalchemy import orm
+
+SERIES_MAX_ROWS = 10000
+
+# Number of query rows fetched from the database at a time.
+SERIES_BATCH_SIZE = 2000
+
+_DECIMAL = re.compile(r'\d+\.\d+')
+_INTEGER_INTEGER = re.compile(r'^(\d+)-(\d+)$')
+_PREFIX_INTEGER = re.compile(r'(\D*)(\d+)')
+
+
+class CatalogNumber(NamedTuple):
+    sort_key: tuple
+    num: int | None
+    prefix: str
+    postfix: str
+    co_id: str
+    catalog_number: str
+
+
+def parse_catalog_for_comparing(s: str) -> tuple[int | None, str, str]:
+    """The (number, prefix, postfix) parts of a catalog number."""
+    try:
+        return (int(s), '', '')
+    except ValueError:
+        pass
+
+    decimal_match = _DECIMAL.search(s)
+    if decimal_match:
+        num, dec = decimal_match.group().split('.')
+        match = re.search(rf'(\D*)({num}\.{dec})(.*)', s)
+        if match:
+            prefix, number, postfix = match.groups()
+            return (int(float(number)), prefix or '', postfix or '')
+
+    # Match integer-integer string, like "1234-5678" so that the number 12345678 is parsed
+    match = _INTEGER_INTEGER.search(s)
+    if match:
+        num1, num2 = match.groups()
+        return (int(num1 + num2), '', '')
+
+    # Match string-interger string, like "abc-1234" so that the number 1234 is parsed
+    match = _PREFIX_INTEGER.search(s)
+    if match:
+        prefix, number = match.groups()
+        return (int(number), prefix or '', '')
+
+    return (None, s, '')
+
+
+def parse_pair(pair: str) -> CatalogNumber:
+    """Parses a `co_id:catalog number` pair, computing its sort key once."""
+    items = [item if item else '0' for item in pair.split(':')]
+    co_id, catalog_number = items[0], items[1]
+    num, prefix, postfix = parse_catalog_for_comparing(catalog_number)
+    return CatalogNumber(
+        (prefix, num, postfix if num is not None else catalog_number),
+        num,
+        prefix,
+        postfix,
+        co_id,
+        catalog_number,
+    )
+
+
+def _are_adjacent(cat1: CatalogNumber, cat2: CatalogNumber) -> bool:
+    return (
+        cat1.prefix == cat2.prefix
+        and cat1.postfix == cat2.postfix
+        and cat1.num is not None
+        and cat2.num is not None
+        and (cat1.num + 1 == cat2.num or cat1.num == cat2.num)
+    )
+
+
+def _row_catalog_numbers(row, pair_col_index: int) -> list[CatalogNumber]:
+    pairs = row[pair_col_index]
+    if not isinstance(pairs, str):
+        return []
+    return sorted((parse_pair(pair) for pair in pairs.split(',')), key=lambda c: c.sort_key)
+
+
+def row_series(row, pair_col_index: int = 0) -> Iterator[list[CatalogNumber]]:
+    """The runs of consecutive catalog numbers in the row, in catalog number order."""
+    group: list[CatalogNumber] = []
+    for catalog_number in _row_catalog_numbers(row, pair_col_index):
+        if group and not _are_adjacent(group[-1], catalog_number):
+            yield group
+            group = []
+        group.append(catalog_number)
+    if group:
+        yield group
+
+
+def count_row_series(row, pair_col_index: int = 0) -> int:
+    catalog_numbers = _row_catalog_numbers(row, pair_col_index)
+    return sum(
+        1
+        for previous, current in zip([None, *catalog_numbers], catalog_numbers)
+        if previous is None or not _are_adjacent(previous, current)
+    )
+
+
+def series_result_row(group: list[CatalogNumber], row, pair_col_index: int = 0) -> list:
+    first, last = group[0].catalog_number, group[-1].catalog_number
+    return [
+        ','.join(c.co_id for c in group),
+        f"{first} - {last}" if len(group) > 1 else first,
+        *row[:pair_col_index],
+        *row[pair_col_index + 1:],
+    ]
+
+
+def stream_rows(query, batch_size: int = SERIES_BATCH_SIZE) -> Iterable[Any]:
+    return query.yield_per(batch_size) if isinstance(query, orm.Query) else query
+
+
+def series_rows(query, limit=40, offset=0, sort_type=0, pair_col_index=0) -> list[list]:
+    """A page of series result rows.
+
+    In ascending order, reading the query stops as soon as offset + limit
+    series have been generated. In descending order (sort_type 2) every row
+    has to be read, but only the last offset + limit series are kept.
+    """
+    limit = limit if limit else SERIES_MAX_ROWS
+    offset = offset if offset else 0
+    end = offset + limit
+
+    if sort_type == 2:
+        last: deque = deque(maxlen=end)
+        for row in stream_rows(query):
+            for group in row_series(row, pair_col_index):
+                last.append((group, row))
+        page = list(reversed(last))[offset:]
+        return [series_result_row(group, row, pair_col_index) for group, row in page]
+
+    results = []
+    produced = 0
+    for row in stream_rows(query):
+        for group in row_series(row, pair_col_index):
+            if produced >= offset:
+                results.append(series_result_row(group, row, pair_col_index))
+            produced += 1
+            if produced >= end:
+                return results
+    return results
+
+
+def count_series(query, pair_col_index=0) -> int:
+    """The number of series result rows of the query, without building them."""
+    return sum(count_row_series(row, pair_col_index) for row in stream_rows(query))
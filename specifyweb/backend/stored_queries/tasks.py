@@ -0,0 +1,208 @@
+import json
+import os
+import time
+from datetime import timedelta
+from uuid import uuid4
+
+from celery.utils.log import get_task_logger # type: ignore
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from specifyweb.celery_tasks import LogErrorsTask, app
+from specifyweb.backend.notifications.models import Message, QueryExport
+
+from .execution import do_export
+
+logger = get_task_logger(__name__)
+
+# Running exports mark themselves alive at most every this many seconds.
+EXPORT_HEARTBEAT_INTERVAL = 60
+
+
+class QueryExportStatus:
+    QUEUED = 'QUEUED'
+    RUNNING = 'RUNNING'
+    SUCCEEDED = 'SUCCEEDED'
+    FAILED = 'FAILED'
+    CANCELLED = 'CANCELLED'
+
+
+def enqueue_export(spquery, collection, user, filename: str, exporttype: str, host: str | None) -> QueryExport:
+    """Queues the export of the given deserialized query definition and
+    starts it if the export limits allow."""
+    with transaction.atomic():
+        export = QueryExport.objects.create(
+            taskid=str(uuid4()),
+            status=QueryExportStatus.QUEUED,
+            specifyuser=user,
+            collection=collection,
+            exporttype=exporttype,
+            filename=filename,
+            query=spquery,
+            host=host,
+        )
+        schedule_exports()
+    return export
+
+
+def fail_stalled_export(export: QueryExport) -> None:
+    """Fails a running export whose worker stopped reporting progress.
+    Must be called with the export locked."""
+    logger.warning("query export %s stopped reporting progress", export.id)
+    export.status = QueryExportStatus.FAILED
+    export.save(update_fields=['status', 'timestampmodified'])
+
+    Message.objects.create(user=export.specifyuser, content=json.dumps({
+        'type': f'query-export-to-{export.exporttype}-failed',
+        'file': export.filename,
+        'error': {'error': 'The export stopped responding.'},
+    }))
+    # In case the worker is alive but stuck.
+    transaction.on_commit(
+        lambda taskid=export.taskid: app.control.revoke(taskid, terminate=True)
+    )
+
+
+def schedule_exports() -> None:
+    """Starts queued exports in the order they were queued, as long as
+    fewer than EXPORT_MAX_CONCURRENT exports are running in total and
+    fewer than EXPORT_MAX_CONCURRENT_PER_USER for the export's user.
+
+    The queue lives in the database, so queued exports outlive restarts of
+    the web and worker processes and are started by whichever process
+    schedules next. Running exports that haven't reported progress for
+    EXPORT_RUNNING_TIMEOUT seconds are failed first, so exports whose
+    worker died don't hold on to their place.
+    """
+    max_total = settings.EXPORT_MAX_CONCURRENT
+    max_per_user = settings.EXPORT_MAX_CONCURRENT_PER_USER
+    timeout = getattr(settings, 'EXPORT_RUNNING_TIMEOUT', None)
+
+    with transaction.atomic():
+        # Locking every waiting and running export keeps concurrent
+        # schedulers from starting the same exports.
+        exports = list(
+            QueryExport.objects.select_for_update()
+            .filter(status__in=[QueryExportStatus.QUEUED, QueryExportStatus.RUNNING])
+            .order_by('id')
+        )
+        if timeout is not None:
+            stalled_before = timezone.now() - timedelta(seconds=timeout)
+            for export in exports:
+                if export.status == QueryExportStatus.RUNNING and export.timestampmodified < stalled_before:
+                    fail_stalled_export(export)
+
+        running_per_user: dict[int, int] = {}
+        for export in exports:
+            if export.status == QueryExportStatus.RUNNING:
+                running_per_user[export.specifyuser_id] = running_per_user.get(export.specifyuser_id, 0) + 1
+        running = sum(running_per_user.values())
+
+        for export in exports:
+            if max_total is not None and running >= max_total:
+                break
+            if export.status != QueryExportStatus.QUEUED:
+                continue
+            if max_per_user is not None and running_per_user.get(export.specifyuser_id, 0) >= max_per_user:
+                continue
+
+            export.status = QueryExportStatus.RUNNING
+            export.save(update_fields=['status', 'timestampmodified'])
+            running += 1
+            running_per_user[export.specifyuser_id] = running_per_user.get(export.specifyuser_id, 0) + 1
+
+            # The task checks the status saved above, so it can only be
+            # sent once that is committed.
+            transaction.on_commit(
+                lambda export=export: export_query.apply_async([export.id], task_id=export.taskid)
+            )
+
+
+def queue_position(export: QueryExport) -> int | None:
+    """The number of exports queued before the given one, or None if it
+    isn't queued."""
+    if export.status != QueryExportStatus.QUEUED:
+        return None
+    return QueryExport.objects.filter(
+        status=QueryExportStatus.QUEUED,
+        id__lt=export.id,
+    ).count()
+
+
+def export_progress(export: QueryExport) -> dict | None:
+    """The progress last reported by a running export."""
+    if export.status != QueryExportStatus.RUNNING:
+        return None
+    result = export_query.AsyncResult(export.taskid)
+    return result.info if isinstance(result.info, dict) else None
+
+
+def cancel_export(export: QueryExport) -> bool:
+    """Cancels a queued or running export. Returns False if it had already
+    finished."""
+    with transaction.atomic():
+        export = QueryExport.objects.select_for_update().get(id=export.id)
+        if export.status not in (QueryExportStatus.QUEUED, QueryExportStatus.RUNNING):
+            return False
+
+        if export.status == QueryExportStatus.RUNNING:
+            app.control.revoke(export.taskid, terminate=True)
+            path = os.path.join(settings.DEPOSITORY_DIR, export.filename)
+            if os.path.exists(path):
+                os.remove(path)
+
+        export.status = QueryExportStatus.CANCELLED
+        export.save(update_fields=['status', 'timestampmodified'])
+
+        Message.objects.create(user=export.specifyuser, content=json.dumps({
+            'type': f'query-export-to-{export.exporttype}-failed',
+            'file': export.filename,
+            'error': {'error': 'The export was cancelled.'},
+        }))
+
+    schedule_exports()
+    return True
+
+
+# acks_late with reject_on_worker_lost redelivers an export whose worker
+# died, and the export rewrites its file from the start.
+@app.task(base=LogErrorsTask, bind=True, acks_late=True, reject_on_worker_lost=True)
+def export_query(self, export_id: int) -> None:
+    last_heartbeat = time.monotonic()
+
+    def progress(current: int, total: int | None) -> None:
+        nonlocal last_heartbeat
+        if not self.request.called_directly:
+            self.update_state(state='PROGRESS', meta={'current': current, 'total': total})
+        if time.monotonic() - last_heartbeat >= EXPORT_HEARTBEAT_INTERVAL:
+            # Keeps schedule_exports from taking the export for stalled.
+            QueryExport.objects.filter(id=export_id, status=QueryExportStatus.RUNNING) \
+                .update(timestampmodified=timezone.now())
+            last_heartbeat = time.monotonic()
+
+    export = QueryExport.objects.select_related('collection', 'specifyuser').get(id=export_id)
+    if export.status != QueryExportStatus.RUNNING or export.taskid != self.request.id:
+        logger.info("query export %s is not assigned to this task", export_id)
+        return
+
+    status = QueryExportStatus.FAILED
+    try:
+        do_export(
+            export.query,
+            export.collection,
+            export.specifyuser,
+            export.filename,
+            export.exporttype,
+            export.host,
+            progress,
+        )
+        status = QueryExportStatus.SUCCEEDED
+    finally:
+        with transaction.atomic():
+            export = QueryExport.objects.select_for_update().get(id=export_id)
+            if export.status == QueryExportStatus.RUNNING:
+                export.status = status
+                export.save(update_fields=['status', 'timestampmodified'])
+        schedule_exports()
@@ -1,11 +1,15 @@
 import json
+from tempfile import TemporaryFile
 from unittest.mock import patch
 
 from specifyweb.backend.stored_queries.batch_edit import (
     BatchEditPack,
     BatchEditProps,
     RowPlanMap,
+    make_dataset,
     run_batch_edit_query,
+    stream_batch_edit_query,
+    write_dataset_rows,
 )
 
 from specifyweb.backend.stored_queries.queryfield import fields_from_json
@@ -17,7 +21,9 @@ from specifyweb.backend.stored_queries.tests.static import test_plan
 from specifyweb.specify.datamodel import datamodel
 import specifyweb.specify.models as models
 
+from specifyweb.backend.workbench.models import Spdataset
 from specifyweb.backend.workbench.upload.upload_plan_schema import schema
+from specifyweb.backend.workbench.views import regularize_rows
 from jsonschema import validate
 
 from specifyweb.backend.stored_queries.tests.static.co_query_row_plan import row_plan_map
@@ -2343,3 +2349,52 @@ class QueryConstructionTests(SQLAlchemySetup):
 
         self.assertEqual(headers, expected_captions)
         
+
+    @patch(OBJ_FORMATTER_PATH, new=fake_obj_formatter)
+    @patch("specifyweb.backend.stored_queries.batch_edit.DATASET_ROWS_CHUNK_SIZE", new=2)
+    def test_dataset_rows_are_streamed(self):
+        base_table = "collectionobject"
+        query_paths = [
+            ["catalognumber"],
+            ["determinations", "integer1"],
+            ["determinations", "remarks"],
+        ]
+        query_fields = [
+            BatchEditPack._query_field(QueryFieldSpec.from_path((base_table, *path)), 0)
+            for path in query_paths
+        ]
+        for integer1 in (10, 929, 3):
+            models.Determination.objects.create(
+                collectionobject=self.collectionobjects[0], integer1=integer1
+            )
+        models.Determination.objects.create(
+            collectionobject=self.collectionobjects[3], remarks="Some remarks"
+        )
+
+        props = self.build_props(query_fields, base_table)
+        (headers, rows, packs, plan, order) = run_batch_edit_query(props)
+
+        with TemporaryFile() as records, TemporaryFile() as data:
+            result = stream_batch_edit_query(props, records)
+            write_dataset_rows(data, len(result.headers), result.rows)
+            ds_id, _ = make_dataset(
+                user=self.specifyuser,
+                collection=self.collection,
+                name="Streamed",
+                headers=result.headers,
+                data=data,
+                agent=self.agent,
+                json_upload_plan=result.json_upload_plan,
+                visual_order=result.visual_order,
+            )
+
+        self.assertEqual((result.headers, result.json_upload_plan), (headers, plan))
+        expected = regularize_rows(
+            len(headers),
+            [[*row, json.dumps({"batch_edit": pack})] for row, pack in zip(rows, packs)],
+            skip_empty=False,
+        )
+        dataset = Spdataset.objects.get(id=ds_id)
+        self.assertEqual(len(expected), len(self.collectionobjects))
+        self.assertEqual(dataset.data, expected)
+        self.assertEqual(dataset.backer.data, expected)
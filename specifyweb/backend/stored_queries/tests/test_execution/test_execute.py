@@ -437,3 +437,44 @@ class TestExecute(SQLAlchemySetup):
             [row[0] for row in result["results"]],
             [self.collectionobjects[0].id, self.collectionobjects[1].id],
         )
+
+    def test_keyset_pagination(self):
+        self._populate_text1()
+        table, query_fields = make_query_fields_test(
+            "Collectionobject", [["catalognumber"], ["text1"]]
+        )
+        query_fields[1] = query_fields[1]._replace(sort_type=2)
+
+        pages = []
+        cursor = None
+        with TestExecute.test_session_context() as session:
+            while True:
+                page = execute(
+                    session,
+                    self.collection,
+                    self.specifyuser,
+                    table.tableId,
+                    distinct=False,
+                    series=False,
+                    search_synonymy=False,
+                    count_only=False,
+                    field_specs=query_fields,
+                    limit=2,
+                    offset=0,
+                    keyset=True,
+                    cursor=cursor,
+                )
+                pages.append(page["results"])
+                cursor = page["cursor"]
+                if cursor is None:
+                    break
+
+        cos = self.collectionobjects
+        self.assertEqual(
+            pages,
+            [
+                [(cos[3].id, "num-3", "G2"), (cos[4].id, "num-4", "G2")],
+                [(cos[0].id, "num-0", "G1"), (cos[1].id, "num-1", "G1")],
+                [(cos[2].id, "num-2", "G1")],
+            ],
+        )
@@ -0,0 +1,60 @@
+from unittest import TestCase
+
+from specifyweb.backend.stored_queries.series import (
+    count_series,
+    parse_catalog_for_comparing,
+    series_rows,
+)
+
+
+class SeriesTests(TestCase):
+    rows = [
+        ("3:003,1:001,2:002,5:005,6:006,9:009", "Group1"),
+        (None, "Empty"),
+        ("10:A-010,11:A-011,12:B-012", "Group2"),
+    ]
+
+    def test_parse_catalog_for_comparing(self):
+        self.assertEqual((12, '', ''), parse_catalog_for_comparing('012'))
+        self.assertEqual((1234, '', ''), parse_catalog_for_comparing('12-34'))
+        self.assertEqual((12, 'ABC-', ''), parse_catalog_for_comparing('ABC-012'))
+        self.assertEqual((1, 'A', 'x'), parse_catalog_for_comparing('A1.5x'))
+        self.assertEqual((None, 'ABC', ''), parse_catalog_for_comparing('ABC'))
+
+    def test_series_rows(self):
+        self.assertEqual(
+            [
+                ['1,2,3', '001 - 003', 'Group1'],
+                ['5,6', '005 - 006', 'Group1'],
+                ['9', '009', 'Group1'],
+                ['10,11', 'A-010 - A-011', 'Group2'],
+                ['12', 'B-012', 'Group2'],
+            ],
+            series_rows(self.rows),
+        )
+
+    def test_series_rows_page(self):
+        self.assertEqual(
+            [['9', '009', 'Group1'], ['10,11', 'A-010 - A-011', 'Group2']],
+            series_rows(self.rows, limit=2, offset=2),
+        )
+
+    def test_series_rows_stops_at_page_end(self):
+        def rows():
+            yield from self.rows[:1]
+            raise AssertionError('read past the end of the page')
+
+        self.assertEqual(2, len(series_rows(rows(), limit=2)))
+
+    def test_series_rows_descending(self):
+        self.assertEqual(
+            [['12', 'B-012', 'Group2'], ['10,11', 'A-010 - A-011', 'Group2']],
+            series_rows(self.rows, limit=2, sort_type=2),
+        )
+        self.assertEqual(
+            [['1,2,3', '001 - 003', 'Group1']],
+            series_rows(self.rows, limit=2, offset=4, sort_type=2),
+        )
+
+    def test_count_series(self):
+        self.assertEqual(5, count_series(self.rows))
@@ -0,0 +1,88 @@
+from datetime import timedelta
+from unittest.mock import Mock, patch
+
+from django.test import override_settings
+from django.utils import timezone
+
+from specifyweb.specify.tests.test_api import ApiTests
+from specifyweb.backend.notifications.models import Message, QueryExport
+from specifyweb.backend.stored_queries.tasks import (
+    QueryExportStatus,
+    cancel_export,
+    enqueue_export,
+    queue_position,
+)
+
+
+@patch("specifyweb.backend.stored_queries.tasks.export_query")
+class TestExportScheduling(ApiTests):
+
+    def _enqueue(self, n: int) -> list[QueryExport]:
+        with self.captureOnCommitCallbacks(execute=True):
+            exports = [
+                enqueue_export({}, self.collection, self.specifyuser, f"export{i}.csv", 'csv', None)
+                for i in range(n)
+            ]
+        for export in exports:
+            export.refresh_from_db()
+        return exports
+
+    @override_settings(EXPORT_MAX_CONCURRENT=3, EXPORT_MAX_CONCURRENT_PER_USER=1)
+    def test_per_user_limit(self, export_query: Mock):
+        exports = self._enqueue(3)
+
+        self.assertEqual(
+            [QueryExportStatus.RUNNING, QueryExportStatus.QUEUED, QueryExportStatus.QUEUED],
+            [export.status for export in exports],
+        )
+        export_query.apply_async.assert_called_once_with([exports[0].id], task_id=exports[0].taskid)
+        self.assertEqual([None, 0, 1], [queue_position(export) for export in exports])
+
+    @override_settings(EXPORT_MAX_CONCURRENT=2, EXPORT_MAX_CONCURRENT_PER_USER=None)
+    def test_global_limit(self, export_query: Mock):
+        exports = self._enqueue(3)
+
+        self.assertEqual(
+            [QueryExportStatus.RUNNING, QueryExportStatus.RUNNING, QueryExportStatus.QUEUED],
+            [export.status for export in exports],
+        )
+        self.assertEqual(2, export_query.apply_async.call_count)
+
+    @override_settings(EXPORT_MAX_CONCURRENT=3, EXPORT_MAX_CONCURRENT_PER_USER=1)
+    @patch("specifyweb.backend.stored_queries.tasks.app")
+    def test_cancel_starts_next(self, app: Mock, export_query: Mock):
+        running, queued = self._enqueue(2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(cancel_export(running))
+
+        running.refresh_from_db()
+        queued.refresh_from_db()
+        app.control.revoke.assert_called_once_with(running.taskid, terminate=True)
+        self.assertEqual(QueryExportStatus.CANCELLED, running.status)
+        self.assertEqual(QueryExportStatus.RUNNING, queued.status)
+        self.assertFalse(cancel_export(running))
+
+    @override_settings(EXPORT_MAX_CONCURRENT=3, EXPORT_MAX_CONCURRENT_PER_USER=1, EXPORT_RUNNING_TIMEOUT=3600)
+    @patch("specifyweb.backend.stored_queries.tasks.app")
+    def test_stalled_export_is_failed(self, app: Mock, export_query: Mock):
+        [stalled] = self._enqueue(1)
+        # Its worker died without reporting progress for two hours.
+        QueryExport.objects.filter(id=stalled.id).update(
+            timestampmodified=timezone.now() - timedelta(hours=2))
+
+        [queued] = self._enqueue(1)
+
+        stalled.refresh_from_db()
+        self.assertEqual(QueryExportStatus.FAILED, stalled.status)
+        self.assertEqual(QueryExportStatus.RUNNING, queued.status)
+        app.control.revoke.assert_called_once_with(stalled.taskid, terminate=True)
+        self.assertTrue(Message.objects.filter(
+            user=self.specifyuser, content__contains='query-export-to-csv-failed').exists())
+
+    @override_settings(EXPORT_MAX_CONCURRENT=3, EXPORT_MAX_CONCURRENT_PER_USER=1, EXPORT_RUNNING_TIMEOUT=3600)
+    def test_recent_export_is_not_failed(self, export_query: Mock):
+        running, queued = self._enqueue(2)
+
+        self.assertEqual(QueryExportStatus.RUNNING, running.status)
+        self.assertEqual(QueryExportStatus.QUEUED, queued.status)
@@ -5,20 +5,19 @@ from unittest.mock import patch, Mock
 
 class TestExportKML(SQLAlchemySetup):
     
-    @patch("specifyweb.backend.stored_queries.views.Thread")
-    def test_export(self, thread: Mock):
+    @patch("specifyweb.backend.stored_queries.tasks.export_query")
+    def test_export(self, export_query: Mock):
         
         c = Client()
         c.force_login(self.specifyuser)
 
-        response = c.post(
-            f'/stored_query/exportkml/', 
-            get_simple_query(self.specifyuser), 
-            content_type="application/json"
-        )
+        with self.captureOnCommitCallbacks(execute=True):
+            response = c.post(
+                f'/stored_query/exportkml/', 
+                get_simple_query(self.specifyuser), 
+                content_type="application/json"
+            )
 
         self._assertStatusCodeEqual(response, 200)
-        thread.assert_called_once()
-        self.assertTrue(thread.return_value.daemon)
-        thread.return_value.start.assert_called_once()
-        self._assertContentEqual(response, "OK")
\ No newline at end of file
+        export_query.apply_async.assert_called_once()
+        self.assertEqual(response.json()['taskstatus'], 'RUNNING')
\ No newline at end of file
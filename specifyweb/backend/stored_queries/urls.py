@@ -8,6 +8,8 @@ urlpatterns = [
     path('exportcsv/', views.export_csv),
     path('exportkml/', views.export_kml),
     path('exportwebportal/', views.export_to_web_portal),
+    path('export/<str:taskid>/status/', views.export_status),
+    path('export/<str:taskid>/abort/', views.abort_export),
     path('make_recordset/', views.make_recordset),
     path('merge_recordsets/', views.merge_recordsets),
     path('return_loan_preps/', views.return_loan_preps),
@@ -2,10 +2,9 @@ import json
 import logging
 from collections import defaultdict
 from datetime import datetime
-from threading import Thread
 
 from django.http import HttpResponse, HttpResponseBadRequest, \
-    HttpResponseRedirect, JsonResponse, HttpRequest
+    HttpResponseNotFound, HttpResponseRedirect, JsonResponse, HttpRequest
 from django.views.decorators.cache import never_cache
 from django.views.decorators.http import require_POST
 from django.db import transaction
@@ -16,14 +15,17 @@ from specifyweb.backend.stored_queries.batch_edit import run_batch_edit
 from specifyweb.specify.models_utils.models_by_table_id import model_names_by_table_id
 from specifyweb.specify.api.serializers import toJson, uri_for_model
 from . import models
-from .execution import execute, run_ephemeral_query, do_export, recordset
+from .execution import execute, run_ephemeral_query, recordset
+from .pagination import InvalidCursor
+from .tasks import enqueue_export, queue_position, export_progress, cancel_export
 from .queryfield import QueryField
 from specifyweb.backend.permissions.permissions import PermissionTarget, PermissionTargetAction, \
     check_permission_targets, check_table_permissions
 from specifyweb.specify.models import Collection, Recordset, Recordsetitem, \
     Loanreturnpreparation, Loanpreparation, Loan
+from specifyweb.backend.notifications.models import QueryExport
 from specifyweb.specify.views import login_maybe_required
-from .execution import execute, run_ephemeral_query, do_export, recordset, \
+from .execution import execute, run_ephemeral_query, recordset, \
     return_loan_preps as rlp
 
 
@@ -78,10 +80,14 @@ def format_export_file_name(spquery, file_extension = ''):
 def query(request, id):
     """Executes and returns the results of query with id <id>.
     'limit' and 'offset' may be provided as GET parameters.
+    If a 'cursor' GET parameter is provided, even empty, the results are
+    paged by keyset and returned with the cursor of the next page.
     """
     check_permission_targets(request.specify_collection.id, request.specify_user.id, [QueryBuilderPt.execute])
     limit = int(request.GET.get('limit', 20))
     offset = int(request.GET.get('offset', 0))
+    keyset = 'cursor' in request.GET
+    cursor = request.GET.get('cursor') or None
 
     with models.session_context() as session:
         sp_query = session.query(models.SpQuery).get(int(id))
@@ -94,19 +100,24 @@ def query(request, id):
         field_specs = [QueryField.from_spqueryfield(field, value_from_request(field, request.GET))
                        for field in sorted(sp_query.fields, key=lambda field: field.position)]
 
-        data = execute(
-            session=session, 
-            collection=request.specify_collection, 
-            user=request.specify_user,
-            tableid=tableid, 
-            distinct=distinct, 
-            series=series,
-            search_synonymy=search_synonymy,
-            count_only=count_only, 
-            field_specs=field_specs, 
-            limit=limit, 
-            offset=offset
-        )
+        try:
+            data = execute(
+                session=session, 
+                collection=request.specify_collection, 
+                user=request.specify_user,
+                tableid=tableid, 
+                distinct=distinct, 
+                series=series,
+                search_synonymy=search_synonymy,
+                count_only=count_only, 
+                field_specs=field_specs, 
+                limit=limit, 
+                offset=offset,
+                keyset=keyset,
+                cursor=cursor,
+            )
+        except InvalidCursor as e:
+            return HttpResponseBadRequest(str(e))
 
     return HttpResponse(toJson(data), content_type='application/json')
 
@@ -118,7 +129,10 @@ def ephemeral(request):
     """Executes and returns the results of the query provided as JSON in the POST body."""
 
     spquery, collection = get_query(request)
-    data = run_ephemeral_query(collection, request.specify_user, spquery)
+    try:
+        data = run_ephemeral_query(collection, request.specify_user, spquery)
+    except InvalidCursor as e:
+        return HttpResponseBadRequest(str(e))
 
     return HttpResponse(toJson(data), content_type='application/json')
 
@@ -169,10 +183,8 @@ def export_csv(request):
     
     file_name = format_export_file_name(spquery, "csv")
 
-    thread = Thread(target=do_export, args=(spquery, collection, request.specify_user, file_name, 'csv', None))
-    thread.daemon = True
-    thread.start()
-    return HttpResponse('OK', content_type='text/plain')
+    export = enqueue_export(spquery, collection, request.specify_user, file_name, 'csv', None)
+    return export_status_response(export)
 
 @require_POST
 @login_maybe_required
@@ -200,10 +212,8 @@ def export_kml(request):
 
     file_name = format_export_file_name(spquery, "kml")
 
-    thread = Thread(target=do_export, args=(spquery, collection, request.specify_user, file_name, 'kml', the_host))
-    thread.daemon = True
-    thread.start()
-    return HttpResponse('OK', content_type='text/plain')
+    export = enqueue_export(spquery, collection, request.specify_user, file_name, 'kml', the_host)
+    return export_status_response(export)
 
 
 @require_POST
@@ -233,13 +243,44 @@ def export_to_web_portal(request):
 
     file_name = format_export_file_name(spquery, 'zip')
 
-    thread = Thread(
-        target=do_export,
-        args=(spquery, collection, request.specify_user, file_name, 'webportal', None),
-    )
-    thread.daemon = True
-    thread.start()
-    return HttpResponse('OK', content_type='text/plain')
+    export = enqueue_export(spquery, collection, request.specify_user, file_name, 'webportal', None)
+    return export_status_response(export)
+
+def export_status_response(export: QueryExport) -> JsonResponse:
+    status = {
+        'taskid': export.taskid,
+        'taskstatus': export.status,
+        'file': export.filename,
+        'queueposition': queue_position(export),
+        'taskinfo': export_progress(export),
+    }
+    return JsonResponse(status)
+
+@require_GET
+@login_maybe_required
+@never_cache
+def export_status(request, taskid: str):
+    """Returns the status of a query export, its place in the queue while
+    it waits and the number of rows exported while it runs."""
+    try:
+        export = QueryExport.objects.get(taskid=taskid, specifyuser=request.specify_user)
+    except QueryExport.DoesNotExist:
+        return HttpResponseNotFound(f"The query export with task id '{taskid}' was not found")
+    return export_status_response(export)
+
+@require_POST
+@login_maybe_required
+@never_cache
+def abort_export(request, taskid: str):
+    """Cancels a queued or running query export."""
+    try:
+        export = QueryExport.objects.get(taskid=taskid, specifyuser=request.specify_user)
+    except QueryExport.DoesNotExist:
+        return HttpResponseNotFound(f"The query export with task id '{taskid}' was not found")
+
+    if cancel_export(export):
+        return JsonResponse({'type': 'ABORTED', 'message': f'Task {taskid} has been aborted.'})
+    return JsonResponse({'type': 'NOT_RUNNING', 'message': f'Task {taskid} is not running and cannot be aborted'})
 
 @require_POST
 @login_maybe_required
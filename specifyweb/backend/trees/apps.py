@@ -9,6 +9,8 @@ class TreesConfig(AppConfig):
     label = "trees"
 
     def ready(self):
+        # Registers the signal receivers that maintain the statistics.
+        from specifyweb.backend.trees import materialized_stats # noqa: F401
         from specifyweb.backend.trees.redis import ACTIVE_DEFAULT_TREE_TASK_REDIS_KEY
         try:
             # Clear potential leftover tree creation tracking information
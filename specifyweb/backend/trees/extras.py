@@ -1,5 +1,6 @@
 import re
-from contextlib import contextmanager
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
 import logging
 import json
 
@@ -10,25 +11,88 @@ from specifyweb.specify.utils.field_change_info import FieldChangeInfo
 logger = logging.getLogger(__name__)
 
 
-from django.db import models, connection
-from django.db.models import F, Q, ProtectedError
+from django.db import models, connection, transaction
+from django.db.models import F, Q, Max, Min, ProtectedError
 from django.conf import settings
+from redis.exceptions import RedisError
 
 from specifyweb.backend.businessrules.exceptions import TreeBusinessRuleException
 import specifyweb.specify.models as spmodels
 
 from  specifyweb.backend.workbench.upload.auditcodes import TREE_BULK_MOVE, TREE_MERGE, TREE_SYNONYMIZE, TREE_DESYNONYMIZE
 
-@contextmanager
-def validate_node_numbers(table, revalidate_after=True):
+def ensure_tree_numbering(table) -> bool:
+    """Renumbers the tree table if its numbering isn't valid. Returns
+    whether it was renumbered."""
     try:
         validate_tree_numbering(table)
     except AssertionError:
         renumber_tree(table)
+        return True
+    return False
+
+@contextmanager
+def validate_node_numbers(table, revalidate_after=True):
+    ensure_tree_numbering(table)
     yield
     if revalidate_after:
         validate_tree_numbering(table)
 
+class BulkTreeEdit:
+    """Tree nodes saved within bulk_tree_edit. Their node numbers and full
+    names are brought up to date once it exits, for each tree table and
+    definition at once instead of for every node."""
+
+    def __init__(self):
+        self.renumber: set[type] = set()
+        # (model, treedef id) -> (treedef, node ids, whether only null full
+        # names have to be set)
+        self.fullnames: dict[tuple[type, int], tuple[models.Model, set[int], bool]] = {}
+
+    def record(self, node, renumber: bool, fullnames: bool, null_fullnames_only: bool) -> None:
+        model = type(node)
+        if renumber:
+            self.renumber.add(model)
+        if not fullnames:
+            return
+        key = (model, node.definition_id)
+        treedef, ids, null_only = self.fullnames.get(key, (node.definition, set(), True))
+        ids.add(node.id)
+        self.fullnames[key] = (treedef, ids, null_only and null_fullnames_only)
+
+    def apply(self) -> None:
+        for model in self.renumber:
+            renumber_tree(model._meta.db_table)
+        for (model, _), (treedef, ids, null_only) in self.fullnames.items():
+            # Full names only change within the intervals of the saved nodes.
+            numbers = model.objects.filter(id__in=ids).aggregate(
+                low=Min('nodenumber'), high=Max('highestchildnodenumber'))
+            if numbers['low'] is not None and numbers['high'] is not None:
+                set_fullnames(treedef, null_only=null_only, node_number_range=[numbers['low'], numbers['high']])
+        for model in self.renumber:
+            validate_tree_numbering(model._meta.db_table)
+
+_bulk_tree_edit: ContextVar[BulkTreeEdit | None] = ContextVar("bulk_tree_edit", default=None)
+
+@contextmanager
+def bulk_tree_edit():
+    """Defers the node numbering and full names of the tree nodes saved
+    within it until it exits, when each tree table is renumbered once.
+    Node numbers of nodes added or moved within it are not valid until
+    then. Rank rules are still checked by each save. Nothing is applied if
+    it exits with an exception. Nested uses join the outermost one.
+    """
+    if _bulk_tree_edit.get() is not None:
+        yield _bulk_tree_edit.get()
+        return
+    edit = BulkTreeEdit()
+    token = _bulk_tree_edit.set(edit)
+    try:
+        yield edit
+    finally:
+        _bulk_tree_edit.reset(token)
+    edit.apply()
+
 class Tree(models.Model):
     _requires_collection_user = True
     class Meta:
@@ -40,9 +104,16 @@ class Tree(models.Model):
 
         def save():
             save_auto_timestamp_field_with_override(super(Tree, self).save, args, kwargs, self)
+        bulk_edit = _bulk_tree_edit.get()
         # This should be probably after the rank id gets set?
         if skip_tree_extras:
-            return save()
+            save()
+            if bulk_edit is not None and self.nodenumber is None:
+                # New nodes saved without the tree extras still need node
+                # numbers and full names, but the caller is trusted with
+                # their ranks.
+                bulk_edit.record(self, renumber=True, fullnames=True, null_fullnames_only=True)
+            return
 
         model = type(self)
         self.rankid = self.definitionitem.rankid
@@ -67,13 +138,20 @@ class Tree(models.Model):
                 save()
                 return
 
-            with validate_node_numbers(self._meta.db_table, revalidate_after=False):
+            # With gaps in the numbering, nodes are usually placed without
+            # touching the rest of the tree, so the numbering of the whole
+            # table isn't validated for every change. The re-spacing job
+            # validates it instead.
+            with nullcontext() if bulk_edit is not None or node_number_gaps_enabled() else \
+                    validate_node_numbers(self._meta.db_table, revalidate_after=False):
                 adding_node(self, collection, user)
                 save()
         elif prev_self.parent_id != self.parent_id:
-            with validate_node_numbers(self._meta.db_table):
+            with nullcontext() if bulk_edit is not None or node_number_gaps_enabled() else \
+                    validate_node_numbers(self._meta.db_table):
                 moving_node(self)
                 save()
+            _tree_stats_changed(model)
         else:
             save()
 
@@ -113,6 +191,21 @@ class Tree(models.Model):
                     "children": list(self.children.values('id', 'rankid', 'fullname').filter(parent=self, parent__rankid__gte=F('rankid')))
                  }})
 
+        if bulk_edit is not None:
+            # The ranks are still checked for every node above, so a
+            # violation is raised by the save that caused it.
+            bulk_edit.record(
+                self,
+                renumber=prev_self is None or prev_self.parent_id != self.parent_id,
+                fullnames=prev_self is None or (
+                    prev_self.name != self.name
+                    or prev_self.definitionitem_id != self.definitionitem_id
+                    or prev_self.parent_id != self.parent_id
+                ),
+                null_fullnames_only=prev_self is None,
+            )
+            return
+
         if prev_self is None:
             set_fullnames(self.definition, null_only=True, node_number_range=[self.nodenumber, self.highestchildnodenumber])
         elif (
@@ -187,6 +280,89 @@ def open_interval(model, parent_node_number, size):
 
     return parent_node_number + 1
 
+# Largest value the NodeNumber and HighestChildNodeNumber columns can hold.
+MAX_NODE_NUMBER = 2**31 - 1
+
+# A node added under a parent takes this fraction of the parent's free node
+# numbers, leaving the rest for its siblings.
+NEW_NODE_GAP_SHARE = 16
+
+# How long a queued re-spacing of a tree table keeps others from being
+# queued, in case the job is lost.
+RESPACE_TREE_REDIS_TTL = 60 * 60
+
+def node_number_gaps_enabled() -> bool:
+    return bool(getattr(settings, 'TREE_NODE_NUMBER_GAP', None))
+
+def node_number_gap(table) -> int:
+    """The spacing between consecutive node numbers when the tree table is
+    renumbered. It is reduced for big tables so the numbers fit the
+    columns."""
+    gap = getattr(settings, 'TREE_NODE_NUMBER_GAP', None)
+    if not gap:
+        return 1
+    cursor = connection.cursor()
+    cursor.execute(f"select count(*) from {table}")
+    node_count, = cursor.fetchone()
+    return max(1, min(gap, MAX_NODE_NUMBER // (node_count + 1)))
+
+def free_intervals(model, parent) -> list[tuple[int, int]]:
+    """The unused node numbers within the parent's interval, as inclusive
+    ranges: those after the parent's own node number, between its
+    children's intervals and after the last one."""
+    if parent.nodenumber is None or parent.highestchildnodenumber is None:
+        return []
+    children = model.objects.filter(parent_id=parent.id).exclude(nodenumber=None) \
+        .order_by('nodenumber').values_list('nodenumber', 'highestchildnodenumber')
+    intervals = []
+    low = parent.nodenumber + 1
+    for nodenumber, highestchildnodenumber in children:
+        if low < nodenumber:
+            intervals.append((low, nodenumber - 1))
+        low = max(low, (highestchildnodenumber or nodenumber) + 1)
+    if low <= parent.highestchildnodenumber:
+        intervals.append((low, parent.highestchildnodenumber))
+    return intervals
+
+def allocate_in_gap(model, parent, size=None) -> tuple[int, int] | None:
+    """Takes node numbers for a new child of the parent from the parent's
+    unused numbers, without changing any other node. If size is given the
+    range is exactly that size, as for moving an existing interval,
+    otherwise it is a share of the largest unused range. Returns the node
+    number and highest child node number, or None if there is no room.
+    """
+    intervals = free_intervals(model, parent)
+    if size is None:
+        if not intervals:
+            return None
+        low, high = max(intervals, key=lambda interval: interval[1] - interval[0])
+        size = max(1, (high - low + 1) // NEW_NODE_GAP_SHARE)
+    else:
+        fitting = [(low, high) for low, high in intervals if high - low + 1 >= size]
+        if not fitting:
+            return None
+        low, high = fitting[0]
+    # The top of the range is used so the rest stays next to the nodes
+    # before it for further children.
+    return high - size + 1, high
+
+def schedule_respacing(model) -> None:
+    """Queues re-spacing the node numbers of the tree table once the
+    current transaction commits, unless it is queued already."""
+    from specifyweb.backend.cache.redis import set_string
+    from specifyweb.backend.trees.redis import RESPACE_TREE_REDIS_KEY
+    from specifyweb.backend.trees.tasks import respace_tree
+
+    table = model._meta.db_table
+    key = RESPACE_TREE_REDIS_KEY.format(database="{database}", table=table)
+    try:
+        queued = set_string(key, "1", time_to_live=RESPACE_TREE_REDIS_TTL, override_existing=False)
+    except RedisError as e:
+        logger.warning("could not queue re-spacing of %s: %s", table, e)
+        return
+    if queued:
+        transaction.on_commit(lambda: respace_tree.delay(table))
+
 def move_interval(model, old_node_number, old_highest_child_node_number, new_node_number):
     """Adjust the node numbers to move an interval and all of its children
     to a new nodenumber range. There must be a gap of sufficient size
@@ -276,6 +452,22 @@ def adding_node(node,collection=None, user=None):
                     "children": list(parent.children.values('id', 'fullname'))
                  }})
 
+    if _bulk_tree_edit.get() is not None:
+        # Numbered when the bulk edit exits.
+        node.nodenumber = node.highestchildnodenumber = None
+        return
+
+    if node_number_gaps_enabled():
+        interval = allocate_in_gap(model, parent)
+        if interval is None and ensure_tree_numbering(model._meta.db_table):
+            parent.refresh_from_db(fields=['nodenumber', 'highestchildnodenumber'])
+            interval = allocate_in_gap(model, parent)
+        if interval is not None:
+            node.nodenumber, node.highestchildnodenumber = interval
+            return
+        logger.info('no free node numbers under %s', parent)
+        schedule_respacing(model)
+
     insertion_point = open_interval(model, parent.nodenumber, 1)
     node.highestchildnodenumber = node.nodenumber = insertion_point
 
@@ -283,7 +475,6 @@ def moving_node(to_save):
     logger.info('moving node %s', to_save)
     model = type(to_save)
     current = model.objects.get(id=to_save.id)
-    size = current.highestchildnodenumber - current.nodenumber + 1
     new_parent = model.objects.select_for_update().get(id=to_save.parent.id)
     if new_parent.accepted_id is not None:
         raise TreeBusinessRuleException(
@@ -306,6 +497,26 @@ def moving_node(to_save):
                 "children": list(new_parent.children.values('id', 'fullname'))
              }})
 
+    if _bulk_tree_edit.get() is not None:
+        # Renumbered when the bulk edit exits.
+        return
+
+    if node_number_gaps_enabled():
+        if current.nodenumber is None or new_parent.nodenumber is None:
+            ensure_tree_numbering(model._meta.db_table)
+            current = model.objects.get(id=current.id)
+            new_parent.refresh_from_db(fields=['nodenumber', 'highestchildnodenumber'])
+        size = current.highestchildnodenumber - current.nodenumber + 1
+        interval = allocate_in_gap(model, new_parent, size)
+        if interval is not None:
+            # The old interval is left as a gap.
+            move_interval(model, current.nodenumber, current.highestchildnodenumber, interval[0])
+            to_save.nodenumber, to_save.highestchildnodenumber = interval
+            return
+        logger.info('no room for %s under %s', to_save, new_parent)
+        schedule_respacing(model)
+
+    size = current.highestchildnodenumber - current.nodenumber + 1
     insertion_point = open_interval(model, new_parent.nodenumber, size)
     # node interval will have moved if it is to the right of the insertion point
     # so fetch again
@@ -318,6 +529,10 @@ def moving_node(to_save):
     to_save.nodenumber = current.nodenumber
     to_save.highestchildnodenumber = current.highestchildnodenumber
 
+def _tree_stats_changed(model):
+    from specifyweb.backend.trees.materialized_stats import tree_stats_changed
+    tree_stats_changed(model._meta.db_table)
+
 def mutation_log(action, node, agent, parent, dirty_flds: list[FieldChangeInfo]):
     from specifyweb.backend.workbench.upload.auditlog import auditlog
     auditlog.log_action(action, node, agent, node.parent, dirty_flds)
@@ -366,6 +581,7 @@ def merge(node, into, agent):
 
     if children_to_reparent:
         _batch_reparent_children(children_to_reparent, target, model)
+    _tree_stats_changed(model)
 
     for retry in range(100):
         try:
@@ -522,6 +738,7 @@ def synonymize(node, into, agent, user=None, collection=None):
         node.determinations.update(preferredtaxon=target)
         from specifyweb.specify.models import Determination
         Determination.objects.filter(preferredtaxon=node).update(preferredtaxon=target)
+        _tree_stats_changed(model)
 
 def desynonymize(node, agent):
     logger.info('desynonmizing %s', node)
@@ -539,6 +756,7 @@ def desynonymize(node, agent):
 
     if model._meta.db_table == 'taxon':
         node.determinations.update(preferredtaxon=F('taxon'))
+        _tree_stats_changed(model)
 
 EMPTY = "''"
 TRUE = "true"
@@ -835,9 +1053,17 @@ def is_treedef(obj):
         re.search(r"treedef'>$", str(obj.__class__), re.IGNORECASE)
     )
 
-def renumber_tree(table: str) -> None:
+def renumber_tree(table: str, gap: int | None = None) -> None:
+    """Renumbers the nodes of the tree table in preorder, leaving gap - 1
+    unused node numbers after every node. Half of them are within the
+    node's own interval, for its new children, and the rest are left
+    between it and the next node, for moving nodes next to it. The gap is
+    TREE_NODE_NUMBER_GAP (see node_number_gap) by default.
+    """
+    if gap is None:
+        gap = node_number_gap(table)
     cursor = connection.cursor()
-    logger.debug(f"[renumber_tree] running for {table}")
+    logger.debug(f"[renumber_tree] running for {table} with gap {gap}")
 
     # cursor.execute("SET SESSION sql_safe_updates = 0") # might be needed for MariaDB 11, uncomment if updates don't occur
 
@@ -881,11 +1107,11 @@ def renumber_tree(table: str) -> None:
         f"{parent_joins(table, depth)}\n"
         f"  ) ordered\n"
         f") r ON r.id = t.{table}id\n"
-        f"SET t.nodenumber = r.rn,\n"
-        f"    t.highestchildnodenumber = r.rn"
+        f"SET t.nodenumber = r.rn * %(gap)s,\n"
+        f"    t.highestchildnodenumber = r.rn * %(gap)s + (%(gap)s - 1) DIV 2"
     )
-    logger.debug(sql_preorder)
-    cursor.execute(sql_preorder)
+    logger.debug(sql_preorder, {"gap": gap})
+    cursor.execute(sql_preorder, {"gap": gap})
 
     # Compute highestchildnodenumber bottom-up
     sql_ranks = f"SELECT DISTINCT rankid FROM {table} ORDER BY rankid DESC"
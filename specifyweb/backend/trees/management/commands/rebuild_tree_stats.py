@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from specifyweb.backend.trees.materialized_stats import MATERIALIZED_TREES, build_tree_stats
+from specifyweb.specify.models import Collection
+
+
+class Command(BaseCommand):
+    help = 'Builds the materialized tree viewer statistics of the given collections, or of all of them.'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '--tree',
+            default='taxon',
+            choices=sorted(MATERIALIZED_TREES),
+        )
+        parser.add_argument(
+            '--collection',
+            type=int,
+            action='append',
+            dest='collections',
+            help='The id of a collection to build the statistics of. Can be repeated.',
+        )
+
+    def handle(self, *args, **options) -> None:
+        collection_ids = options['collections'] or list(Collection.objects.values_list('id', flat=True))
+        missing = set(collection_ids) - set(
+            Collection.objects.filter(id__in=collection_ids).values_list('id', flat=True))
+        if missing:
+            raise CommandError(f"no collections with ids {sorted(missing)}")
+
+        for collection_id in collection_ids:
+            while not build_tree_stats(options['tree'], collection_id):
+                self.stdout.write(f"collection {collection_id} changed while building, building again")
+            self.stdout.write(f"built {options['tree']} statistics of collection {collection_id}")
@@ -0,0 +1,220 @@
+"""
+Materialized tree viewer statistics.
+
+Counting the records of every child of a tree node through its subtree is
+slow for big trees, so the counts can be kept per node and collection in
+TreeNodeStats. They are built for a collection by the rebuild_tree_stats
+command and kept up to date from then on:
+
+- Saving or deleting a determination recounts the preferred taxa of its
+  collection object once the transaction commits, and adds the difference
+  to the subtree counts of their ancestors.
+- Moving, merging or synonymizing tree nodes marks the statistics of the
+  tree stale, so they aren't served until a background task has rebuilt
+  them.
+
+Only the taxon tree is materialized. The counts of the other trees are
+reached through chains of records (e.g. collection object, collecting
+event, locality) whose changes aren't tracked, so they are counted live.
+"""
+
+import logging
+import threading
+
+from django.db import connection, transaction
+from django.db.models import Count, F
+from django.db.models import signals
+from django.dispatch import receiver
+from django.utils import timezone
+
+from specifyweb.specify.models import Determination, Taxon
+
+from .models import TreeNodeStats, TreeStatsBuild
+
+logger = logging.getLogger(__name__)
+
+MATERIALIZED_TREES = {'taxon': Taxon}
+
+
+def get_materialized_tree_stats(treedef, tree, parentid, collection) -> list[tuple[int, int, int]] | None:
+    """The (id, direct count, subtree count) of the children of the node,
+    like get_tree_stats, or None if the tree's statistics aren't
+    materialized for the collection."""
+    model = MATERIALIZED_TREES.get(tree)
+    if model is None:
+        return None
+    if not TreeStatsBuild.objects.filter(tree=tree, collection_id=collection.id, stale=False).exists():
+        return None
+
+    parentid = None if parentid == 'null' else int(parentid)
+    children = list(model.objects.filter(
+        parent_id=parentid, definition_id=int(treedef)).values_list('id', flat=True))
+    stats = {
+        nodeid: (directcount, subtreecount)
+        for nodeid, directcount, subtreecount in TreeNodeStats.objects.filter(
+            tree=tree, collection_id=collection.id, nodeid__in=children,
+        ).values_list('nodeid', 'directcount', 'subtreecount')
+    }
+    return [(id, *stats.get(id, (0, 0))) for id in children]
+
+
+def build_tree_stats(tree: str, collection_id: int) -> bool:
+    """Counts the statistics of the tree in the collection from scratch.
+    Returns False if they changed while being built, so they are still
+    stale."""
+    assert tree in MATERIALIZED_TREES, f"statistics of the {tree} tree can't be materialized"
+    from specifyweb.backend.trees.extras import ensure_tree_numbering
+
+    with transaction.atomic():
+        build, _ = TreeStatsBuild.objects.select_for_update().get_or_create(
+            tree=tree, collection_id=collection_id)
+        version = build.version
+        ensure_tree_numbering(tree)
+
+        TreeNodeStats.objects.filter(tree=tree, collection_id=collection_id).delete()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+            insert into treenodestats (tree, CollectionID, NodeID, DirectCount, SubtreeCount)
+            select %(tree)s, %(collection_id)s, a.taxonid,
+                   sum(if(a.taxonid = d.taxonid, c.total, 0)), sum(c.total)
+            from (
+                select preferredtaxonid as taxonid, count(*) as total
+                from determination
+                where iscurrent and collectionmemberid = %(collection_id)s
+                and preferredtaxonid is not null
+                group by preferredtaxonid
+            ) c
+            join taxon d on d.taxonid = c.taxonid
+            join taxon a on d.nodenumber between a.nodenumber and a.highestchildnodenumber
+            group by a.taxonid
+            """,
+                {"tree": tree, "collection_id": collection_id},
+            )
+
+        return TreeStatsBuild.objects.filter(id=build.id, version=version).update(
+            stale=False, timestampbuilt=timezone.now()) > 0
+
+
+def tree_stats_changed(tree: str) -> None:
+    """Marks the statistics of the tree stale in every collection and
+    rebuilds them once the current transaction commits."""
+    if tree not in MATERIALIZED_TREES:
+        return
+    builds = TreeStatsBuild.objects.filter(tree=tree)
+    # Builds that are stale already have a rebuild queued, which starts
+    # over when it sees the version change.
+    fresh = list(builds.filter(stale=False).values_list('collection_id', flat=True))
+    builds.update(stale=True, version=F('version') + 1)
+    if fresh:
+        from specifyweb.backend.trees.tasks import rebuild_tree_stats
+        for collection_id in fresh:
+            transaction.on_commit(
+                lambda collection_id=collection_id: rebuild_tree_stats.delay(tree, collection_id))
+
+
+def recount_taxa(pairs: set[tuple[int, int]]) -> None:
+    """Recounts the direct counts of the (collection id, taxon id) pairs and
+    adds the differences to the subtree counts of the taxa and their
+    ancestors."""
+    by_collection: dict[int, set[int]] = {}
+    for collection_id, taxon_id in pairs:
+        if collection_id is not None and taxon_id is not None:
+            by_collection.setdefault(collection_id, set()).add(taxon_id)
+
+    for collection_id, taxon_ids in by_collection.items():
+        with transaction.atomic():
+            # Locking the build orders recounts after a rebuild in progress.
+            build = TreeStatsBuild.objects.select_for_update().filter(
+                tree='taxon', collection_id=collection_id).first()
+            if build is None:
+                continue
+            if build.stale:
+                # Makes a rebuild in progress start over.
+                TreeStatsBuild.objects.filter(id=build.id).update(version=F('version') + 1)
+                continue
+            _recount_taxa(collection_id, taxon_ids)
+
+
+def _recount_taxa(collection_id: int, taxon_ids: set[int]) -> None:
+    counts = dict(
+        Determination.objects.filter(
+            iscurrent=True, collectionmemberid=collection_id, preferredtaxon_id__in=taxon_ids,
+        ).values('preferredtaxon_id').annotate(total=Count('id')).values_list('preferredtaxon_id', 'total')
+    )
+    stored = dict(
+        TreeNodeStats.objects.filter(
+            tree='taxon', collection_id=collection_id, nodeid__in=taxon_ids,
+        ).values_list('nodeid', 'directcount')
+    )
+    stats = TreeNodeStats.objects.filter(tree='taxon', collection_id=collection_id)
+
+    for taxon in Taxon.objects.filter(id__in=taxon_ids).only('id', 'nodenumber', 'definition_id'):
+        difference = counts.get(taxon.id, 0) - stored.get(taxon.id, 0)
+        if difference == 0:
+            continue
+        if taxon.nodenumber is None:
+            tree_stats_changed('taxon')
+            return
+        ancestor_ids = list(Taxon.objects.filter(
+            definition_id=taxon.definition_id,
+            nodenumber__lte=taxon.nodenumber,
+            highestchildnodenumber__gte=taxon.nodenumber,
+        ).values_list('id', flat=True))
+        TreeNodeStats.objects.bulk_create(
+            [TreeNodeStats(tree='taxon', collection_id=collection_id, nodeid=id) for id in ancestor_ids],
+            ignore_conflicts=True,
+        )
+        stats.filter(nodeid=taxon.id).update(directcount=counts.get(taxon.id, 0))
+        stats.filter(nodeid__in=ancestor_ids).update(subtreecount=F('subtreecount') + difference)
+
+
+# The (collection id, taxon id) pairs to recount when the current
+# transaction commits.
+_pending = threading.local()
+
+
+def _recount_after_commit() -> None:
+    pairs, _pending.pairs = _pending.pairs, set()
+    recount_taxa(pairs)
+
+
+def _recount_later(pairs: set[tuple[int, int]]) -> None:
+    if not connection.in_atomic_block:
+        recount_taxa(pairs)
+        return
+    if not any(hook[1] is _recount_after_commit for hook in connection.run_on_commit):
+        _pending.pairs = set()
+        transaction.on_commit(_recount_after_commit)
+    _pending.pairs |= pairs
+
+
+def _taxon_stats_built() -> bool:
+    return TreeStatsBuild.objects.filter(tree='taxon').exists()
+
+
+@receiver(signals.pre_save, sender=Determination)
+def determination_pre_save(sender, instance, **kwargs) -> None:
+    if instance.id is not None and _taxon_stats_built():
+        instance._stats_previous = Determination.objects.filter(id=instance.id) \
+            .values_list('collectionmemberid', 'preferredtaxon_id').first()
+
+
+@receiver(signals.post_save, sender=Determination)
+def determination_saved(sender, instance, **kwargs) -> None:
+    if not _taxon_stats_built():
+        return
+    # Saving a current determination makes the others of its collection
+    # object not current, so all of them are recounted.
+    pairs = set(Determination.objects.filter(collectionobject_id=instance.collectionobject_id)
+                .values_list('collectionmemberid', 'preferredtaxon_id'))
+    previous = getattr(instance, '_stats_previous', None)
+    if previous is not None:
+        pairs.add(previous)
+    _recount_later(pairs)
+
+
+@receiver(signals.post_delete, sender=Determination)
+def determination_deleted(sender, instance, **kwargs) -> None:
+    if _taxon_stats_built():
+        _recount_later({(instance.collectionmemberid, instance.preferredtaxon_id)})
@@ -0,0 +1,52 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('specify', '__first__'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TreeNodeStats',
+            fields=[
+                ('id', models.AutoField(db_column='TreeNodeStatsID', primary_key=True, serialize=False, verbose_name='treenodestatsid')),
+                ('tree', models.CharField(max_length=32)),
+                ('nodeid', models.IntegerField(db_column='NodeID')),
+                ('directcount', models.IntegerField(db_column='DirectCount', default=0)),
+                ('subtreecount', models.IntegerField(db_column='SubtreeCount', default=0)),
+                ('collection', models.ForeignKey(db_column='CollectionID', on_delete=django.db.models.deletion.CASCADE, to='specify.collection')),
+            ],
+            options={
+                'db_table': 'treenodestats',
+            },
+        ),
+        migrations.CreateModel(
+            name='TreeStatsBuild',
+            fields=[
+                ('id', models.AutoField(db_column='TreeStatsBuildID', primary_key=True, serialize=False, verbose_name='treestatsbuildid')),
+                ('tree', models.CharField(max_length=32)),
+                ('stale', models.BooleanField(default=False)),
+                ('version', models.IntegerField(default=0)),
+                ('timestampbuilt', models.DateTimeField(null=True)),
+                ('collection', models.ForeignKey(db_column='CollectionID', on_delete=django.db.models.deletion.CASCADE, to='specify.collection')),
+            ],
+            options={
+                'db_table': 'treestatsbuild',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='treenodestats',
+            constraint=models.UniqueConstraint(fields=('tree', 'collection', 'nodeid'), name='treenodestats_node'),
+        ),
+        migrations.AddConstraint(
+            model_name='treestatsbuild',
+            constraint=models.UniqueConstraint(fields=('tree', 'collection'), name='treestatsbuild_tree'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+from django.db import models
+
+from specifyweb.specify.models import Collection
+
+
+class TreeNodeStats(models.Model):
+    """The number of records counted by the tree viewer for a tree node in
+    a collection, directly at the node and in its subtree. Nodes with
+    nothing counted have no row."""
+    id = models.AutoField('treenodestatsid', primary_key=True, db_column='TreeNodeStatsID')
+    tree = models.CharField(max_length=32)
+    collection = models.ForeignKey(Collection, db_column='CollectionID', on_delete=models.CASCADE)
+    nodeid = models.IntegerField(db_column='NodeID')
+    directcount = models.IntegerField(db_column='DirectCount', default=0)
+    subtreecount = models.IntegerField(db_column='SubtreeCount', default=0)
+
+    class Meta:
+        db_table = 'treenodestats'
+        constraints = [
+            models.UniqueConstraint(fields=['tree', 'collection', 'nodeid'], name='treenodestats_node'),
+        ]
+
+
+class TreeStatsBuild(models.Model):
+    """Marks the tree statistics of a collection as materialized in
+    TreeNodeStats. They are stale, and not served, from a change that
+    couldn't be applied incrementally until they are rebuilt. The version
+    is bumped by every such change."""
+    id = models.AutoField('treestatsbuildid', primary_key=True, db_column='TreeStatsBuildID')
+    tree = models.CharField(max_length=32)
+    collection = models.ForeignKey(Collection, db_column='CollectionID', on_delete=models.CASCADE)
+    stale = models.BooleanField(default=False)
+    version = models.IntegerField(default=0)
+    timestampbuilt = models.DateTimeField(null=True)
+
+    class Meta:
+        db_table = 'treestatsbuild'
+        constraints = [
+            models.UniqueConstraint(fields=['tree', 'collection'], name='treestatsbuild_tree'),
+        ]
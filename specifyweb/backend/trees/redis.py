@@ -1,2 +1,5 @@
 # Used to track active default tree creation tasks
-ACTIVE_DEFAULT_TREE_TASK_REDIS_KEY = "specify:{database}:trees:active_tree_creation"
\ No newline at end of file
+ACTIVE_DEFAULT_TREE_TASK_REDIS_KEY = "specify:{database}:trees:active_tree_creation"
+
+# Tree tables with a queued re-spacing of their node numbers
+RESPACE_TREE_REDIS_KEY = "specify:{database}:trees:respace:{table}"
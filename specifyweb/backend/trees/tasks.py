@@ -0,0 +1,35 @@
+from celery.utils.log import get_task_logger # type: ignore
+
+from django.db import transaction
+
+from specifyweb.celery_tasks import LogErrorsTask, app
+from specifyweb.backend.cache.redis import delete_key
+from specifyweb.backend.trees.extras import renumber_tree, validate_tree_numbering
+from specifyweb.backend.trees.redis import RESPACE_TREE_REDIS_KEY
+
+logger = get_task_logger(__name__)
+
+
+@app.task(base=LogErrorsTask, bind=True)
+def respace_tree(self, table: str) -> None:
+    """Renumbers the tree table with TREE_NODE_NUMBER_GAP unused numbers
+    after every node, once a node couldn't be placed in a gap."""
+    # Cleared first, so gaps used up while this runs queue another run.
+    delete_key(RESPACE_TREE_REDIS_KEY.format(database="{database}", table=table))
+
+    logger.info("re-spacing node numbers of %s", table)
+    with transaction.atomic():
+        renumber_tree(table)
+        validate_tree_numbering(table)
+
+
+@app.task(base=LogErrorsTask, bind=True)
+def rebuild_tree_stats(self, tree: str, collection_id: int) -> None:
+    """Rebuilds the materialized statistics of the tree in the collection
+    after a change that couldn't be applied to them incrementally."""
+    from specifyweb.backend.trees.materialized_stats import build_tree_stats
+
+    logger.info("rebuilding %s statistics of collection %s", tree, collection_id)
+    if not build_tree_stats(tree, collection_id):
+        # Changed while being built.
+        rebuild_tree_stats.delay(tree, collection_id)
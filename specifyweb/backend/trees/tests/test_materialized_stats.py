@@ -0,0 +1,75 @@
+from unittest.mock import patch
+
+from specifyweb.backend.trees.materialized_stats import (
+    build_tree_stats,
+    get_materialized_tree_stats,
+)
+from specifyweb.backend.trees.tests.test_trees import GeographyTree
+from specifyweb.specify.models import Determination, Taxon
+
+
+class TestMaterializedTreeStats(GeographyTree):
+
+    def setUp(self):
+        super().setUp()
+        self.life = Taxon.objects.create(
+            definition=self.taxontreedef,
+            definitionitem=self.taxon_root,
+            name="Life",
+        )
+        self.animalia = self.make_taxontree("Animalia", "Kingdom", parent=self.life)
+        self.plantae = self.make_taxontree("Plantae", "Kingdom", parent=self.life)
+        self.chordata = self.make_taxontree("Chordata", "Phylum", parent=self.animalia)
+
+        for co, taxon in zip(self.collectionobjects, [self.animalia, self.chordata, self.chordata]):
+            Determination.objects.create(collectionobject=co, taxon=taxon, iscurrent=True)
+
+    def _stats(self, parent):
+        return get_materialized_tree_stats(
+            self.taxontreedef.id, "taxon", parent.id, self.collection
+        )
+
+    def test_not_served_until_built(self):
+        self.assertIsNone(self._stats(self.life))
+
+    def test_built_stats(self):
+        self.assertTrue(build_tree_stats("taxon", self.collection.id))
+        self.assertCountEqual(
+            self._stats(self.life),
+            [(self.animalia.id, 1, 3), (self.plantae.id, 0, 0)],
+        )
+        self.assertEqual(self._stats(self.animalia), [(self.chordata.id, 2, 2)])
+
+    def test_determinations_are_counted_incrementally(self):
+        build_tree_stats("taxon", self.collection.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Determination.objects.create(
+                collectionobject=self.collectionobjects[3], taxon=self.plantae, iscurrent=True
+            )
+            # Replaces the current determination of the collection object.
+            Determination.objects.create(
+                collectionobject=self.collectionobjects[0], taxon=self.plantae, iscurrent=True
+            )
+
+        self.assertCountEqual(
+            self._stats(self.life),
+            [(self.animalia.id, 0, 2), (self.plantae.id, 2, 2)],
+        )
+
+    @patch("specifyweb.backend.trees.tasks.rebuild_tree_stats")
+    def test_moving_node_makes_stats_stale(self, rebuild_tree_stats):
+        build_tree_stats("taxon", self.collection.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.chordata.parent = self.plantae
+            self.chordata.save()
+
+        self.assertIsNone(self._stats(self.life))
+        rebuild_tree_stats.delay.assert_called_once_with("taxon", self.collection.id)
+
+        self.assertTrue(build_tree_stats("taxon", self.collection.id))
+        self.assertCountEqual(
+            self._stats(self.life),
+            [(self.animalia.id, 1, 1), (self.plantae.id, 0, 2)],
+        )
@@ -0,0 +1,59 @@
+from unittest.mock import patch
+
+from specifyweb.backend.businessrules.exceptions import TreeBusinessRuleException
+from specifyweb.backend.trees import extras
+from specifyweb.backend.trees.extras import bulk_tree_edit, validate_tree_numbering
+from specifyweb.backend.trees.tests.test_trees import GeographyTree
+from specifyweb.specify.models import Geography
+
+
+class TestBulkTreeEdit(GeographyTree):
+
+    def test_nodes_are_numbered_once(self):
+        with patch.object(extras, "renumber_tree", wraps=extras.renumber_tree) as renumber_tree:
+            with bulk_tree_edit():
+                canada = self.make_geotree("Canada", "Country", parent=self.na)
+                ontario = self.make_geotree("Ontario", "State", parent=canada)
+                self.greeneoh.parent = self.kansas
+                self.greeneoh.save()
+                renumber_tree.assert_not_called()
+
+        renumber_tree.assert_called_once_with("geography")
+        validate_tree_numbering("geography")
+
+        canada.refresh_from_db()
+        ontario.refresh_from_db()
+        self.greeneoh.refresh_from_db()
+        self.kansas.refresh_from_db()
+        self.assertEqual(ontario.fullname, "Ontario")
+        self.assertTrue(canada.nodenumber < ontario.nodenumber <= canada.highestchildnodenumber)
+        self.assertTrue(
+            self.kansas.nodenumber < self.greeneoh.nodenumber <= self.kansas.highestchildnodenumber
+        )
+
+    def test_nested_edits_apply_once(self):
+        with bulk_tree_edit() as outer:
+            with bulk_tree_edit() as inner:
+                canada = self.make_geotree("Canada", "Country", parent=self.na)
+            self.assertIs(inner, outer)
+            canada.refresh_from_db()
+            self.assertIsNone(canada.nodenumber)
+
+        canada.refresh_from_db()
+        self.assertIsNotNone(canada.nodenumber)
+
+    def test_ranks_are_checked_on_save(self):
+        with bulk_tree_edit():
+            # The violation is raised by the save, so a WorkBench upload
+            # reports it for the row that caused it.
+            with self.assertRaises(TreeBusinessRuleException):
+                # A county directly under a city.
+                self.make_geotree("Bad", "County", parent=self.springmo)
+
+    def test_nothing_applied_after_exception(self):
+        with self.assertRaises(ValueError):
+            with bulk_tree_edit():
+                canada = self.make_geotree("Canada", "Country", parent=self.na)
+                raise ValueError()
+
+        self.assertIsNone(Geography.objects.get(id=canada.id).nodenumber)
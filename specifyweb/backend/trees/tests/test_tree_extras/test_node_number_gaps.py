@@ -0,0 +1,67 @@
+from unittest.mock import patch
+
+from django.test import override_settings
+
+from specifyweb.backend.trees.extras import renumber_tree, validate_tree_numbering
+from specifyweb.backend.trees.tests.test_trees import GeographyTree
+from specifyweb.specify.models import Geography
+
+
+@override_settings(TREE_NODE_NUMBER_GAP=100)
+@patch("specifyweb.backend.trees.extras.schedule_respacing")
+class TestNodeNumberGaps(GeographyTree):
+
+    def setUp(self):
+        super().setUp()
+        renumber_tree("geography")
+        self.refresh_all()
+
+    def _numbers(self, exclude=()):
+        return {
+            id: numbers
+            for id, *numbers in Geography.objects.exclude(id__in=exclude)
+            .values_list("id", "nodenumber", "highestchildnodenumber")
+        }
+
+    def test_renumbering_leaves_gaps(self, schedule_respacing):
+        self.assertEqual(self.na.nodenumber - self.earth.nodenumber, 100)
+        self.assertEqual(self.doug.highestchildnodenumber - self.doug.nodenumber, 49)
+        validate_tree_numbering("geography")
+
+    def test_adding_node_uses_gap(self, schedule_respacing):
+        before = self._numbers()
+
+        canada = self.make_geotree("Canada", "Country", parent=self.na)
+        canada.refresh_from_db()
+
+        self.assertEqual(self._numbers(exclude=[canada.id]), before)
+        self.assertGreater(canada.nodenumber, self.na.nodenumber)
+        self.assertLess(canada.highestchildnodenumber, self.usa.nodenumber)
+        schedule_respacing.assert_not_called()
+        validate_tree_numbering("geography")
+
+    def test_moving_node_uses_gap(self, schedule_respacing):
+        before = self._numbers(exclude=[self.greeneoh.id])
+
+        self.greeneoh.parent = self.kansas
+        self.greeneoh.save()
+        self.greeneoh.refresh_from_db()
+
+        self.assertEqual(self._numbers(exclude=[self.greeneoh.id]), before)
+        self.assertGreater(self.greeneoh.nodenumber, self.kansas.nodenumber)
+        self.assertLess(self.greeneoh.highestchildnodenumber, self.doug.nodenumber)
+        schedule_respacing.assert_not_called()
+        validate_tree_numbering("geography")
+
+    def test_full_tree_is_respaced(self, schedule_respacing):
+        renumber_tree("geography", gap=1)
+        self.refresh_all()
+
+        canada = self.make_geotree("Canada", "Country", parent=self.na)
+        canada.refresh_from_db()
+        self.refresh_all()
+
+        self.assertEqual(canada.nodenumber, self.na.nodenumber + 1)
+        self.assertEqual(self.usa.nodenumber, canada.nodenumber + 1)
+        schedule_respacing.assert_called_once_with(Geography)
+        validate_tree_numbering("geography")
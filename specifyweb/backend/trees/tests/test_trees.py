@@ -499,6 +499,39 @@ class TreeViewsTest(SqlTreeSetup):
             ]
             self.assertCountEqual(results, expected)
 
+    def test_paged_rows(self):
+        def page(**kwargs):
+            with TreeViewsTest.test_session_context() as session:
+                set_group_concat_max_len(connection.cursor())
+                rows = get_tree_rows(
+                    self.geographytreedef.id,
+                    "Geography",
+                    self.usa.id,
+                    "name",
+                    False,
+                    False,
+                    'all',
+                    session,
+                    **kwargs,
+                )
+            return [(row[0], row[13]) for row in rows]
+
+        states = [self.ill, self.kansas, self.mo, self.ohio]
+        self.assertEqual(page(limit=2), [(self.ill.id, 1), (self.kansas.id, 1)])
+        self.assertEqual(page(limit=2, after=self.kansas.id), [(self.mo.id, 1), (self.ohio.id, 1)])
+        self.assertEqual(page(limit=2, after=self.ohio.id), [])
+        self.assertEqual(page(), [(state.id, 1) for state in states])
+        self.assertEqual(page(name_prefix="M"), [(self.mo.id, 1)])
+        self.assertEqual(page(name_prefix="%"), [])
+
+    def test_invalid_page_parameters(self):
+        c = Client()
+        c.force_login(self.specifyuser)
+        url = f"/trees/specify_tree/geography/{self.geographytreedef.id}/{self.usa.id}/name/"
+        for params in ({"limit": "ten"}, {"after": "1.5"}, {"limit": "0"}, {"limit": "-1"}):
+            with self.subTest(params=params):
+                self.assertEqual(c.get(url, params).status_code, 400)
+
     def test_taxon_rows_include_author_and_synonyms(self):
         root = self.make_taxontree(
             "Life",
@@ -13,7 +13,7 @@ from sqlalchemy import distinct
 from specifyweb.specify import models as spmodels
 from specifyweb.specify.api.crud import get_object_or_404
 from specifyweb.specify.api.serializers import obj_to_data, toJson
-from sqlalchemy import select, func, distinct, literal
+from sqlalchemy import select, func, distinct, literal, and_, or_
 from sqlalchemy.orm import aliased
 from jsonschema import validate  # type: ignore
 from jsonschema.exceptions import ValidationError  # type: ignore
@@ -31,11 +31,13 @@ from specifyweb.backend.trees.default_tree_files import load_default_tree_json
 from specifyweb.backend.trees.utils import get_search_filters
 from specifyweb.backend.trees.defaults import create_default_tree_task, queue_create_default_tree_task, get_active_create_default_tree_tasks
 from specifyweb.specify.utils.field_change_info import FieldChangeInfo
+from specifyweb.specify.utils.func import Func
 from specifyweb.backend.trees.ranks import tree_rank_count
 from . import extras
 from specifyweb.backend.workbench.upload.auditcodes import TREE_MOVE
 from specifyweb.backend.trees.utils import SPECIFY_TREES, TREE_NAMES
 from specifyweb.backend.trees.stats import get_tree_stats
+from specifyweb.backend.trees.materialized_stats import get_materialized_tree_stats
 
 import logging
 
@@ -46,6 +48,9 @@ TREE_TABLE = Literal['Taxon', 'Storage',
 
 GEO_TREES: tuple[TREE_TABLE, ...] = ('Tectonicunit',)
 
+# Largest page of children tree_view returns.
+TREE_VIEW_MAX_LIMIT = 1000
+
 COMMON_TREES: tuple[TREE_TABLE, ...] = ('Taxon', 'Storage',
                                         'Geography')
 
@@ -80,6 +85,28 @@ def tree_mutation(mutation):
                     "schema": {"type": "number"},
                     "description": "If parameter is present, include the author of the requested node in the response \
                     if the tree is taxon and node's rankid >= paramter value.",
+                },
+                {
+                    "name": "limit",
+                    "in": "query",
+                    "required": False,
+                    "schema": {"type": "integer", "minimum": 1},
+                    "description": "If present, return at most this many nodes, up to 1000, as {\"rows\": [...], \"next\": id}, \
+                    where next is the value of <after> for the following page, or null on the last page.",
+                },
+                {
+                    "name": "after",
+                    "in": "query",
+                    "required": False,
+                    "schema": {"type": "integer"},
+                    "description": "Return the nodes after the node with this id in the sort order.",
+                },
+                {
+                    "name": "nameprefix",
+                    "in": "query",
+                    "required": False,
+                    "schema": {"type": "string"},
+                    "description": "Return only the nodes whose names start with this.",
                 }
             ],
             "responses": {
@@ -167,13 +194,37 @@ def tree_view(request, treedef, tree: TREE_TABLE, parentid, sortfield):
     include_author = request.GET.get('includeauthor', False) and tree == 'taxon'
     include_start_end_periods = request.GET.get('includestartendperiods', False) and tree == 'geologictimeperiod'
     biostrat = request.GET.get('biostrat', 'all')
+    try:
+        limit = Func.maybe(request.GET.get('limit', None), int)
+        after = Func.maybe(request.GET.get('after', None), int)
+    except ValueError:
+        return http.HttpResponseBadRequest("limit and after must be integers")
+    if limit is not None:
+        if limit < 1:
+            return http.HttpResponseBadRequest("limit must be positive")
+        limit = min(limit, TREE_VIEW_MAX_LIMIT)
+    name_prefix = request.GET.get('nameprefix', None)
     with sqlmodels.session_context() as session:
         set_group_concat_max_len(session.connection())
-        results = get_tree_rows(treedef, tree, parentid, sortfield, include_author, include_start_end_periods, biostrat, session)
+        results = get_tree_rows(
+            treedef, tree, parentid, sortfield, include_author, include_start_end_periods, biostrat, session,
+            limit=limit, after=after, name_prefix=name_prefix)
+    if limit is not None:
+        # Paged responses say where the next page starts.
+        results = {
+            "rows": results,
+            "next": results[-1][0] if len(results) == limit else None,
+        }
     return HttpResponse(toJson(results), content_type='application/json')
 
 
-def get_tree_rows(treedef, tree, parentid, sortfield, include_author, include_start_end_periods, biostrat, session):
+def get_tree_rows(treedef, tree, parentid, sortfield, include_author, include_start_end_periods, biostrat, session,
+                  limit=None, after=None, name_prefix=None):
+    """The rows of the children of the node for the tree viewer. If limit
+    is given, only that many are returned, starting after the child whose
+    id is after in the sort order. name_prefix restricts the children to
+    those whose names start with it.
+    """
     tree_table = spmodels.datamodel.get_table(tree)
     parentid = None if parentid == 'null' else int(parentid)
 
@@ -181,9 +232,11 @@ def get_tree_rows(treedef, tree, parentid, sortfield, include_author, include_st
     child    = aliased(node)
     accepted = aliased(node)
     synonym  = aliased(node)
+    previous = aliased(node)
 
     treedef_col = getattr(node, tree_table.name + "TreeDefID")
-    orderby     = getattr(node, tree_table.get_field_strict(sortfield).name)
+    sortfield   = tree_table.get_field_strict(sortfield).name
+    orderby     = getattr(node, sortfield)
 
     cols = [
         node._id.label("id"),
@@ -215,16 +268,6 @@ def get_tree_rows(treedef, tree, parentid, sortfield, include_author, include_st
             if include_start_end_periods
             else literal("NULL")
         ).label("end_uncertainty"),
-        select(func.count(child._id))
-            .where(child.ParentID == node._id)
-            .correlate(node)
-            .scalar_subquery()
-            .label("child_count"),
-        select(group_concat(distinct(synonym.fullName), separator=", "))
-            .where(synonym.AcceptedID == node._id)
-            .correlate(node)
-            .scalar_subquery()
-            .label("synonyms"),
         (
             node.isBioStrat
             if tree == 'geologictimeperiod'
@@ -257,19 +300,59 @@ def get_tree_rows(treedef, tree, parentid, sortfield, include_author, include_st
         .outerjoin(accepted, node.AcceptedID == accepted._id)
         .where(treedef_col == int(treedef))
         .where(node.ParentID == parentid)
-        .order_by(orderby)
+        # The id makes the order total, for paging.
+        .order_by(orderby, node._id)
     )
 
-    return session.execute(query).all()
+    if name_prefix:
+        query = query.where(node.name.startswith(name_prefix, autoescape=True))
+
+    if after is not None:
+        # NULLs sort first.
+        after_value = select(getattr(previous, sortfield)).where(previous._id == after).scalar_subquery()
+        query = query.where(or_(
+            orderby > after_value,
+            and_(orderby.is_not_distinct_from(after_value), node._id > after),
+            and_(after_value.is_(None), orderby.isnot(None)),
+        ))
+
+    if limit is not None:
+        query = query.limit(limit)
+
+    rows = session.execute(query).all()
+    ids = [row.id for row in rows]
+    if not ids:
+        return []
+
+    # Counted for the returned rows only, rather than in subqueries
+    # evaluated for every row.
+    child_counts = dict(session.execute(
+        select(child.ParentID, func.count(child._id))
+        .where(child.ParentID.in_(ids))
+        .group_by(child.ParentID)
+    ).all())
+    synonyms = dict(session.execute(
+        select(synonym.AcceptedID, group_concat(distinct(synonym.fullName), separator=", "))
+        .where(synonym.AcceptedID.in_(ids))
+        .group_by(synonym.AcceptedID)
+    ).all())
+
+    # child_count and synonyms go after end_uncertainty.
+    return [
+        (*row[:13], child_counts.get(row.id, 0), synonyms.get(row.id), *row[13:])
+        for row in rows
+    ]
 
 @login_maybe_required
 @require_GET
 def tree_stats(request, treedef, tree, parentid):
     "Returns tree stats (collection object count) for tree nodes parented by <parentid>."
 
-    using_cte = (tree in ['geography', 'taxon', 'storage'])
-    results = get_tree_stats(
-        treedef, tree, parentid, request.specify_collection, sqlmodels.session_context, using_cte)
+    results = get_materialized_tree_stats(treedef, tree, parentid, request.specify_collection)
+    if results is None:
+        using_cte = (tree in ['geography', 'taxon', 'storage'])
+        results = get_tree_stats(
+            treedef, tree, parentid, request.specify_collection, sqlmodels.session_context, using_cte)
 
     return HttpResponse(toJson(results), content_type="application/json")
 
@@ -0,0 +1,117 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from specifyweb.specify.models import Collection, Agent
+
+from specifyweb.backend.workbench.upload.upload import do_upload
+from specifyweb.backend.workbench.upload.upload_cache import UploadCache
+from specifyweb.backend.workbench.upload.upload_plan_schema import parse_plan
+
+# A Collection Object plan touching the usual to-one chain, so that rows both
+# hit the cache (repeated catalogers) and grow it (new localities and events).
+BENCHMARK_PLAN = dict(
+    baseTableName='Collectionobject',
+    uploadable={'uploadTable': dict(
+        wbcols={'catalognumber': 'Catalog Number'},
+        static={},
+        toOne={
+            'cataloger': {'uploadTable': dict(
+                wbcols={'lastname': 'Cataloger Last Name'},
+                static={'agenttype': 1},
+                toOne={},
+                toMany={},
+            )},
+            'collectingevent': {'uploadTable': dict(
+                wbcols={'stationfieldnumber': 'Field Number'},
+                static={},
+                toOne={
+                    'locality': {'uploadTable': dict(
+                        wbcols={'localityname': 'Locality'},
+                        static={'srclatlongunit': 0},
+                        toOne={},
+                        toMany={},
+                    )},
+                },
+                toMany={},
+            )},
+        },
+        toMany={},
+    )},
+)
+
+
+def synthetic_rows(n_rows: int):
+    for i in range(n_rows):
+        yield {
+            'Catalog Number': f"{i + 1:09d}",
+            'Cataloger Last Name': f"Cataloger {i % 50}",
+            'Field Number': f"FN-{i // 5}",
+            'Locality': f"Locality {i // 10}",
+        }
+
+
+class Command(BaseCommand):
+    help = (
+        'Validate a synthetic Collection Object data set and report the '
+        'per-row upload cost. Nothing is committed to the database.'
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('collection_id', type=int)
+        parser.add_argument('agent_id', type=int)
+        parser.add_argument('--rows', type=int, default=20000)
+        parser.add_argument(
+            '--sample-every',
+            type=int,
+            default=1000,
+            help='Report the average row time for every this many rows.'
+        )
+        parser.add_argument(
+            '--max-cache-entries',
+            type=int,
+            default=None,
+            help='Bound the upload cache to this many entries.'
+        )
+
+    def handle(self, *args, **options) -> None:
+        collection = Collection.objects.get(id=options['collection_id'])
+        agent = Agent.objects.get(id=options['agent_id'])
+        n_rows = options['rows']
+        sample_every = options['sample_every']
+        cache = UploadCache(maxsize=options['max_cache_entries'])
+
+        rows = list(synthetic_rows(n_rows))
+        plan = parse_plan(BENCHMARK_PLAN)
+
+        window_start = [time.perf_counter()]
+
+        def progress(current: int, total: int | None) -> None:
+            if current % sample_every != 0 and current != total:
+                return
+            now = time.perf_counter()
+            window = sample_every if current % sample_every == 0 else current % sample_every
+            self.stdout.write(
+                f"rows {current - window + 1}-{current}: "
+                f"{1000 * (now - window_start[0]) / window:.2f} ms/row, "
+                f"cache entries: {len(cache)}"
+            )
+            window_start[0] = now
+
+        tic = time.perf_counter()
+        results = do_upload(
+            collection,
+            rows,
+            plan,
+            agent.id,
+            no_commit=True,
+            allow_partial=True,
+            progress=progress,
+            cache=cache,
+        )
+        toc = time.perf_counter()
+
+        failures = sum(1 for r in results if r.contains_failure())
+        self.stdout.write(
+            f"validated {len(results)} rows ({failures} failed) in {toc - tic:.1f}s"
+        )
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workbench', '0008_spdataset_rolledback'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='spdataset',
+            name='rowresultcount',
+            field=models.IntegerField(null=True),
+        ),
+        migrations.CreateModel(
+            name='Spdatasetrowresult',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rownumber', models.IntegerField()),
+                ('result', models.JSONField()),
+                ('summary', models.JSONField()),
+                ('spdataset', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='workbench.spdataset')),
+            ],
+            options={
+                'db_table': 'spdatasetrowresult',
+                'unique_together': {('spdataset', 'rownumber')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workbench', '0009_spdatasetrowresult'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='spdataset',
+            name='uploadcheckpoint',
+            field=models.JSONField(null=True),
+        ),
+    ]
@@ -144,7 +144,14 @@ class Spdataset(Dataset):
 
     columns = models.JSONField()
     visualorder = models.JSONField(null=True)
+    # Legacy storage of all row results as a single JSON document. Results
+    # are now stored per row in Spdatasetrowresult, and rowresultcount is the
+    # number of rows they were produced for (None if there are no results).
     rowresults = models.TextField(null=True)
+    rowresultcount = models.IntegerField(null=True)
+    # Progress of an upload or unupload done in chunks, each committed on
+    # its own. See upload.chunked.
+    uploadcheckpoint = models.JSONField(null=True)
 
     isupdate = models.BooleanField(default=False, null=True)
     rolledback = models.BooleanField(default=False, null=True)
@@ -164,7 +171,14 @@ class Spdataset(Dataset):
             {
                 "columns": self.columns,
                 "visualorder": self.visualorder,
-                "rowresults": self.rowresults and json.loads(self.rowresults),
+                "hasrowresults": self.has_row_results(),
+                "uploadcheckpoint": Func.maybe(
+                    self.uploadcheckpoint,
+                    lambda checkpoint: {
+                        "operation": checkpoint["operation"],
+                        "row": checkpoint["row"],
+                    },
+                ),
                 "isupdate": self.isupdate == True,
                 "rolledback": self.rolledback == True,
             }
@@ -172,7 +186,176 @@ class Spdataset(Dataset):
         return ds_dict
 
     def was_uploaded(self) -> bool:
-        return self.uploadresult and self.uploadresult["success"]
+        """Whether the rows of the dataset were uploaded, or some of them are by
+        an upload in chunks that hasn't finished or been rolled back."""
+        return (
+            self.uploadresult and self.uploadresult["success"]
+        ) or self.uploadcheckpoint is not None
+
+    def has_row_results(self) -> bool:
+        return self.rowresultcount is not None or self.rowresults is not None
+
+    def get_row_results(self, start: int = 0, end: int | None = None) -> list[dict | None] | None:
+        """Returns the row results of rows [start, end).
+
+        Rows whose result has been invalidated are None.
+        """
+        if self.rowresultcount is None:
+            return None if self.rowresults is None else json.loads(self.rowresults)[start:end]
+
+        end = self.rowresultcount if end is None else min(end, self.rowresultcount)
+        if start >= end:
+            return []
+        results: list[dict | None] = [None] * (end - start)
+        stored = Spdatasetrowresult.objects.filter(
+            spdataset=self, rownumber__gte=start, rownumber__lt=end
+        ).values_list("rownumber", "result")
+        for rownumber, result in stored.iterator():
+            results[rownumber - start] = result
+        return results
+
+    def get_row_results_summary(self) -> dict | None:
+        """Counts failed rows and record results per table over all rows."""
+        if not self.has_row_results():
+            return None
+        if self.rowresultcount is None:
+            from .upload.upload_result import UploadResult
+            summaries = [
+                UploadResult.from_json(result).summary()
+                for result in json.loads(self.rowresults)
+            ]
+            rows = len(summaries)
+        else:
+            summaries = list(
+                Spdatasetrowresult.objects.filter(spdataset=self)
+                .values_list("summary", flat=True)
+                .iterator()
+            )
+            rows = self.rowresultcount
+
+        records: dict[str, dict[str, int]] = {}
+        for summary in summaries:
+            for result_type, tables in summary["records"].items():
+                counts = records.setdefault(result_type, {})
+                for table, count in tables.items():
+                    counts[table] = counts.get(table, 0) + count
+        return {
+            "rows": rows,
+            "resultRows": len(summaries),
+            "failedRows": sum(1 for summary in summaries if summary["failure"]),
+            "records": records,
+        }
+
+    def set_row_results(self, results) -> None:
+        """Replaces the stored row results with the given UploadResults.
+
+        The dataset itself still needs to be saved with the "rowresults" and
+        "rowresultcount" fields.
+        """
+        self.clear_row_results()
+        self.add_row_results(0, results)
+
+    def add_row_results(self, start: int, results) -> None:
+        """Stores the UploadResults of the rows from start on, after those already stored.
+
+        The dataset itself still needs to be saved with the "rowresultcount" field.
+        """
+        Spdatasetrowresult.objects.bulk_create(
+            (
+                Spdatasetrowresult(
+                    spdataset=self,
+                    rownumber=rownumber,
+                    result=result.to_json(),
+                    summary=result.summary(),
+                )
+                for rownumber, result in enumerate(results, start)
+            ),
+            batch_size=ROW_RESULT_BATCH_SIZE,
+        )
+        self.rowresultcount = start + len(results)
+
+    def remap_row_results(self, origins: list[int | None], previous_row_count: int) -> None:
+        """Keeps the results of the rows that were moved but not changed by an edit.
+
+        origins[i] is the index row i had before the edit, or None if it is a
+        new or changed row. Results of other rows are dropped. The dataset
+        itself still needs to be saved with the "rowresults" and
+        "rowresultcount" fields.
+        """
+        if self.rowresultcount is None:
+            if self.rowresults is None:
+                return
+            from .upload.upload_result import UploadResult
+            self.set_row_results(
+                [UploadResult.from_json(result) for result in json.loads(self.rowresults)]
+            )
+
+        count = self.rowresultcount
+        moves = {
+            old: new
+            for new, old in enumerate(origins)
+            if old is not None and old < count
+        }
+        stored = Spdatasetrowresult.objects.filter(spdataset=self)
+
+        dropped = sorted(set(range(count)) - moves.keys())
+        for start, end, _ in _contiguous_ranges(dropped, [None] * len(dropped)):
+            stored.filter(rownumber__gte=start, rownumber__lt=end).delete()
+
+        # Rows are moved through negative row numbers so no two rows ever
+        # have the same number.
+        moved = sorted(old for old, new in moves.items() if old != new)
+        deltas = [moves[old] - old for old in moved]
+        for start, end, delta in _contiguous_ranges(moved, deltas):
+            stored.filter(rownumber__gte=start, rownumber__lt=end).update(
+                rownumber=-(models.F("rownumber") + delta) - 1
+            )
+        if moved:
+            stored.filter(rownumber__lt=0).update(rownumber=-models.F("rownumber") - 1)
+
+        self.rowresults = None
+        if count >= previous_row_count:
+            # Every row had a result, so the rows without one are to be validated.
+            self.rowresultcount = len(origins)
+        else:
+            # Validation stopped early. Rows after the last result weren't reached.
+            self.rowresultcount = max(moves.values(), default=-1) + 1
+
+    def clear_row_results(self) -> None:
+        stored = Spdatasetrowresult.objects.filter(spdataset=self)
+        stored._raw_delete(stored.db)
+        self.rowresults = None
+        self.rowresultcount = None
+
+
+ROW_RESULT_BATCH_SIZE = 1000
+
+
+def _contiguous_ranges(numbers: list[int], keys: list):
+    """Yields (start, end, key) for each run of consecutive numbers with equal keys."""
+    start = None
+    for i, (number, key) in enumerate(zip(numbers, keys)):
+        if start is None:
+            start, start_key = number, key
+        elif number != numbers[i - 1] + 1 or key != start_key:
+            yield start, numbers[i - 1] + 1, start_key
+            start, start_key = number, key
+    if start is not None:
+        yield start, numbers[-1] + 1, start_key
+
+
+class Spdatasetrowresult(models.Model):
+    spdataset = models.ForeignKey(
+        Spdataset, on_delete=models.CASCADE, related_name="+"
+    )
+    rownumber = models.IntegerField()
+    result = models.JSONField()
+    # See UploadResult.summary()
+    summary = models.JSONField()
+
+    class Meta:
+        db_table = "spdatasetrowresult"
+        unique_together = (("spdataset", "rownumber"),)
 
 class Spdatasetattachment(models.Model):
     specify_model = datamodel.get_table_strict('spdatasetattachment')
@@ -0,0 +1,118 @@
+"""
+Sparse edits of the rows of a data set.
+
+Rather than replacing all the rows, a client sends a list of operations
+that are applied in order, each one seeing the rows as left by the
+previous ones:
+
+    {"op": "update", "row": 3, "cells": {"0": "123", "4": ""}}
+    {"op": "insert", "row": 10, "rows": [["a", "b"], ["c", "d"]]}
+    {"op": "delete", "row": 20, "count": 5}
+
+Along with the edited rows, apply_row_edits returns where every resulting
+row came from, so that the validation results of rows that were only moved
+can be kept.
+"""
+
+schema = {
+    "title": "Specify 7 Workbench Row Edits",
+    "$schema": "http://json-schema.org/schema#",
+    "type": "array",
+    "items": {
+        "oneOf": [
+            {
+                "type": "object",
+                "description": "Sets the given cells of a row. The keys are column indexes. "
+                "The index after the last column is the hidden column with extra row info.",
+                "properties": {
+                    "op": {"const": "update"},
+                    "row": {"type": "integer", "minimum": 0},
+                    "cells": {
+                        "type": "object",
+                        "additionalProperties": {"type": ["string", "number", "null"]},
+                    },
+                },
+                "required": ["op", "row", "cells"],
+                "additionalProperties": False,
+            },
+            {
+                "type": "object",
+                "description": "Inserts rows before the given row.",
+                "properties": {
+                    "op": {"const": "insert"},
+                    "row": {"type": "integer", "minimum": 0},
+                    "rows": {"type": "array", "items": {"type": "array"}},
+                },
+                "required": ["op", "row", "rows"],
+                "additionalProperties": False,
+            },
+            {
+                "type": "object",
+                "description": "Deletes count rows starting at the given row.",
+                "properties": {
+                    "op": {"const": "delete"},
+                    "row": {"type": "integer", "minimum": 0},
+                    "count": {"type": "integer", "minimum": 1},
+                },
+                "required": ["op", "row"],
+                "additionalProperties": False,
+            },
+        ]
+    },
+}
+
+
+class RowEditError(ValueError):
+    pass
+
+
+def apply_row_edits(
+    rows: list[list[str]],
+    ncols: int,
+    edits: list[dict],
+    skip_empty: bool = True,
+) -> list[int | None]:
+    """Applies the edits to rows in place.
+
+    Returns, for every resulting row, the index it had before the edits, or
+    None if it was inserted or any of its cells changed. Inserted rows are
+    regularized like the rows of a PUT.
+    """
+    from .views import regularize_rows
+
+    origins: list[int | None] = list(range(len(rows)))
+
+    for edit in edits:
+        index = edit["row"]
+        op = edit["op"]
+        if op == "insert":
+            if index > len(rows):
+                raise RowEditError(f"cannot insert at row {index} of {len(rows)}")
+            inserted = regularize_rows(ncols, edit["rows"], skip_empty=skip_empty)
+            rows[index:index] = inserted
+            origins[index:index] = [None] * len(inserted)
+            continue
+
+        count = edit.get("count", 1) if op == "delete" else 1
+        if index + count > len(rows):
+            raise RowEditError(f"row {index + count - 1} is out of range")
+
+        if op == "delete":
+            del rows[index : index + count]
+            del origins[index : index + count]
+            continue
+
+        row = rows[index]
+        for column, value in edit["cells"].items():
+            try:
+                column = int(column)
+            except ValueError:
+                raise RowEditError(f"invalid column {column!r}")
+            if not 0 <= column <= ncols:
+                raise RowEditError(f"column {column} is out of range")
+            cell = "" if value is None else str(value).strip()
+            if row[column] != cell:
+                row[column] = cell
+                origins[index] = None
+
+    return origins
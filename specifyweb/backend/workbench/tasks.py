@@ -1,6 +1,7 @@
-from celery import Task # type: ignore
+from celery import Task, chord # type: ignore
 from celery.utils.log import get_task_logger # type: ignore
 
+from django.conf import settings
 from django.db import transaction
 
 from specifyweb.specify.models import Collection, Agent
@@ -8,11 +9,36 @@ from specifyweb.celery_tasks import LogErrorsTask, app
 
 from .models import Spdataset
 
+from .upload.auditlog import auditlog
 from .upload.upload import do_upload_dataset, rollback_batch_edit, unupload_dataset
+from .upload.chunked import upload_chunk_size, upload_dataset_in_chunks, unupload_dataset_in_chunks
+from .upload.upload_result import UploadResult
+from .upload.sharding import shard_ranges, validate_shard, merge_shard_results
 
 logger = get_task_logger(__name__)
 
 
+def is_assigned(ds: Spdataset, task: Task | None, operation: str) -> bool:
+    if task is None:
+        return True
+
+    if ds.uploaderstatus is None:
+        logger.info("dataset is not assigned to an upload task")
+        return False
+
+    if ds.uploaderstatus['taskid'] != task.request.id:
+        logger.info("dataset is not assigned to this task")
+        return False
+
+    if not (ds.uploaderstatus['operation'] == operation): raise AssertionError(
+        f"Invalid status '{ds.uploaderstatus['operation']}' for {operation}. Expected '{operation}'",
+        {"uploadStatus" : ds.uploaderstatus['operation'],
+        "operation" : "unupload" if operation == "unuploading" else "upload",
+        "expectedUploadStatus" : operation,
+        "localizationKey" : "invalidUploadStatus"})
+
+    return True
+
 def upload_data(
     collection_id: int,
     uploading_agent_id: int,
@@ -22,30 +48,33 @@ def upload_data(
     task: Task | None=None,
     progress=None,
 ) -> None:
+    operation = "validating" if no_commit else "uploading"
     with transaction.atomic():
         ds = Spdataset.objects.select_for_update().get(id=ds_id)
         collection = Collection.objects.get(id=collection_id)
 
-        if task is not None:
-            if ds.uploaderstatus is None:
-                logger.info("dataset is not assigned to an upload task")
-                return
-
-            if ds.uploaderstatus['taskid'] != task.request.id:
-                logger.info("dataset is not assigned to this task")
-                return
+        if not is_assigned(ds, task, operation):
+            return
 
-            if not (ds.uploaderstatus['operation'] == ("validating" if no_commit else "uploading")): raise AssertionError(
-                f"Invalid status '{ds.uploaderstatus['operation']}' for upload. Expected 'validating' or 'uploading'",
-                {"uploadStatus" : ds.uploaderstatus['operation'],
-                "operation" : "upload",
-                "expectedUploadStatus" : 'validating , uploading',
-                "localizationKey" : "invalidUploadStatus"})
+        chunk_size = upload_chunk_size(ds, no_commit)
+        if chunk_size is None:
+            do_upload_dataset(collection, uploading_agent_id, ds, no_commit, allow_partial, progress)
 
-        do_upload_dataset(collection, uploading_agent_id, ds, no_commit, allow_partial, progress)
+            ds.uploaderstatus = None
+            ds.save(update_fields=['uploaderstatus'])
+            return
 
-        ds.uploaderstatus = None
-        ds.save(update_fields=['uploaderstatus'])
+    # Every chunk is committed on its own, so the dataset isn't kept locked.
+    finished = upload_dataset_in_chunks(
+        collection, uploading_agent_id, ds_id, chunk_size, progress,
+        lambda ds: is_assigned(ds, task, operation),
+    )
+    if finished:
+        with transaction.atomic():
+            ds = Spdataset.objects.select_for_update().get(id=ds_id)
+            if is_assigned(ds, task, operation):
+                ds.uploaderstatus = None
+                ds.save(update_fields=['uploaderstatus'])
 
 @app.task(base=LogErrorsTask, bind=True)
 def upload(self, collection_id: int, uploading_agent_id: int, ds_id: int, no_commit: bool, allow_partial: bool) -> None:
@@ -68,26 +97,133 @@ def unupload(self, collection_id: int, ds_id: int, agent_id: int) -> None:
         agent = Agent.objects.get(id=agent_id)
         collection = Collection.objects.get(id=collection_id)
 
-        if ds.uploaderstatus is None:
-            logger.info("dataset is not assigned to an upload task")
+        if not is_assigned(ds, self, "unuploading"):
             return
 
-        if ds.uploaderstatus['taskid'] != self.request.id:
-            logger.info("dataset is not assigned to this task")
+        chunk_size = upload_chunk_size(ds, no_commit=False)
+        if chunk_size is None:
+            if ds.isupdate:
+                rollback_batch_edit(ds, collection, agent, progress)
+            else:
+                unupload_dataset(ds, agent, progress)
+
+            ds.uploaderstatus = None
+            ds.rolledback = True
+            ds.save(update_fields=['uploaderstatus', 'rolledback'])
             return
 
-        if not (ds.uploaderstatus['operation'] == "unuploading"): raise AssertionError(
-            f"Invalid status '{ds.uploaderstatus['operation']}' for unupload. Expected 'unuploading'",
-            {"uploadStatus" : ds.uploaderstatus['operation'],
-             "operation" : "unupload",
-             "expectedUploadStatus" : "unuoloading",
-             "localizationKey" : "invalidUploadStatus"})
+    finished = unupload_dataset_in_chunks(
+        ds_id, agent, chunk_size, progress,
+        lambda ds: is_assigned(ds, self, "unuploading"),
+    )
+    if finished:
+        with transaction.atomic():
+            ds = Spdataset.objects.select_for_update().get(id=ds_id)
+            if is_assigned(ds, self, "unuploading"):
+                ds.uploadresult = None
+                ds.uploaderstatus = None
+                ds.rolledback = True
+                ds.save(update_fields=['uploadresult', 'uploaderstatus', 'rolledback'])
+
+def start_sharded_validation(
+    collection_id: int,
+    uploading_agent_id: int,
+    ds: Spdataset,
+    allow_partial: bool,
+    n_shards: int,
+    taskid: str,
+) -> None:
+    """Validates ds split into row ranges by several workers.
+
+    The merge task gets `taskid`, so the dataset's uploaderstatus points at
+    the task that finishes the validation. The shards are recorded there
+    too, to report their combined progress and to abort them.
+    """
+    ranges = shard_ranges(len(ds.data), n_shards)
+    shards = [
+        validate_dataset_shard.s(
+            collection_id, uploading_agent_id, ds.id, start, end, allow_partial, taskid
+        ).set(task_id=f"{taskid}-{i}")
+        for i, (start, end) in enumerate(ranges)
+    ]
+    ds.clear_row_results()
+    ds.uploadresult = None
+    ds.uploaderstatus = {
+        'operation': "validating",
+        'taskid': taskid,
+        'shards': [
+            {'taskid': f"{taskid}-{i}", 'start': start, 'end': end}
+            for i, (start, end) in enumerate(ranges)
+        ],
+    }
+    ds.save(update_fields=['rowresults', 'rowresultcount', 'uploadresult', 'uploaderstatus'])
+
+    # The shards check the uploaderstatus saved above, so they can only
+    # start once it is committed.
+    def dispatch() -> None:
+        chord(shards)(
+            merge_validation_shards.s(
+                collection_id, uploading_agent_id, ds.id, ranges, allow_partial
+            ).set(task_id=taskid)
+        )
+
+    transaction.on_commit(dispatch)
+
+@app.task(base=LogErrorsTask, bind=True)
+def validate_dataset_shard(self, collection_id: int, uploading_agent_id: int, ds_id: int, start: int, end: int, allow_partial: bool, merge_taskid: str) -> list[dict]:
+
+    def progress(current: int, total: int | None) -> None:
+        if not self.request.called_directly:
+            self.update_state(state='PROGRESS', meta={'current': current, 'total': total})
+
+    ds = Spdataset.objects.get(id=ds_id)
+    if ds.uploaderstatus is None or ds.uploaderstatus['taskid'] != merge_taskid:
+        logger.info("dataset is not assigned to this validation")
+        return []
+
+    collection = Collection.objects.get(id=collection_id)
+    results = validate_shard(collection, uploading_agent_id, ds, start, end, allow_partial, progress)
+    return [r.to_json() for r in results]
+
+@app.task(base=LogErrorsTask, bind=True)
+def merge_validation_shards(self, shard_results: list[list[dict]], collection_id: int, uploading_agent_id: int, ds_id: int, ranges: list[list[int]], allow_partial: bool) -> None:
 
-        if ds.isupdate:
-            rollback_batch_edit(ds, collection, agent, progress)
-        else:
-            unupload_dataset(ds, agent, progress)
+    def progress(current: int, total: int | None) -> None:
+        if not self.request.called_directly:
+            self.update_state(state='PROGRESS', meta={'current': current, 'total': total})
+
+    with transaction.atomic():
+        ds = Spdataset.objects.select_for_update().get(id=ds_id)
+        collection = Collection.objects.get(id=collection_id)
 
+        if ds.uploaderstatus is None or ds.uploaderstatus['taskid'] != self.request.id:
+            logger.info("dataset is not assigned to this task")
+            return
+
+        results = merge_shard_results(
+            collection,
+            uploading_agent_id,
+            ds,
+            [(start, end) for start, end in ranges],
+            [[UploadResult.from_json(r) for r in shard] for shard in shard_results],
+            allow_partial,
+            progress,
+        )
+
+        ds.set_row_results(results)
         ds.uploaderstatus = None
-        ds.rolledback = True
-        ds.save(update_fields=['uploaderstatus', 'rolledback'])
\ No newline at end of file
+        ds.save(update_fields=['rowresults', 'rowresultcount', 'uploaderstatus'])
+
+@app.task(base=LogErrorsTask, bind=True)
+def purge_audit_log(self) -> dict[str, int]:
+    """Deletes the expired audit log entries in chunks."""
+
+    def progress(current: int, total: int | None) -> None:
+        if not self.request.called_directly:
+            self.update_state(state='PROGRESS', meta={'current': current, 'total': total})
+
+    return auditlog.purge(
+        chunk_size=getattr(settings, 'AUDIT_LOG_PURGE_CHUNK_SIZE', 5000),
+        pause=getattr(settings, 'AUDIT_LOG_PURGE_PAUSE', 0.5),
+        progress=progress,
+    )
@@ -112,15 +112,34 @@ class DataSetTests(ApiTests):
         dataset = Spdataset.objects.get(id=dataset_id)
         self.assertIsNone(dataset.uploaderstatus)
         self.assertIsNone(dataset.uploadresult)
-        self.assertIsNotNone(dataset.rowresults)
+        self.assertTrue(dataset.has_row_results())
 
         validation_results = [
             UploadResult.from_json(result)
-            for result in json.loads(dataset.rowresults or "[]")
+            for result in dataset.get_row_results() or []
         ]
         self.assertEqual(len(validation_results), 1)
         self.assertFalse(validation_results[0].contains_failure())
 
+        response = client.get(
+            f"/api/workbench/upload_results/{dataset_id}/", {"offset": 1, "limit": 10}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), [])
+
+        response = client.get(f"/api/workbench/upload_results_summary/{dataset_id}/")
+        self.assertEqual(response.status_code, 200)
+        summary = json.loads(response.content)
+        self.assertEqual(summary["rows"], 1)
+        self.assertEqual(summary["failedRows"], 0)
+        self.assertEqual(sum(summary["records"]["Uploaded"].values()), 1)
+
+        response = client.get(f"/api/workbench/dataset/{dataset_id}/")
+        self.assertEqual(response.status_code, 200)
+        dataset_dict = json.loads(response.content)
+        self.assertTrue(dataset_dict["hasrowresults"])
+        self.assertNotIn("rowresults", dataset_dict)
+
         self.assertFalse(
             Collectionobject.objects.filter(
                 collection=self.collection,
@@ -240,6 +259,84 @@ class DataSetTests(ApiTests):
         )
         self.assertEqual(dataset["uploadplan"], uploadplan)
 
+    def test_patch_rows_keeps_unchanged_row_results(self) -> None:
+        client = Client()
+        client.force_login(self.specifyuser)
+
+        response = client.post(
+            "/api/workbench/dataset/",
+            data={
+                "name": "Patched data set",
+                "columns": ["Catalog Number"],
+                "rows": [["900000001"], ["900000002"], ["900000003"], ["900000004"]],
+                "importedfilename": "patch.csv",
+            },
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 201)
+        dataset_id = json.loads(response.content)["id"]
+
+        response = client.put(
+            f"/api/workbench/dataset/{dataset_id}/",
+            data={
+                "uploadplan": {
+                    "baseTableName": "collectionobject",
+                    "uploadable": {
+                        "uploadTable": {
+                            "wbcols": {"catalognumber": "Catalog Number"},
+                            "static": {},
+                            "toOne": {},
+                            "toMany": {},
+                        }
+                    },
+                },
+            },
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 204)
+
+        response = client.post(
+            f"/api/workbench/validate/{dataset_id}/",
+            data={"background": False},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        before = Spdataset.objects.get(id=dataset_id).get_row_results()
+
+        response = client.patch(
+            f"/api/workbench/rows/{dataset_id}/",
+            data=[
+                {"op": "delete", "row": 0},
+                {"op": "update", "row": 0, "cells": {"0": "900000012"}},
+                {"op": "update", "row": 1, "cells": {"0": "900000003"}},
+                {"op": "insert", "row": 3, "rows": [["900000005"], [""]]},
+            ],
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 204)
+
+        dataset = Spdataset.objects.get(id=dataset_id)
+        self.assertEqual(
+            dataset.data,
+            [["900000012", ""], ["900000003", ""], ["900000004", ""], ["900000005", ""]],
+        )
+        self.assertEqual(
+            dataset.get_row_results(), [None, before[2], before[3], None]
+        )
+
+        response = client.get(
+            f"/api/workbench/rows/{dataset_id}/", {"offset": 1, "limit": 2}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), dataset.data[1:3])
+
+        response = client.patch(
+            f"/api/workbench/rows/{dataset_id}/",
+            data=[{"op": "delete", "row": 3, "count": 2}],
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+
 class ChangeOwnershipTests(ApiTests):
     def setUp(self) -> None:
         super().setUp()
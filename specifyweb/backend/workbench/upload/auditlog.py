@@ -7,11 +7,15 @@ from specifyweb.specify.utils.field_change_info import FieldChangeInfo
 logger = logging.getLogger(__name__)
 import re
 
-from time import time
-from typing import Iterable
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import sleep, time
+from collections.abc import Callable
+from typing import Iterable, NamedTuple
 
-from django.db import connection
+from django.db import connection, transaction
 from django.conf import settings
+from redis.exceptions import RedisError
 
 from specifyweb.specify.models import Spauditlog, Spauditlogfield
 from specifyweb.specify.models import datamodel
@@ -36,6 +40,116 @@ def truncate_str_to_bytes(string: str, max_length: int) -> str:
     except UnicodeDecodeError as err:
         return str_as_bytes[:err.start].decode()
 
+# Set while a purge of the audit log is queued or was recently run
+PURGE_AUDIT_LOG_REDIS_KEY = "specify:{database}:auditlog:purge"
+
+class AuditLogBufferMark(NamedTuple):
+    flushes: int
+    size: int
+
+class AuditLogBuffer:
+    """Audit log entries waiting to be inserted together. Entries are
+    written in the current transaction when flushed, so flushed entries
+    are rolled back along with it. Only the outermost buffered_audit_log
+    flushes, so entries are never written inside the savepoint of a nested
+    block, where rolling it back would also drop the entries of others.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.entries: list[tuple[Spauditlog, list[Spauditlogfield]]] = []
+        self.flushes = 0
+        # The number of nested buffered_audit_log blocks active.
+        self.nested = 0
+
+    def add(self, log: Spauditlog) -> None:
+        # Flushing before adding keeps each log with its fields.
+        if self.nested == 0:
+            self.flush_if_full()
+        self.entries.append((log, []))
+
+    def add_field(self, log: Spauditlog, field: Spauditlogfield) -> None:
+        entry_log, fields = self.entries[-1]
+        assert entry_log is log, "audit log fields must follow their log"
+        fields.append(field)
+
+    def mark(self) -> AuditLogBufferMark:
+        return AuditLogBufferMark(self.flushes, len(self.entries))
+
+    def discard_since(self, mark: AuditLogBufferMark) -> None:
+        """Drops the entries logged since the mark, e.g. when rolling back
+        to a savepoint taken then."""
+        assert self.flushes == mark.flushes, "audit log flushed within a nested block"
+        del self.entries[mark.size:]
+
+    def flush_if_full(self) -> None:
+        """Flushes if AUDIT_LOG_BUFFER_SIZE entries are waiting. Called by
+        the owner of the outermost block between nested ones, e.g. between
+        the rows of an upload."""
+        if len(self.entries) >= self.max_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self.entries:
+            return
+        logs = [log for log, _ in self.entries]
+        Spauditlog.objects.bulk_create(logs)
+        if logs[0].id is None:
+            # MySQL doesn't return the ids of bulk inserted rows, but gives
+            # the rows of a single multi-row insert ids starting from
+            # LAST_INSERT_ID(), auto_increment_increment apart.
+            with connection.cursor() as cursor:
+                cursor.execute("select last_insert_id(), @@auto_increment_increment")
+                first_id, increment = cursor.fetchone()
+            for offset, log in enumerate(logs):
+                log.id = first_id + offset * increment
+
+        fields = []
+        for log, log_fields in self.entries:
+            for field in log_fields:
+                field.spauditlog = log
+                fields.append(field)
+        # Field values can be up to 64KB each.
+        Spauditlogfield.objects.bulk_create(fields, batch_size=100)
+
+        self.entries.clear()
+        self.flushes += 1
+
+_audit_log_buffer: ContextVar[AuditLogBuffer | None] = ContextVar("audit_log_buffer", default=None)
+
+@contextmanager
+def buffered_audit_log():
+    """Collects the audit log entries written within it and inserts them
+    with a few bulk inserts, when AUDIT_LOG_BUFFER_SIZE records have been
+    logged outside nested blocks, when flush_if_full is called and when it
+    exits. Should be used inside the transaction of the logged changes.
+    Nested uses join the outermost one without flushing, dropping the
+    entries logged within them if they exit with an exception, as the
+    savepoint of the changes would be rolled back.
+    """
+    buffer = _audit_log_buffer.get()
+    if buffer is not None:
+        mark = buffer.mark()
+        buffer.nested += 1
+        try:
+            yield buffer
+        except BaseException:
+            buffer.discard_since(mark)
+            raise
+        finally:
+            buffer.nested -= 1
+        return
+    buffer = AuditLogBuffer(getattr(settings, 'AUDIT_LOG_BUFFER_SIZE', 1000))
+    token = _audit_log_buffer.set(buffer)
+    try:
+        yield buffer
+    finally:
+        _audit_log_buffer.reset(token)
+    buffer.flush()
+
+def current_audit_log_buffer() -> AuditLogBuffer | None:
+    return _audit_log_buffer.get()
+
 class AuditLog:
 
     _auditingFlds = None
@@ -63,7 +177,7 @@ class AuditLog:
                 self._auditingFlds = True
             else:
                 self._auditingFlds = False if do_audit_field_updates.lower() == 'false' else True
-            self.purge()
+            self.schedule_purge()
             self._lastCheck = time()
         return self._auditing;
     
@@ -124,7 +238,7 @@ class AuditLog:
                     parentId = scopeId
                     parentTbl = model.tableId
 
-            return Spauditlog.objects.create(
+            log = Spauditlog(
                 action=action,
                 parentrecordid=parentId,
                 parenttablenum=parentTbl,
@@ -133,6 +247,14 @@ class AuditLog:
                 tablenum=obj.specify_model.tableId if hasattr(obj, 'specify_model') else 0, # TODO: Checkout why LibraryRole has no specify_model during init migration
                 createdbyagent_id=agent_id,
                 modifiedbyagent_id=agent_id)
+            buffer = _audit_log_buffer.get()
+            if buffer is None:
+                log.save()
+            else:
+                if log.recordversion is None:
+                    log.recordversion = 0
+                buffer.add(log)
+            return log
     
     def _log_fld_update(self, vals, log, agent):
         agent_id = agent if isinstance(agent, int) else (agent and agent.id)
@@ -143,34 +265,83 @@ class AuditLog:
         oldval = vals['old_value']
         if oldval is not None:
             oldval = truncate_str_to_bytes(str(vals['old_value']), max_value_length)
-        return Spauditlogfield.objects.create(
+        field = Spauditlogfield(
             fieldname=vals['field_name'],
             newvalue=newval,
             oldvalue=oldval,
             spauditlog=log,
             createdbyagent_id=agent_id,
             modifiedbyagent_id=agent_id)
+        buffer = _audit_log_buffer.get()
+        if buffer is None or log.id is not None:
+            field.save()
+        else:
+            buffer.add_field(log, field)
+        return field
 
-    def purge(self):
+    def schedule_purge(self) -> None:
+        """Queues purging the expired audit log entries in the background,
+        unless it was queued within the last AUDIT_LOG_PURGE_INTERVAL."""
+        from specifyweb.backend.cache.redis import set_string
+        from specifyweb.backend.workbench.tasks import purge_audit_log
+
+        key = PURGE_AUDIT_LOG_REDIS_KEY.format(database="{database}")
+        try:
+            queued = set_string(
+                key, "1",
+                time_to_live=getattr(settings, 'AUDIT_LOG_PURGE_INTERVAL', 60 * 60),
+                override_existing=False)
+        except RedisError as e:
+            logger.warning("could not queue purging the audit log: %s", e)
+            return
+        if queued:
+            transaction.on_commit(lambda: purge_audit_log.delay())
+
+    def purge(
+        self,
+        chunk_size: int = 5000,
+        pause: float = 0,
+        progress: Callable[[int, int | None], None] | None = None,
+    ) -> dict[str, int]:
+        """Deletes the audit log entries older than the AUDIT_LIFESPAN_MONTHS
+        global preference, chunk_size rows at a time in primary key order,
+        committing and pausing after each chunk so the tables are only
+        locked briefly. Returns the number of rows deleted from each table.
+        """
         from specifyweb.backend.context.remote_prefs import get_global_pref
 
+        deleted = {'spauditlogfield': 0, 'spauditlog': 0}
         audit_lifespan = get_global_pref('AUDIT_LIFESPAN_MONTHS')
         logger.info("checking to see if purge is required")
-        if audit_lifespan is not None:
-            try:
-                lifespan_months = int(audit_lifespan.strip())
-            except (TypeError, ValueError):
-                logger.warning("Invalid AUDIT_LIFESPAN_MONTHS value: %r", audit_lifespan)
-                return True
-
-            cursor = connection.cursor()
-            query_parameters = [lifespan_months]
-            sql = "delete from spauditlogfield where date_sub(curdate(), Interval %s month) > timestampcreated"
-            logger.info("purging audit log: %s", [sql])
-            cursor.execute(sql, query_parameters)
-            sql = "delete from spauditlog where date_sub(curdate(), Interval %s month) > timestampcreated"
-            logger.info("purging audit log: %s", [sql])
-            cursor.execute(sql, query_parameters)
-        return True
+        if audit_lifespan is None:
+            return deleted
+        try:
+            lifespan_months = int(audit_lifespan.strip())
+        except (TypeError, ValueError):
+            logger.warning("Invalid AUDIT_LIFESPAN_MONTHS value: %r", audit_lifespan)
+            return deleted
+
+        with connection.cursor() as cursor:
+            cursor.execute("select date_sub(curdate(), Interval %s month)", [lifespan_months])
+            cutoff, = cursor.fetchone()
+
+        for table, key in (('spauditlogfield', 'spauditlogfieldid'), ('spauditlog', 'spauditlogid')):
+            # The oldest entries have the lowest ids, so each chunk is found
+            # at the start of the primary key.
+            sql = f"delete from {table} where timestampcreated < %s order by {key} limit %s"
+            logger.info("purging audit log: %s", [sql, cutoff])
+            while True:
+                with transaction.atomic(), connection.cursor() as cursor:
+                    cursor.execute(sql, [cutoff, chunk_size])
+                    count = cursor.rowcount
+                deleted[table] += count
+                if progress is not None:
+                    progress(sum(deleted.values()), None)
+                if count < chunk_size:
+                    break
+                sleep(pause)
+
+        logger.info("purged audit log: %s", deleted)
+        return deleted
     
 auditlog = AuditLog()
@@ -0,0 +1,234 @@
+"""
+Set-based pre-pass that seeds the upload cache with to-one matches.
+
+Without it, every BoundUploadTable._match issues its own query per row, so a
+plan with a handful of to-ones costs several round-trips per row. Here the
+distinct match predicates of all rows are collected per table, resolved with
+a few OR-ed queries, and the unambiguous answers are put in the cache under
+the exact key _match would use. Rows are then processed as usual, mostly from
+memory. Anything that cannot be predicted exactly is simply left out of the
+cache, so the per-row path still decides it.
+
+Tables are resolved bottom up: the predicates of a table include the ids of
+its to-ones, so a parent can only be predicted once all of its children have
+matched a single existing record (or are null). Each pass resolves one more
+level of the plan.
+"""
+
+import logging
+import time
+import unicodedata
+from collections import defaultdict
+from typing import Any
+
+from django.db.models import Q, F
+
+from specifyweb.specify.utils.func import Func
+
+from .predicates import SkippablePredicate, get_model
+from .upload_result import Matched, NullRecord, ReportInfo, UploadResult, ParseFailures
+from .upload_table import BoundUploadTable, BoundMustMatchTable
+from .uploadable import Row, Disambiguation, Auditor, ScopedUploadable
+
+logger = logging.getLogger(__name__)
+
+# Number of distinct predicates OR-ed together in a single query.
+CHUNK_SIZE = 500
+
+# Guards against pathological plans. Plans are rarely deeper than a few levels.
+MAX_PASSES = 10
+
+RequestKey = tuple[str, tuple[str, ...]]
+
+
+def prefetch_matches(
+    rows: list[Row],
+    scoped_table: ScopedUploadable,
+    uploading_agent_id: int,
+    auditor: Auditor,
+    cache: dict,
+    disambiguations: list[Disambiguation] | None = None,
+) -> int:
+    """Seed `cache` with the matches of every row. Returns the number of seeded keys."""
+    tic = time.perf_counter()
+
+    bound_rows = []
+    for i, row in enumerate(rows):
+        da = disambiguations[i] if disambiguations else None
+        bound = (
+            scoped_table.disambiguate(da)
+            .apply_batch_edit_pack(None)
+            .bind(row, uploading_agent_id, auditor, cache)
+        )
+        if not isinstance(bound, ParseFailures):
+            bound_rows.append(bound)
+
+    queried: set[str] = set()
+    seeded = 0
+    for _ in range(MAX_PASSES):
+        requests: dict[RequestKey, dict[str, dict[str, Any]]] = defaultdict(dict)
+        for bound in bound_rows:
+            _predict(bound, cache, queried, requests)
+
+        if not requests:
+            break
+
+        for (table_name, fields), predicates in requests.items():
+            seeded += _resolve(table_name, fields, predicates, cache)
+            queried.update(predicates.keys())
+
+    toc = time.perf_counter()
+    logger.info(
+        f"prefetched {seeded} matches for {len(bound_rows)} rows "
+        f"with {len(queried)} predicates in {toc-tic}s"
+    )
+    return seeded
+
+
+def _is_predictable(node) -> bool:
+    return (
+        type(node) in (BoundUploadTable, BoundMustMatchTable)
+        and node.current_id is None
+        and node.disambiguation is None
+        and not node.toMany
+        and not any(child.is_one_to_one() for child in node.toOne.values())
+    )
+
+
+def _walk_children(node, cache, queried, requests) -> dict[str, UploadResult | None]:
+    if not isinstance(node, BoundUploadTable):
+        # Tree records do their own matching.
+        return {}
+
+    for records in node.toMany.values():
+        for record in records:
+            # To-many records themselves are always uploaded, but their to-ones
+            # are matched.
+            _walk_children(record, cache, queried, requests)
+
+    return {
+        key: _predict(child, cache, queried, requests)
+        for key, child in node.toOne.items()
+    }
+
+
+def _predict(node, cache, queried, requests) -> UploadResult | None:
+    """Returns the result _handle_row would give for `node`, if already known.
+
+    Predicates that still need to be resolved are added to `requests`.
+    """
+    to_one_results = _walk_children(node, cache, queried, requests)
+
+    if not _is_predictable(node) or any(
+        result is None for result in to_one_results.values()
+    ):
+        return None
+
+    info = ReportInfo(tableName=node.name, columns=[], treeInfo=None)
+
+    predicates = node.get_django_predicates(
+        should_defer_match=node._should_defer_match,
+        to_one_override=to_one_results,
+        consider_dependents=False,
+        is_origin=True,
+        origin_is_editable=False,
+    )
+
+    if isinstance(predicates, SkippablePredicate) or predicates.to_remove:
+        return None
+
+    if not predicates.filters:
+        attrs = [
+            value
+            for parsedField in node.parsedFields
+            for value in parsedField.upload.values()
+        ]
+        return (
+            UploadResult(NullRecord(info), {}, {})
+            if all(value is None for value in attrs)
+            else None
+        )
+
+    if any(
+        isinstance(value, (list, F, Q)) for value in predicates.filters.values()
+    ):
+        return None
+
+    cache_key = predicates.get_cache_key(node.name)
+    cached = cache.get(cache_key, None)
+    if cached is not None:
+        if len(cached) == 1 or node._disambiguation_pick_first():
+            return UploadResult(Matched(id=cached[0], info=info), {}, {})
+        return None
+
+    if cache_key not in queried:
+        fields = tuple(sorted(predicates.filters.keys()))
+        requests[(node.name, fields)][cache_key] = predicates.filters
+
+    return None
+
+
+def _normalize(value):
+    # Approximates the case, accent and trailing space insensitivity of the
+    # MySQL collations used for Specify text fields.
+    if not isinstance(value, str):
+        return value
+    decomposed = unicodedata.normalize("NFKD", value.casefold().rstrip())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def _resolve(
+    table_name: str,
+    fields: tuple[str, ...],
+    predicates: dict[str, dict[str, Any]],
+    cache: dict,
+) -> int:
+    model = get_model(table_name)
+    seeded = 0
+    items = list(predicates.items())
+
+    for chunk in _chunks(items):
+        by_value: dict[tuple, list[str]] = defaultdict(list)
+        by_normalized: dict[tuple, set[tuple]] = defaultdict(set)
+        for cache_key, filters in chunk:
+            value = tuple(filters[field] for field in fields)
+            by_value[value].append(cache_key)
+            by_normalized[tuple(map(_normalize, value))].add(value)
+
+        query = model.objects.filter(
+            Func.make_ors([Q(**filters) for _, filters in chunk])
+        ).values_list("id", *fields)
+
+        exact: dict[tuple, list[int]] = defaultdict(list)
+        ambiguous: set[tuple] = set()
+        for record_id, *values in query:
+            value = tuple(values)
+            if value in by_value:
+                exact[value].append(record_id)
+                continue
+            # The database matched this record under a collation rule. Don't
+            # guess which of the requested values it belongs to.
+            candidates = by_normalized.get(tuple(map(_normalize, value)))
+            if candidates is None:
+                ambiguous.update(by_value.keys())
+                break
+            ambiguous.update(candidates)
+
+        for candidates in by_normalized.values():
+            if len(candidates) > 1:
+                ambiguous.update(candidates)
+
+        for value, ids in exact.items():
+            # Multiple matches are left for _match, which decides their order.
+            if value in ambiguous or len(ids) != 1:
+                continue
+            for cache_key in by_value[value]:
+                cache[cache_key] = ids
+                seeded += 1
+
+    return seeded
+
+
+def _chunks(items: list):
+    for start in range(0, len(items), CHUNK_SIZE):
+        yield items[start : start + CHUNK_SIZE]
@@ -0,0 +1,239 @@
+"""
+Uploading and unuploading a data set in chunks of rows, each committed on
+its own.
+
+An upload normally runs in a single transaction, so nothing survives a
+worker that dies before the last row and the dataset stays locked the
+whole time. Here every chunk is committed together with its row results
+and a checkpoint in Spdataset.uploadcheckpoint:
+
+    {"operation": "uploading", "row": <rows uploaded>, "cache": <match cache seed>}
+    {"operation": "unuploading", "row": <rows still uploaded>, "total": <rows to unupload>}
+
+Starting the upload (or unupload) again picks up after the last committed
+chunk. If a row fails, the chunks already committed are unuploaded, again
+chunk by chunk, and the dataset ends up with the results of a failed
+upload, as if it had been done in one transaction.
+"""
+
+import logging
+from collections.abc import Callable
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db import transaction
+
+from specifyweb.specify import models
+
+from ..models import Spdataset
+from .upload import (
+    Progress,
+    do_upload_dataset_rows,
+    unupload_record,
+    unlink_attachments,
+)
+from .upload_cache import UploadCache
+from .upload_result import UploadResult
+
+logger = logging.getLogger(__name__)
+
+# Number of the most recently used match cache entries saved in a checkpoint.
+CHECKPOINT_CACHE_ENTRIES = 1000
+
+# Chunk size used to finish an upload started in chunks after
+# WB_UPLOAD_CHUNK_SIZE has been turned off.
+RESUME_CHUNK_SIZE = 1000
+
+IsAssigned = Callable[[Spdataset], bool]
+
+
+def upload_chunk_size(ds: Spdataset, no_commit: bool) -> int | None:
+    """The number of rows per committed chunk, None to upload ds in one transaction."""
+    if no_commit or ds.isupdate:
+        # Validation never commits, and batch edit rollbacks work on the
+        # whole data set.
+        return None
+    chunk_size = getattr(settings, "WB_UPLOAD_CHUNK_SIZE", None)
+    if not chunk_size and ds.uploadcheckpoint is not None:
+        chunk_size = RESUME_CHUNK_SIZE
+    return chunk_size or None
+
+
+def cache_seed(cache: UploadCache) -> list[list]:
+    """The recently used matches in the cache, in a form that can be saved as JSON."""
+    seed = []
+    for key, value in reversed(cache.items()):
+        if len(seed) >= CHECKPOINT_CACHE_ENTRIES:
+            break
+        if isinstance(key, str) and all(isinstance(id, int) for id in value):
+            seed.append([key, value])
+    seed.reverse()
+    return seed
+
+
+def seed_cache(cache: UploadCache, seed: list[list]) -> None:
+    for key, ids in seed:
+        cache[key] = ids
+
+
+def upload_dataset_in_chunks(
+    collection,
+    uploading_agent_id: int,
+    ds_id: int,
+    chunk_size: int,
+    progress: Progress | None = None,
+    is_assigned: IsAssigned = lambda ds: True,
+) -> bool:
+    """Uploads the rows of the dataset, committing every chunk_size rows.
+
+    Returns False if the dataset stopped being assigned to the caller, which
+    is checked before every chunk.
+    """
+    cache = UploadCache(maxsize=getattr(settings, "WB_UPLOAD_CACHE_MAX_ENTRIES", None))
+    resuming = True
+
+    while True:
+        with transaction.atomic():
+            ds = Spdataset.objects.select_for_update().get(id=ds_id)
+            if not is_assigned(ds):
+                return False
+
+            checkpoint = ds.uploadcheckpoint
+            if checkpoint is None:
+                if ds.was_uploaded():
+                    raise AssertionError(
+                        "Dataset already uploaded",
+                        {"localizationKey": "datasetAlreadyUploaded"},
+                    )
+                ds.clear_row_results()
+                ds.uploadresult = None
+                checkpoint = {"operation": "uploading", "row": 0, "cache": []}
+            elif checkpoint["operation"] == "unuploading":
+                # The upload failed, and the rollback of the committed chunks
+                # was interrupted.
+                break
+            elif resuming:
+                logger.info(f"resuming upload of dataset {ds_id} at row {checkpoint['row']}")
+                seed_cache(cache, checkpoint["cache"])
+            resuming = False
+
+            start = checkpoint["row"]
+            end = min(start + chunk_size, len(ds.data))
+            total = len(ds.data)
+            results = do_upload_dataset_rows(
+                collection,
+                uploading_agent_id,
+                ds,
+                no_commit=False,
+                allow_partial=False,
+                progress=(
+                    None
+                    if progress is None
+                    else lambda current, _: progress(start + current, total)
+                ),
+                indexes=range(start, end),
+                cache=cache,
+            )
+
+            ds.add_row_results(start, results)
+            failed = any(result.contains_failure() for result in results)
+            if failed or end == total:
+                ds.uploadresult = {
+                    "success": not failed,
+                    "timestamp": datetime.now(timezone.utc).isoformat(),
+                    "recordsetid": None,
+                    "uploadingAgentId": uploading_agent_id,
+                }
+
+            if failed:
+                # This chunk was rolled back. Those before it have to be
+                # unuploaded.
+                ds.uploadcheckpoint = (
+                    {"operation": "unuploading", "row": start, "total": start}
+                    if start > 0
+                    else None
+                )
+            elif end == total:
+                ds.uploadcheckpoint = None
+            else:
+                ds.uploadcheckpoint = {
+                    "operation": "uploading",
+                    "row": end,
+                    "cache": cache_seed(cache),
+                }
+            ds.save(
+                update_fields=[
+                    "rowresults",
+                    "rowresultcount",
+                    "uploadresult",
+                    "uploadcheckpoint",
+                ]
+            )
+            logger.info(f"committed rows {start} to {end} of dataset {ds_id}")
+
+            if ds.uploadcheckpoint is None:
+                return True
+            if failed:
+                break
+
+    return unupload_dataset_in_chunks(
+        ds_id,
+        models.Agent.objects.get(id=uploading_agent_id),
+        chunk_size,
+        progress,
+        is_assigned,
+    )
+
+
+def unupload_dataset_in_chunks(
+    ds_id: int,
+    agent,
+    chunk_size: int,
+    progress: Progress | None = None,
+    is_assigned: IsAssigned = lambda ds: True,
+) -> bool:
+    """Unuploads the rows of the dataset in reverse, committing every chunk_size rows.
+
+    Unlike unupload_dataset, leaves ds.uploadresult alone. Returns False if
+    the dataset stopped being assigned to the caller.
+    """
+    while True:
+        with transaction.atomic():
+            ds = Spdataset.objects.select_for_update().get(id=ds_id)
+            if not is_assigned(ds):
+                return False
+
+            checkpoint = ds.uploadcheckpoint
+            if checkpoint is None:
+                # A finished upload.
+                end = total = (
+                    ds.rowresultcount
+                    if ds.rowresultcount is not None
+                    else len(ds.get_row_results() or [])
+                )
+            elif checkpoint["operation"] == "uploading":
+                # The committed chunks of an upload that didn't finish.
+                end = total = checkpoint["row"]
+            else:
+                end, total = checkpoint["row"], checkpoint["total"]
+            start = max(0, end - chunk_size)
+
+            results = ds.get_row_results(start, end) or []
+            for i, result in enumerate(reversed(results)):
+                logger.info(f"rolling back row {end - i - 1} of dataset {ds_id}")
+                upload_result = None if result is None else UploadResult.from_json(result)
+                if upload_result is not None and not upload_result.contains_failure():
+                    unupload_record(upload_result, agent)
+                if progress is not None:
+                    progress(total - end + i + 1, total)
+
+            if start == 0:
+                unlink_attachments(ds)
+                ds.uploadcheckpoint = None
+            else:
+                ds.uploadcheckpoint = {"operation": "unuploading", "row": start, "total": total}
+            ds.save(update_fields=["uploadcheckpoint"])
+            logger.info(f"rolled back rows {start} to {end} of dataset {ds_id}")
+
+            if start == 0:
+                return True
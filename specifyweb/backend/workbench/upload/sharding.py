@@ -0,0 +1,139 @@
+"""
+Validation of a data set split into row ranges (shards).
+
+Validation never commits, so the shards can be validated concurrently by
+separate workers against the same plan. The catch is that a serial validation
+lets later rows see the records "created" by earlier rows (inside the rolled
+back transaction): a row can match a record introduced by an earlier row, or
+break a uniqueness rule because of it. A shard can't see the records of the
+shards before it, so after merging, rows of different shards that would
+create records sharing a table, column and value are validated again,
+serially and in row order, and their results replace the sharded ones.
+"""
+
+import logging
+from collections import defaultdict
+from collections.abc import Iterator
+
+from ..models import Spdataset
+from .upload import Progress, do_upload_dataset_rows
+from .upload_result import Uploaded, UploadResult
+
+logger = logging.getLogger(__name__)
+
+Signature = tuple[str, str, str]
+
+
+def shard_ranges(n_rows: int, n_shards: int) -> list[tuple[int, int]]:
+    n_shards = max(1, min(n_shards, n_rows))
+    size, extra = divmod(n_rows, n_shards)
+    ranges = []
+    start = 0
+    for shard in range(n_shards):
+        end = start + size + (1 if shard < extra else 0)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def validate_shard(
+    collection,
+    uploading_agent_id: int,
+    ds: Spdataset,
+    start: int,
+    end: int,
+    allow_partial: bool,
+    progress: Progress | None = None,
+) -> list[UploadResult]:
+    return do_upload_dataset_rows(
+        collection,
+        uploading_agent_id,
+        ds,
+        no_commit=True,
+        allow_partial=allow_partial,
+        progress=progress,
+        indexes=range(start, end),
+    )
+
+
+def new_record_signatures(result: UploadResult, row: dict[str, str]) -> Iterator[Signature]:
+    """The (table, column, value) of every non blank cell of a record the row would create."""
+    record_result = result.record_result
+    if isinstance(record_result, Uploaded):
+        table = record_result.info.tableName.lower()
+        for column in record_result.info.columns:
+            value = (row.get(column) or "").strip().casefold()
+            if value:
+                yield (table, column, value)
+
+    for to_one in result.toOne.values():
+        yield from new_record_signatures(to_one, row)
+    for to_many in result.toMany.values():
+        for record in to_many:
+            yield from new_record_signatures(record, row)
+
+
+def find_cross_shard_rows(
+    ds: Spdataset,
+    ranges: list[tuple[int, int]],
+    results: list[UploadResult],
+) -> list[int]:
+    """Indexes of the rows whose validation may depend on rows of another shard."""
+    shards_by_signature: dict[Signature, set[int]] = defaultdict(set)
+    rows_by_signature: dict[Signature, list[int]] = defaultdict(list)
+
+    for shard, (start, end) in enumerate(ranges):
+        for index in range(start, min(end, len(results))):
+            row = dict(zip(ds.columns, ds.data[index]))
+            for signature in set(new_record_signatures(results[index], row)):
+                shards_by_signature[signature].add(shard)
+                rows_by_signature[signature].append(index)
+
+    return sorted(
+        {
+            index
+            for signature, shards in shards_by_signature.items()
+            if len(shards) > 1
+            for index in rows_by_signature[signature]
+        }
+    )
+
+
+def merge_shard_results(
+    collection,
+    uploading_agent_id: int,
+    ds: Spdataset,
+    ranges: list[tuple[int, int]],
+    shard_results: list[list[UploadResult]],
+    allow_partial: bool,
+    progress: Progress | None = None,
+) -> list[UploadResult]:
+    results: list[UploadResult] = []
+    for (start, end), shard in zip(ranges, shard_results):
+        results.extend(shard)
+        if len(shard) < end - start:
+            # Without allow_partial a shard stops at its first failed row,
+            # and so would a serial validation.
+            break
+
+    recheck = find_cross_shard_rows(ds, ranges, results)
+    if recheck:
+        logger.info(f"revalidating {len(recheck)} rows that depend on other shards")
+        rechecked = do_upload_dataset_rows(
+            collection,
+            uploading_agent_id,
+            ds,
+            no_commit=True,
+            allow_partial=True,
+            progress=progress,
+            indexes=recheck,
+        )
+        for index, result in zip(recheck, rechecked):
+            results[index] = result
+
+    if not allow_partial:
+        for index, result in enumerate(results):
+            if result.contains_failure():
+                return results[: index + 1]
+
+    return results
@@ -0,0 +1,94 @@
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from specifyweb.specify.models import Spauditlog, Spauditlogfield
+from specifyweb.specify.tests.test_api import ApiTests
+from specifyweb.specify.utils.field_change_info import FieldChangeInfo
+
+from .. import auditcodes
+from ..auditlog import auditlog, buffered_audit_log
+
+
+class AuditLogBufferTests(ApiTests):
+
+    def setUp(self):
+        super().setUp()
+        Spauditlogfield.objects.all().delete()
+        Spauditlog.objects.all().delete()
+
+    def _log_updates(self) -> None:
+        for co in self.collectionobjects:
+            auditlog.update(co, self.agent, None, [
+                FieldChangeInfo(field_name='catalognumber', old_value=co.catalognumber, new_value='new'),
+                FieldChangeInfo(field_name='remarks', old_value=None, new_value='changed'),
+            ])
+
+    def _entries(self):
+        return sorted(
+            (log.recordid, log.action, field.fieldname, field.oldvalue, field.newvalue)
+            for log in Spauditlog.objects.filter(tablenum=self.collectionobjects[0].specify_model.tableId)
+            for field in Spauditlogfield.objects.filter(spauditlog=log)
+        )
+
+    def test_buffered_entries_match_unbuffered(self) -> None:
+        self._log_updates()
+        unbuffered = self._entries()
+        Spauditlogfield.objects.all().delete()
+        Spauditlog.objects.all().delete()
+
+        with CaptureQueriesContext(connection) as queries:
+            with buffered_audit_log():
+                self._log_updates()
+                self.assertFalse(Spauditlog.objects.exists())
+        logged = [q for q in queries.captured_queries if 'spauditlog' in q['sql'].lower()]
+
+        self.assertEqual(self._entries(), unbuffered)
+        self.assertLess(len(logged), len(self.collectionobjects))
+
+    @override_settings(AUDIT_LOG_BUFFER_SIZE=2)
+    def test_flushes_when_full(self) -> None:
+        with buffered_audit_log() as buffer:
+            self._log_updates()
+            self.assertEqual(Spauditlog.objects.count(), 4)
+            self.assertEqual(len(buffer.entries), 1)
+
+        self.assertEqual(
+            Spauditlog.objects.filter(action=auditcodes.UPDATE).count(),
+            len(self.collectionobjects),
+        )
+        self.assertEqual(Spauditlogfield.objects.count(), 2 * len(self.collectionobjects))
+
+    def test_failed_nested_block_is_discarded(self) -> None:
+        with buffered_audit_log():
+            auditlog.insert(self.collectionobjects[0], self.agent)
+            with self.assertRaises(ValueError):
+                with buffered_audit_log():
+                    auditlog.insert(self.collectionobjects[1], self.agent)
+                    raise ValueError()
+
+        self.assertEqual(
+            list(Spauditlog.objects.values_list('recordid', flat=True)),
+            [self.collectionobjects[0].id],
+        )
+
+    @override_settings(AUDIT_LOG_BUFFER_SIZE=1)
+    def test_nested_blocks_do_not_flush(self) -> None:
+        with buffered_audit_log() as buffer:
+            for co in self.collectionobjects[:2]:
+                with buffered_audit_log():
+                    auditlog.insert(co, self.agent)
+                    auditlog.insert(co, self.agent)
+                    self.assertFalse(Spauditlog.objects.filter(recordid=co.id).exists())
+                buffer.flush_if_full()
+
+            # A failed row rolls back its savepoint, but not the entries of
+            # the rows before it.
+            with self.assertRaises(ValueError), transaction.atomic():
+                with buffered_audit_log():
+                    auditlog.insert(self.collectionobjects[2], self.agent)
+                    raise ValueError()
+
+        self.assertCountEqual(
+            Spauditlog.objects.values_list('recordid', flat=True),
+            [co.id for co in self.collectionobjects[:2] for _ in range(2)],
+        )
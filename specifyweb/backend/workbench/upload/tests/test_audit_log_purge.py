@@ -0,0 +1,56 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.utils import timezone
+
+from specifyweb.specify.models import Spauditlog, Spauditlogfield
+from specifyweb.specify.tests.test_api import ApiTests
+from specifyweb.specify.utils.field_change_info import FieldChangeInfo
+
+from ..auditlog import auditlog
+
+
+@patch("specifyweb.backend.context.remote_prefs.get_global_pref", return_value="1")
+class AuditLogPurgeTests(ApiTests):
+
+    def setUp(self):
+        super().setUp()
+        Spauditlogfield.objects.all().delete()
+        Spauditlog.objects.all().delete()
+        for co in self.collectionobjects:
+            auditlog.update(co, self.agent, None, [
+                FieldChangeInfo(field_name='remarks', old_value=None, new_value='changed'),
+            ])
+
+    def _age(self, logs) -> None:
+        old = timezone.now() - timedelta(days=90)
+        Spauditlog.objects.filter(id__in=[log.id for log in logs]).update(timestampcreated=old)
+        Spauditlogfield.objects.filter(spauditlog__in=logs).update(timestampcreated=old)
+
+    def test_purges_expired_entries_in_chunks(self, get_global_pref) -> None:
+        logs = list(Spauditlog.objects.order_by('id'))
+        self._age(logs[:3])
+        progress = []
+
+        deleted = auditlog.purge(chunk_size=2, progress=lambda current, total: progress.append(current))
+
+        self.assertEqual(deleted, {'spauditlogfield': 3, 'spauditlog': 3})
+        self.assertEqual(progress, [2, 3, 5, 6])
+        self.assertCountEqual(Spauditlog.objects.values_list('id', flat=True), [log.id for log in logs[3:]])
+        self.assertEqual(Spauditlogfield.objects.count(), len(logs) - 3)
+
+    def test_nothing_purged_without_lifespan(self, get_global_pref) -> None:
+        get_global_pref.return_value = None
+        self._age(list(Spauditlog.objects.all()))
+
+        self.assertEqual(auditlog.purge(), {'spauditlogfield': 0, 'spauditlog': 0})
+        self.assertEqual(Spauditlog.objects.count(), len(self.collectionobjects))
+
+    @patch("specifyweb.backend.workbench.tasks.purge_audit_log")
+    @patch("specifyweb.backend.cache.redis.set_string", side_effect=[True, False])
+    def test_purge_is_queued_once(self, set_string, purge_audit_log, get_global_pref) -> None:
+        with self.captureOnCommitCallbacks(execute=True):
+            auditlog.schedule_purge()
+            auditlog.schedule_purge()
+
+        purge_audit_log.delay.assert_called_once_with()
@@ -0,0 +1,117 @@
+from jsonschema import validate  # type: ignore
+
+from specifyweb.specify.tests.test_api import get_table
+from specifyweb.backend.workbench.upload.auditor import DEFAULT_AUDITOR_PROPS
+from .base import UploadTestsBase
+from ..batch_match import prefetch_matches
+from ..upload import do_upload
+from ..upload_cache import UploadCache
+from ..upload_plan_schema import schema, parse_plan
+from ..upload_result import Matched, Uploaded
+from ..uploadable import Auditor
+
+plan_json = dict(
+    baseTableName="Collectionobject",
+    uploadable={
+        "uploadTable": dict(
+            wbcols={"catalognumber": "Catno"},
+            static={},
+            toOne={
+                "cataloger": {
+                    "uploadTable": dict(
+                        wbcols={"lastname": "Cataloger"},
+                        static={"agenttype": 1},
+                        toOne={},
+                        toMany={},
+                    )
+                },
+                "collectingevent": {
+                    "uploadTable": dict(
+                        wbcols={"stationfieldnumber": "Field No"},
+                        static={},
+                        toOne={
+                            "locality": {
+                                "uploadTable": dict(
+                                    wbcols={"localityname": "Locality"},
+                                    static={"srclatlongunit": 0},
+                                    toOne={},
+                                    toMany={},
+                                )
+                            }
+                        },
+                        toMany={},
+                    )
+                },
+            },
+            toMany={},
+        )
+    },
+)
+
+
+class BatchMatchTests(UploadTestsBase):
+    def setUp(self) -> None:
+        super().setUp()
+        validate(plan_json, schema)
+        self.plan = parse_plan(plan_json)
+
+        self.smith = get_table("Agent").objects.create(
+            lastname="Smith", agenttype=1, division=self.division
+        )
+        self.locality = get_table("Locality").objects.create(
+            localityname="Lawrence", srclatlongunit=0, discipline=self.discipline
+        )
+        self.ce = get_table("Collectingevent").objects.create(
+            stationfieldnumber="FN-1",
+            locality=self.locality,
+            discipline=self.discipline,
+        )
+
+        self.rows = [
+            {"Catno": "1", "Cataloger": "Smith", "Field No": "FN-1", "Locality": "Lawrence"},
+            {"Catno": "2", "Cataloger": "Smith", "Field No": "FN-1", "Locality": "Lawrence"},
+            {"Catno": "3", "Cataloger": "Jones", "Field No": "FN-2", "Locality": "Topeka"},
+        ]
+
+    def test_prefetch_seeds_nested_matches(self) -> None:
+        cache = UploadCache()
+        seeded = prefetch_matches(
+            self.rows,
+            self.plan.apply_scoping(self.collection),
+            self.agent.id,
+            Auditor(self.collection, props=DEFAULT_AUDITOR_PROPS, audit_log=None),
+            cache,
+        )
+
+        # Agent, Locality and then the Collecting Event built from it.
+        self.assertEqual(seeded, 3)
+        self.assertCountEqual(
+            cache.values(), [[self.smith.id], [self.locality.id], [self.ce.id]]
+        )
+
+    def test_prefetch_ignores_case_variants(self) -> None:
+        get_table("Agent").objects.create(
+            lastname="SMITH", agenttype=1, division=self.division
+        )
+        cache = UploadCache()
+        prefetch_matches(
+            self.rows,
+            self.plan.apply_scoping(self.collection),
+            self.agent.id,
+            Auditor(self.collection, props=DEFAULT_AUDITOR_PROPS, audit_log=None),
+            cache,
+        )
+        self.assertNotIn([self.smith.id], cache.values())
+
+    def test_upload_with_prefetch(self) -> None:
+        results = do_upload(self.collection, self.rows, self.plan, self.agent.id)
+
+        for r in results[:2]:
+            self.assertIsInstance(r.record_result, Uploaded)
+            self.assertIsInstance(r.toOne["cataloger"].record_result, Matched)
+            self.assertEqual(r.toOne["cataloger"].get_id(), self.smith.id)
+            self.assertIsInstance(r.toOne["collectingevent"].record_result, Matched)
+            self.assertEqual(r.toOne["collectingevent"].get_id(), self.ce.id)
+
+        self.assertIsInstance(results[2].toOne["cataloger"].record_result, Uploaded)
+        self.assertIsInstance(results[2].toOne["collectingevent"].record_result, Uploaded)
@@ -0,0 +1,78 @@
+import json
+
+from specifyweb.specify.tests.test_api import get_table
+from .base import UploadTestsBase
+from ..chunked import upload_dataset_in_chunks, unupload_dataset_in_chunks
+from ...models import Spdataset
+
+
+class ChunkedUploadTests(UploadTestsBase):
+    def setUp(self) -> None:
+        super().setUp()
+        plan = dict(
+            baseTableName="Collectionobject",
+            uploadable={
+                "uploadTable": dict(
+                    wbcols={"catalognumber": "Catno"},
+                    static={},
+                    toOne={},
+                    toMany={},
+                )
+            },
+        )
+        self.ds = Spdataset.objects.create(
+            name="chunked",
+            collection=self.collection,
+            specifyuser=self.specifyuser,
+            columns=["Catno"],
+            uploadplan=json.dumps(plan),
+            data=[[str(n), ""] for n in range(1, 6)],
+        )
+
+    def uploaded(self) -> int:
+        return get_table("Collectionobject").objects.filter(
+            collection=self.collection, catalognumber__in=[f"{n:09d}" for n in range(1, 6)]
+        ).count()
+
+    def test_upload_resumes_from_checkpoint(self) -> None:
+        calls = []
+
+        def stop_after_first_chunk(ds) -> bool:
+            calls.append(ds.uploadcheckpoint)
+            return len(calls) < 2
+
+        finished = upload_dataset_in_chunks(
+            self.collection, self.agent.id, self.ds.id, 2, is_assigned=stop_after_first_chunk
+        )
+        self.assertFalse(finished)
+        self.ds.refresh_from_db()
+        self.assertEqual(self.ds.uploadcheckpoint["row"], 2)
+        self.assertTrue(self.ds.was_uploaded())
+        self.assertEqual(self.uploaded(), 2)
+
+        self.assertTrue(upload_dataset_in_chunks(self.collection, self.agent.id, self.ds.id, 2))
+        self.ds.refresh_from_db()
+        self.assertIsNone(self.ds.uploadcheckpoint)
+        self.assertTrue(self.ds.uploadresult["success"])
+        self.assertEqual(len(self.ds.get_row_results()), 5)
+        self.assertEqual(self.uploaded(), 5)
+
+        self.assertTrue(unupload_dataset_in_chunks(self.ds.id, self.agent, 2))
+        self.ds.refresh_from_db()
+        self.assertIsNone(self.ds.uploadcheckpoint)
+        self.assertEqual(self.uploaded(), 0)
+
+    def test_failed_row_rolls_back_committed_chunks(self) -> None:
+        self.ds.data[3][0] = "not a number"
+        self.ds.save()
+
+        self.assertTrue(upload_dataset_in_chunks(self.collection, self.agent.id, self.ds.id, 2))
+        self.ds.refresh_from_db()
+        self.assertIsNone(self.ds.uploadcheckpoint)
+        self.assertFalse(self.ds.uploadresult["success"])
+        self.assertFalse(self.ds.was_uploaded())
+        self.assertEqual(self.uploaded(), 0)
+
+        results = self.ds.get_row_results()
+        self.assertEqual(len(results), 4)
+        self.assertIn("ParseFailures", results[3]["UploadResult"]["record_result"])
@@ -0,0 +1,79 @@
+import json
+import unittest
+
+from specifyweb.specify.tests.test_api import get_table
+from .base import UploadTestsBase
+from ..sharding import shard_ranges, find_cross_shard_rows, merge_shard_results, validate_shard
+from ..upload import do_upload_dataset_rows
+from ..upload_result import Matched, Uploaded
+from ...models import Spdataset
+
+
+class ShardRangesTests(unittest.TestCase):
+    def test_ranges_cover_rows(self) -> None:
+        self.assertEqual(shard_ranges(10, 3), [(0, 4), (4, 7), (7, 10)])
+        self.assertEqual(shard_ranges(2, 4), [(0, 1), (1, 2)])
+        self.assertEqual(shard_ranges(0, 4), [(0, 0)])
+
+
+class ShardedValidationTests(UploadTestsBase):
+    def setUp(self) -> None:
+        super().setUp()
+        plan = dict(
+            baseTableName="Collectionobject",
+            uploadable={
+                "uploadTable": dict(
+                    wbcols={"catalognumber": "Catno"},
+                    static={},
+                    toOne={
+                        "cataloger": {
+                            "uploadTable": dict(
+                                wbcols={"lastname": "Cataloger"},
+                                static={"agenttype": 1},
+                                toOne={},
+                                toMany={},
+                            )
+                        },
+                    },
+                    toMany={},
+                )
+            },
+        )
+        self.ds = Spdataset.objects.create(
+            name="sharded",
+            collection=self.collection,
+            specifyuser=self.specifyuser,
+            columns=["Catno", "Cataloger"],
+            uploadplan=json.dumps(plan),
+            data=[
+                ["1", "Doe", ""],
+                ["2", "Roe", ""],
+                ["3", "Doe", ""],
+                ["4", "Poe", ""],
+            ],
+        )
+
+    def test_cross_shard_rows_match_like_serial(self) -> None:
+        ranges = shard_ranges(len(self.ds.data), 2)
+        shard_results = [
+            validate_shard(self.collection, self.agent.id, self.ds, start, end, True)
+            for start, end in ranges
+        ]
+        # Both shards create a "Doe" agent on their own.
+        self.assertIsInstance(shard_results[1][0].toOne["cataloger"].record_result, Uploaded)
+
+        merged = [r for shard in shard_results for r in shard]
+        self.assertEqual(find_cross_shard_rows(self.ds, ranges, merged), [0, 2])
+
+        results = merge_shard_results(
+            self.collection, self.agent.id, self.ds, ranges, shard_results, True
+        )
+        serial = do_upload_dataset_rows(
+            self.collection, self.agent.id, self.ds, no_commit=True, allow_partial=True
+        )
+        self.assertIsInstance(results[2].toOne["cataloger"].record_result, Matched)
+        self.assertEqual(
+            [type(r.toOne["cataloger"].record_result) for r in results],
+            [type(r.toOne["cataloger"].record_result) for r in serial],
+        )
+        self.assertFalse(get_table("Agent").objects.filter(lastname="Doe").exists())
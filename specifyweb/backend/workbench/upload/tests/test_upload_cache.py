@@ -0,0 +1,64 @@
+import unittest
+
+from ..upload_cache import UploadCache
+
+
+class UploadCacheTests(unittest.TestCase):
+    def test_rollback_restores_touched_keys(self) -> None:
+        cache = UploadCache()
+        cache['kept'] = [1]
+        cache['changed'] = [2]
+        cache['popped'] = [3]
+
+        cache.begin()
+        cache['changed'] = [20]
+        cache['new'] = [4]
+        cache.pop('popped')
+        cache.rollback()
+
+        self.assertEqual(dict(cache), {'kept': [1], 'changed': [2], 'popped': [3]})
+        self.assertFalse(cache.in_transaction)
+
+    def test_commit_keeps_changes(self) -> None:
+        cache = UploadCache()
+        cache.begin()
+        cache['a'] = 1
+        cache.commit()
+        cache.rollback()
+        self.assertEqual(dict(cache), {'a': 1})
+
+    def test_writes_outside_transaction_are_not_journaled(self) -> None:
+        cache = UploadCache()
+        cache['a'] = 1
+        cache.begin()
+        self.assertEqual(cache._journal, {})
+        cache.rollback()
+        self.assertEqual(dict(cache), {'a': 1})
+
+    def test_lru_bound(self) -> None:
+        cache = UploadCache(maxsize=2)
+        cache['a'] = 1
+        cache['b'] = 2
+        self.assertEqual(cache.get('a'), 1)
+        cache['c'] = 3
+        self.assertEqual(list(cache.keys()), ['a', 'c'])
+        self.assertIsNone(cache.get('b'))
+
+    def test_lru_eviction_is_rolled_back(self) -> None:
+        cache = UploadCache(maxsize=2)
+        cache['a'] = 1
+        cache['b'] = 2
+
+        cache.begin()
+        cache['c'] = 3
+        cache['d'] = 4
+        self.assertEqual(set(cache.keys()), {'c', 'd'})
+        cache.rollback()
+
+        self.assertEqual(dict(cache), {'a': 1, 'b': 2})
+
+    def test_pop_default(self) -> None:
+        cache = UploadCache()
+        self.assertIsNone(cache.pop('missing', None))
+        with self.assertRaises(KeyError):
+            cache.pop('missing')
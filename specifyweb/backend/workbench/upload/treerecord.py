@@ -976,6 +976,8 @@ class BoundTreeRecord(NamedTuple):
             obj = model(**attrs)
             # TODO: Refactor after merge with production, directly check if table is tree or not.
             if model.specify_model.get_field("nodenumber"):
+                # The upload's bulk_tree_edit numbers and names the new
+                # nodes once all rows are uploaded.
                 obj.save(skip_tree_extras=True)
             else:
                 obj.save(force_insert=True)
@@ -9,8 +9,9 @@ from typing import (
     Sized,
 )
 from collections.abc import Callable
-from collections.abc import Sized
+from collections.abc import Sequence, Sized
 
+from django.conf import settings
 from django.db import transaction
 from django.db.utils import OperationalError, IntegrityError
 from jsonschema import validate  # type: ignore
@@ -18,10 +19,10 @@ from typing import Any, Optional, cast
 
 from specifyweb.backend.permissions.permissions import has_target_permission, cache_permission_queries
 from specifyweb.specify import models
-from specifyweb.backend.workbench.upload.auditlog import auditlog
+from specifyweb.backend.workbench.upload.auditlog import auditlog, buffered_audit_log
 from specifyweb.specify.datamodel import Table
 from specifyweb.specify.utils.func import Func
-from specifyweb.backend.trees.extras import renumber_tree, set_fullnames
+from specifyweb.backend.trees.extras import bulk_tree_edit
 from specifyweb.backend.workbench.permissions import BatchEditDataSetPT
 from specifyweb.backend.businessrules.utils import cache_unique_catnum_preferences
 from specifyweb.backend.businessrules.uniqueness_rules import cache_uniqueness_rules
@@ -31,14 +32,12 @@ from specifyweb.backend.workbench.upload.auditor import (
     AuditorProps,
     BatchEditPrefs,
 )
-from specifyweb.backend.trees.views import ALL_TREES
 from specifyweb.specify.utils.autonumbering import AutonumberingLockDispatcher
 
 from . import disambiguation
 from .upload_plan_schema import schema, parse_plan_with_basetable
 from .upload_result import (
     Deleted,
-    MatchedAndChanged,
     NoChange,
     RecordResult,
     Updated,
@@ -57,6 +56,8 @@ from .uploadable import (
     BatchEditJson,
 )
 from .upload_table import UploadTable
+from .upload_cache import UploadCache
+from .batch_match import prefetch_matches
 from .scope_context import ScopeContext
 from ..models import Spdataset
 
@@ -102,16 +103,16 @@ def no_savepoint():
 
 
 def unupload_dataset(ds: Spdataset, agent, progress: Progress | None = None) -> None:
-    if ds.rowresults is None:
+    results = ds.get_row_results()
+    if results is None:
         return
-    results = json.loads(ds.rowresults)
     total = len(results)
     current = 0
-    with transaction.atomic():
+    with transaction.atomic(), buffered_audit_log():
         for row in reversed(results):
             logger.info(f"rolling back row {current} of {total}")
-            upload_result = UploadResult.from_json(row)
-            if not upload_result.contains_failure():
+            upload_result = None if row is None else UploadResult.from_json(row)
+            if upload_result is not None and not upload_result.contains_failure():
                 unupload_record(upload_result, agent)
 
             current += 1
@@ -190,18 +191,46 @@ def do_upload_dataset(
         raise AssertionError(
             "Dataset already uploaded", {"localizationKey": "datasetAlreadyUploaded"}
         )
-    ds.rowresults = None
+    ds.clear_row_results()
     ds.uploadresult = None
-    ds.save(update_fields=["rowresults", "uploadresult"])
+    ds.save(update_fields=["rowresults", "rowresultcount", "uploadresult"])
+
+    results = do_upload_dataset_rows(
+        collection, uploading_agent_id, ds, no_commit, allow_partial, progress
+    )
+    success = not any(r.contains_failure() for r in results)
+    if not no_commit:
+        ds.uploadresult = {
+            "success": success,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "recordsetid": None,
+            "uploadingAgentId": uploading_agent_id,
+        }
+    ds.set_row_results(results)
+    ds.save(update_fields=["rowresults", "rowresultcount", "uploadresult"])
+    return results
+
 
+def do_upload_dataset_rows(
+    collection,
+    uploading_agent_id: int,
+    ds: Spdataset,
+    no_commit: bool,
+    allow_partial: bool,
+    progress: Progress | None = None,
+    indexes: Sequence[int] | None = None,
+    cache: UploadCache | None = None,
+) -> list[UploadResult]:
+    """Uploads the rows of ds (or just the given ones) without touching its results."""
     ncols = len(ds.columns)
-    rows = [dict(zip(ds.columns, row)) for row in ds.data]
+    data = ds.data if indexes is None else [ds.data[i] for i in indexes]
+    rows = [dict(zip(ds.columns, row)) for row in data]
 
-    disambiguation = [get_disambiguation_from_row(ncols, row) for row in ds.data]
-    batch_edit_packs = [get_batch_edit_pack_from_row(ncols, row) for row in ds.data]
+    disambiguation = [get_disambiguation_from_row(ncols, row) for row in data]
+    batch_edit_packs = [get_batch_edit_pack_from_row(ncols, row) for row in data]
     base_table, upload_plan, batchEditPrefs = get_raw_ds_upload_plan(ds)
 
-    results = do_upload(
+    return do_upload(
         collection,
         rows,
         upload_plan,
@@ -219,18 +248,8 @@ def do_upload_dataset(
             ),
             batch_edit_prefs=batchEditPrefs,
         ),
+        cache=cache,
     )
-    success = not any(r.contains_failure() for r in results)
-    if not no_commit:
-        ds.uploadresult = {
-            "success": success,
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-            "recordsetid": None,
-            "uploadingAgentId": uploading_agent_id,
-        }
-    ds.rowresults = json.dumps([r.to_json() for r in results])
-    ds.save(update_fields=["rowresults", "uploadresult"])
-    return results
 
 
 def clear_disambiguation(ds: Spdataset) -> None:
@@ -240,9 +259,9 @@ def clear_disambiguation(ds: Spdataset) -> None:
                 "Dataset already uploaded!",
                 {"localizationKey": "datasetAlreadyUploaded"},
             )
-        ds.rowresults = None
+        ds.clear_row_results()
         ds.uploadresult = None
-        ds.save(update_fields=["rowresults", "uploadresult"])
+        ds.save(update_fields=["rowresults", "rowresultcount", "uploadresult"])
 
         ncols = len(ds.columns)
         for row in ds.data:
@@ -255,8 +274,8 @@ def clear_disambiguation(ds: Spdataset) -> None:
 
 def create_recordset(ds: Spdataset, name: str, remarks: str):
     table, upload_plan = get_ds_upload_plan(ds.collection, ds)
-    assert ds.rowresults is not None
-    results = json.loads(ds.rowresults)
+    results = ds.get_row_results()
+    assert results is not None
 
     if table.tableId is None:
         raise ValueError("tableId cannot be None when creating a Recordset")
@@ -273,8 +292,10 @@ def create_recordset(ds: Spdataset, name: str, remarks: str):
     models.Recordsetitem.objects.bulk_create(
         [
             models.Recordsetitem(order=i, recordid=record_id, recordset=rs)
-            for i, r in enumerate(map(UploadResult.from_json, results))
-            if (
+            for i, result in enumerate(results)
+            if result is not None
+            and (r := UploadResult.from_json(result))
+            and (
                 isinstance(r.record_result, Uploaded)
                 or (ds.isupdate and r.contains_success())
             )
@@ -328,8 +349,12 @@ def do_upload(
     progress: Progress | None = None,
     batch_edit_packs: list[BatchEditJson | None] | None = None,
     auditor_props: AuditorProps | None = None,
+    cache: UploadCache | None = None,
 ) -> list[UploadResult]:
-    cache: dict = {}
+    if cache is None:
+        cache = UploadCache(
+            maxsize=getattr(settings, "WB_UPLOAD_CACHE_MAX_ENTRIES", None)
+        )
     _auditor = Auditor(
         collection=collection,
         props=auditor_props or DEFAULT_AUDITOR_PROPS,
@@ -349,17 +374,41 @@ def do_upload(
         cache_unique_catnum_preferences(),
         cache_uniqueness_rules(),
         cache_remote_preferences(),
-        cache_permission_queries()
+        cache_permission_queries(),
+        # Tree nodes are numbered and named once all rows are uploaded.
+        bulk_tree_edit(),
+        buffered_audit_log() as audit_log_buffer,
     ):
+        if can_prefetch_matches(rows, batch_edit_packs):
+            prefetch_scope_context = ScopeContext()
+            prefetch_table = upload_plan.apply_scoping(
+                collection, prefetch_scope_context, rows[0]
+            )
+            # Rows scoped differently can't share predicates.
+            if not prefetch_scope_context.is_variable:
+                prefetch_matches(
+                    rows,
+                    prefetch_table,
+                    uploading_agent_id,
+                    _auditor,
+                    cache,
+                    disambiguations,
+                )
+
         tic = time.perf_counter()
         results: list[UploadResult] = []
         for i, row in enumerate(rows):
-            _cache = cache.copy() if cache is not None and allow_partial else cache
+            if allow_partial:
+                # Journal the cache writes of this row, so they can be undone
+                # along with the row's savepoint if the row fails.
+                cache.begin()
             da = disambiguations[i] if disambiguations else None
             batch_edit_pack = batch_edit_packs[i] if batch_edit_packs else None
             with (
                 savepoint("row upload") if allow_partial else no_savepoint() as _,
-                AutonumberingLockDispatcher() as autonum_dispatcher
+                AutonumberingLockDispatcher() as autonum_dispatcher,
+                # Drops the audit log entries of a failed row.
+                buffered_audit_log(),
             ):
                 get_lock_dispatcher = lambda: autonum_dispatcher
 
@@ -386,7 +435,7 @@ def do_upload(
                     attachments_valid, result = validate_attachments(row, upload_plan) # type: ignore
                     if not attachments_valid:
                         results.append(result) # type: ignore
-                        cache = _cache
+                        cache.rollback()
                         raise Rollback("failed row")
                     row, row_upload_plan = add_attachments_to_plan(row, upload_plan) # type: ignore
                     scoped_table = row_upload_plan.apply_scoping(collection, scope_context, row, lock_dispatcher=get_lock_dispatcher)
@@ -420,21 +469,24 @@ def do_upload(
                 if progress is not None:
                     progress(len(results), total)
                 logger.info(
-                    f"finished row {len(results)}, cache size: {cache and len(cache)}"
+                    f"finished row {len(results)}, cache size: {len(cache)}"
                 )
                 if result.contains_failure():
-                    cache = _cache
+                    cache.rollback()
                     raise Rollback("failed row")
                 
                 autonum_dispatcher.commit_highest()
+                cache.commit()
+
+            # Outside the row's savepoint, so the entries of earlier rows
+            # aren't rolled back with a later row that fails.
+            audit_log_buffer.flush_if_full()
 
         toc = time.perf_counter()
         logger.info(f"finished upload of {len(results)} rows in {toc-tic}s")
 
         if no_commit:
             raise Rollback("no_commit option")
-        else:
-            fixup_trees(scoped_table, results)
 
     return results
 
@@ -442,6 +494,19 @@ def do_upload(
 do_upload_csv = do_upload
 
 
+def can_prefetch_matches(
+    rows: Rows, batch_edit_packs: list[BatchEditJson | None] | None
+) -> bool:
+    return (
+        getattr(settings, "WB_UPLOAD_PREFETCH_MATCHES", True)
+        and isinstance(rows, list)
+        and len(rows) > 1
+        # Batch edit rows match against their own records.
+        and not (batch_edit_packs and any(batch_edit_packs))
+        and not any(has_attachments(row) for row in rows)
+    )
+
+
 def validate_row(
     collection,
     upload_plan: ScopedUploadable,
@@ -478,47 +543,6 @@ def validate_row(
     return result
 
 
-def fixup_trees(upload_plan: ScopedUploadable, results: list[UploadResult]) -> None:
-    treedefs = upload_plan.get_treedefs()
-
-    to_fix = [
-        tree.lower()
-        for tree in ALL_TREES
-        if any(changed_tree(tree.lower(), r) for r in results)
-    ]
-
-    for tree in to_fix:
-        tic = time.perf_counter()
-        renumber_tree(tree)
-        toc = time.perf_counter()
-        logger.info(f"finished renumber of {tree} tree in {toc-tic}s")
-
-        for treedef in treedefs:
-            if treedef.specify_model.name.lower().startswith(tree):
-                tic = time.perf_counter()
-                set_fullnames(treedef, null_only=True)
-                toc = time.perf_counter()
-                logger.info(f"finished reset fullnames of {tree} tree in {toc-tic}s")
-
-
-def changed_tree(tree: str, result: UploadResult) -> bool:
-    return (
-        (
-            (
-                isinstance(result.record_result, Uploaded)
-                or isinstance(result.record_result, Updated)
-                or isinstance(result.record_result, Deleted)
-                or isinstance(result.record_result, MatchedAndChanged)
-            )
-            and result.record_result.info.tableName.lower() == tree
-        )
-        or any(changed_tree(tree, toOne) for toOne in result.toOne.values())
-        or any(
-            changed_tree(tree, r) for toMany in result.toMany.values() for r in toMany
-        )
-    )
-
-
 def adjust_pack(
     pack: BatchEditJson | None,
     upload_result: UploadResult,
@@ -587,8 +611,8 @@ def rollback_batch_edit(
 
     inserted_records = []
 
-    assert parent.rowresults is not None
-    row_results = json.loads(parent.rowresults)
+    row_results = parent.get_row_results()
+    assert row_results is not None
 
     def look_up_in_backer(_id):
         row = parent.data[_id]
@@ -653,5 +677,5 @@ def rollback_batch_edit(
     # parent.rowresults = json.dumps([r.to_json() for r in results])
     # parent.save(update_fields=['rowresults'])
 
-    parent.rowresults = None
-    parent.save(update_fields=["rowresults"])
\ No newline at end of file
+    parent.clear_row_results()
+    parent.save(update_fields=["rowresults", "rowresultcount"])
\ No newline at end of file
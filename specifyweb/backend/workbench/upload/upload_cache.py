@@ -0,0 +1,86 @@
+import logging
+from collections import OrderedDict
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class UploadCache(OrderedDict):
+    """Match/reference cache shared by all rows of a single upload.
+
+    Rows that fail are rolled back in the database, so anything a failed row
+    put in the cache has to be forgotten as well. Instead of copying the whole
+    cache before every row, writes made after `begin()` are journaled (the
+    value a key had before its first change in the row), and `rollback()`
+    restores just those keys. Rolling back a row is therefore proportional to
+    the number of keys the row touched, not to the size of the cache.
+
+    If `maxsize` is given, the least recently used entries are evicted once
+    the cache grows past it. Evicting is always safe, since the cache is only
+    ever used to skip queries.
+    """
+
+    def __init__(self, maxsize: int | None = None):
+        super().__init__()
+        self.maxsize = maxsize
+        self._journal: dict[Any, Any] | None = None
+
+    def _record(self, key) -> None:
+        if self._journal is not None and key not in self._journal:
+            self._journal[key] = super().get(key, _MISSING)
+
+    def get(self, key, default=None):
+        if key not in self:
+            return default
+        if self.maxsize is not None:
+            self.move_to_end(key)
+        return self[key]
+
+    def __setitem__(self, key, value) -> None:
+        self._record(key)
+        super().__setitem__(key, value)
+        if self.maxsize is not None:
+            self.move_to_end(key)
+            while len(self) > self.maxsize:
+                oldest = next(iter(self))
+                self._record(oldest)
+                super().__delitem__(oldest)
+
+    def __delitem__(self, key) -> None:
+        self._record(key)
+        super().__delitem__(key)
+
+    def pop(self, key, default=_MISSING):
+        if key in self:
+            self._record(key)
+            return super().pop(key)
+        if default is _MISSING:
+            raise KeyError(key)
+        return default
+
+    @property
+    def in_transaction(self) -> bool:
+        return self._journal is not None
+
+    def begin(self) -> None:
+        assert self._journal is None, "Upload cache transaction already open!"
+        self._journal = {}
+
+    def commit(self) -> None:
+        self._journal = None
+
+    def rollback(self) -> None:
+        journal, self._journal = self._journal, None
+        if journal is None:
+            return
+        logger.debug(f"rolling back {len(journal)} upload cache entries")
+        for key, old_value in journal.items():
+            if old_value is _MISSING:
+                super().pop(key, None)
+            else:
+                super().__setitem__(key, old_value)
+        if self.maxsize is not None:
+            while len(self) > self.maxsize:
+                self.popitem(last=False)
@@ -354,6 +354,24 @@ class UploadResult(NamedTuple):
             )
         )
 
+    def summary(self) -> dict:
+        """Whether the row failed, and the number of each kind of record result per table."""
+        records: dict[str, dict[str, int]] = {}
+
+        def count(result: "UploadResult") -> None:
+            info = getattr(result.record_result, "info", None)
+            if info is not None:
+                tables = records.setdefault(type(result.record_result).__name__, {})
+                tables[info.tableName] = tables.get(info.tableName, 0) + 1
+            for to_one in result.toOne.values():
+                count(to_one)
+            for to_many in result.toMany.values():
+                for record in to_many:
+                    count(record)
+
+        count(self)
+        return {"failure": self.contains_failure(), "records": records}
+
     def to_json(self) -> dict:
         return {
             "UploadResult": {
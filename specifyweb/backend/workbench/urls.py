@@ -12,6 +12,7 @@ urlpatterns = [
     re_path(r'^unupload/(?P<ds_id>\d+)/', views.unupload),
     re_path(r'^status/(?P<ds_id>\d+)/', views.status),
     re_path(r'^upload_results/(?P<ds_id>\d+)/', views.upload_results),
+    re_path(r'^upload_results_summary/(?P<ds_id>\d+)/', views.upload_results_summary),
     re_path(r'^abort/(?P<ds_id>\d+)/', views.abort),
     re_path(r'^validate_row/(?P<ds_id>\d+)/', views.validate_row),
     re_path(r'^transfer/(?P<ds_id>\d+)/', views.transfer),
@@ -22,7 +22,7 @@ from specifyweb.backend.permissions.permissions import (
     check_permission_targets,
     check_table_permissions,
 )
-from . import models, tasks
+from . import models, row_edits, tasks
 from .upload import upload as uploader, upload_plan_schema
 
 logger = logging.getLogger(__name__)
@@ -50,6 +50,19 @@ def regularize_rows(ncols: int, rows: list[list], skip_empty=True) -> list[list[
     return [r for r in map(regularize, rows) if r is not None]
 
 
+def parse_row_range(request) -> tuple[int, int | None]:
+    "Returns the [start, end) rows selected by the offset and limit GET parameters."
+    try:
+        offset = int(request.GET.get("offset", 0))
+        limit = request.GET.get("limit", None)
+        end = None if limit is None else offset + int(limit)
+    except ValueError:
+        raise ValueError("offset and limit must be integers")
+    if offset < 0 or (end is not None and end < offset):
+        raise ValueError("offset and limit must not be negative")
+    return offset, end
+
+
 open_api_components = {
     "schemas": {
         "wb_uploadresult": {
@@ -382,6 +395,11 @@ def datasets(request) -> http.HttpResponse:
                                         "$ref": "#/components/schemas/wb_visualorder"
                                     },
                                     "rows": {"$ref": "#/components/schemas/wb_rows"},
+                                    "hasrowresults": {
+                                        "type": "boolean",
+                                        "description": "Whether the dataset has validation or upload "
+                                        + "results, which are fetched through upload_results.",
+                                    },
                                     "uploadplan": {
                                         "$ref": "#/components/schemas/wb_uploadplan"
                                     },
@@ -536,7 +554,7 @@ def dataset(request, ds: models.Spdataset) -> http.HttpResponse:
                             )
 
                 ds.uploadplan = json.dumps(plan) if plan is not None else None
-                ds.rowresults = None
+                ds.clear_row_results()
                 ds.uploadresult = None
 
             ds.save()
@@ -559,6 +577,23 @@ def dataset(request, ds: models.Spdataset) -> http.HttpResponse:
 @openapi(
     schema={
         "get": {
+            "parameters": [
+                {
+                    "name": "offset",
+                    "in": "query",
+                    "required": False,
+                    "schema": {"type": "integer", "minimum": 0},
+                    "description": "Index of the first row to return.",
+                },
+                {
+                    "name": "limit",
+                    "in": "query",
+                    "required": False,
+                    "schema": {"type": "integer", "minimum": 0},
+                    "description": "Maximum number of rows to return. "
+                    + "If absent, all the rows from offset are returned.",
+                },
+            ],
             "responses": {
                 "200": {
                     "description": "Successful response",
@@ -609,17 +644,31 @@ def dataset(request, ds: models.Spdataset) -> http.HttpResponse:
                 "409": {"description": "Dataset in use by uploader"},
             },
         },
+        "patch": {
+            "requestBody": {
+                "required": True,
+                "description": "A list of row edits applied in order. Each edit sees the rows "
+                + "as left by the previous ones. Validation results of rows that are "
+                + "only moved are kept.",
+                "content": {"application/json": {"schema": row_edits.schema}},
+            },
+            "responses": {
+                "204": {"description": "Data set rows updated."},
+                "400": {"description": "Invalid row edits"},
+                "409": {"description": "Dataset in use by uploader"},
+            },
+        },
     },
     components=open_api_components,
 )
 @login_maybe_required
-@require_http_methods(["GET", "PUT"])
+@require_http_methods(["GET", "PUT", "PATCH"])
 @transaction.atomic
 @models.Spdataset.validate_dataset_request(raise_404=False, lock_object=True)
 def rows(request, ds) -> http.HttpResponse:
-    """Returns (GET) or sets (PUT) the row data for dataset <ds_id>."""
+    """Returns (GET), sets (PUT) or edits (PATCH) the row data for dataset <ds_id>."""
 
-    if request.method == "PUT":
+    if request.method in ("PUT", "PATCH"):
         check_permission_targets(
             request.specify_collection.id,
             request.specify_user.id,
@@ -632,19 +681,65 @@ def rows(request, ds) -> http.HttpResponse:
                 "dataset has been uploaded. changing data not allowed.", status=400
             )
 
+    if request.method == "PUT":
         rows = regularize_rows(
             len(ds.columns), json.load(request), skip_empty=(ds.isupdate != True)
         )
 
         ds.data = rows
-        ds.rowresults = None
+        ds.clear_row_results()
         ds.uploadresult = None
         ds.modifiedbyagent = request.specify_user_agent
         ds.save()
         return http.HttpResponse(status=204)
 
+    elif request.method == "PATCH":
+        edits = json.load(request)
+        try:
+            validate(edits, row_edits.schema)
+        except ValidationError as e:
+            return http.HttpResponse(f"row edits are invalid: {e}", status=400)
+
+        previous_row_count = len(ds.data)
+        try:
+            origins = row_edits.apply_row_edits(
+                ds.data, len(ds.columns), edits, skip_empty=(ds.isupdate != True)
+            )
+        except row_edits.RowEditError as e:
+            return http.HttpResponse(f"row edits are invalid: {e}", status=400)
+
+        ds.remap_row_results(origins, previous_row_count)
+        ds.uploadresult = None
+        ds.modifiedbyagent = request.specify_user_agent
+        ds.save(
+            update_fields=[
+                "data",
+                "rowresults",
+                "rowresultcount",
+                "uploadresult",
+                "modifiedbyagent",
+                "timestampmodified",
+            ]
+        )
+        return http.HttpResponse(status=204)
+
     else:  # GET
-        return http.JsonResponse(ds.data, safe=False)
+        if "offset" not in request.GET and "limit" not in request.GET:
+            return http.JsonResponse(ds.data, safe=False)
+        try:
+            offset, end = parse_row_range(request)
+        except ValueError as e:
+            return http.HttpResponseBadRequest(str(e))
+        return http.JsonResponse(ds.data[offset:end], safe=False)
+
+
+def should_shard_validation(ds: models.Spdataset) -> bool:
+    return (
+        getattr(settings, "WB_VALIDATION_SHARDS", 1) > 1
+        and len(ds.data) >= getattr(settings, "WB_VALIDATION_SHARD_MIN_ROWS", 0)
+        # Batch edit rows reference existing records in place.
+        and not ds.isupdate
+    )
 
 
 @openapi(
@@ -693,7 +788,8 @@ def upload(request, ds, no_commit: bool, allow_partial: bool) -> http.HttpRespon
             return http.HttpResponse(
                 "dataset belongs to a different collection.", status=400
             )
-        if ds.was_uploaded():
+        if ds.was_uploaded() and (no_commit or ds.uploadcheckpoint is None):
+            # Uploading again resumes an upload in chunks that didn't finish.
             return http.HttpResponse("dataset has already been uploaded.", status=400)
 
         data = json.loads(request.body) if request.body else {}
@@ -701,7 +797,18 @@ def upload(request, ds, no_commit: bool, allow_partial: bool) -> http.HttpRespon
         if 'background' in data:
             background = bool(data['background']) # {"background": false}
 
-        if background:
+        if background and no_commit and should_shard_validation(ds):
+            taskid = str(uuid4())
+            tasks.start_sharded_validation(
+                request.specify_collection.id,
+                request.specify_user_agent.id,
+                ds,
+                allow_partial,
+                getattr(settings, "WB_VALIDATION_SHARDS", 1),
+                taskid,
+            )
+            return http.JsonResponse(taskid, safe=False)
+        elif background:
             taskid = str(uuid4())
             async_result = tasks.upload.apply_async([
                 request.specify_collection.id,
@@ -828,9 +935,34 @@ def status(request, ds_id: int) -> http.HttpResponse:
         'taskstatus': task_status_map.get(result.state, result.state),
         'taskinfo': result.info if isinstance(result.info, dict) else repr(result.info)
     }
+
+    if 'shards' in ds.uploaderstatus and result.state == CELERY_TASK_STATE.PENDING:
+        # The merge task hasn't started yet. Report the shards' progress.
+        status.update(sharded_validation_status(ds.uploaderstatus['shards']))
+
     return http.JsonResponse(status)
 
 
+def sharded_validation_status(shards: list[dict]) -> dict:
+    current = 0
+    states = []
+    for shard in shards:
+        result = tasks.validate_dataset_shard.AsyncResult(shard['taskid'])
+        states.append(result.state)
+        if result.state == CELERY_TASK_STATE.SUCCESS:
+            current += shard['end'] - shard['start']
+        elif isinstance(result.info, dict):
+            current += result.info.get('current', 0)
+
+    if any(state == CELERY_TASK_STATE.FAILURE for state in states):
+        return {'taskstatus': "FAILURE", 'taskinfo': "validation shard failed"}
+
+    return {
+        'taskstatus': "PROGRESS" if current > 0 else "PENDING",
+        'taskinfo': {'current': current, 'total': shards[-1]['end']},
+    }
+
+
 @openapi(
     schema={
         "post": {
@@ -877,6 +1009,8 @@ def abort(request, ds) -> http.HttpResponse:
         "unuploading": tasks.unupload,
     }[ds.uploaderstatus["operation"]]
     result = task.AsyncResult(ds.uploaderstatus["taskid"]).revoke(terminate=True)
+    for shard in ds.uploaderstatus.get("shards", []):
+        tasks.validate_dataset_shard.AsyncResult(shard["taskid"]).revoke(terminate=True)
 
     try:
         models.Spdataset.objects.filter(id=ds.id).update(uploaderstatus=None)
@@ -898,9 +1032,26 @@ def abort(request, ds) -> http.HttpResponse:
 @openapi(
     schema={
         "get": {
+            "parameters": [
+                {
+                    "name": "offset",
+                    "in": "query",
+                    "required": False,
+                    "schema": {"type": "integer", "minimum": 0},
+                    "description": "Index of the first row to return results for.",
+                },
+                {
+                    "name": "limit",
+                    "in": "query",
+                    "required": False,
+                    "schema": {"type": "integer", "minimum": 0},
+                    "description": "Maximum number of rows to return results for. "
+                    + "If absent, results for all rows from offset are returned.",
+                },
+            ],
             "responses": {
                 "200": {
-                    "description": "Successful operation",
+                    "description": "Successful operation. Rows without a result are null.",
                     "content": {
                         "text/plain": {
                             "schema": {
@@ -923,18 +1074,74 @@ def abort(request, ds) -> http.HttpResponse:
 def upload_results(request, ds) -> http.HttpResponse:
     "Returns the detailed upload/validation results if any for the dataset <ds_id>."
 
-    if ds.rowresults is None:
+    if not ds.has_row_results():
         return http.JsonResponse(None, safe=False)
 
-    results = json.loads(ds.rowresults)
+    try:
+        offset, end = parse_row_range(request)
+    except ValueError as e:
+        return http.HttpResponseBadRequest(str(e))
+
+    results = ds.get_row_results(offset, end)
 
     if settings.DEBUG:
         from .upload.upload_results_schema import schema
 
-        validate(results, schema)
+        validate([result for result in results if result is not None], schema)
     return http.JsonResponse(results, safe=False)
 
 
+@openapi(
+    schema={
+        "get": {
+            "responses": {
+                "200": {
+                    "description": "Successful operation",
+                    "content": {
+                        "application/json": {
+                            "schema": {
+                                "type": "object",
+                                "properties": {
+                                    "rows": {
+                                        "type": "integer",
+                                        "description": "Number of rows the results were computed for",
+                                    },
+                                    "resultRows": {
+                                        "type": "integer",
+                                        "description": "Number of rows that still have a result",
+                                    },
+                                    "failedRows": {
+                                        "type": "integer",
+                                        "description": "Number of rows whose result contains a failure",
+                                    },
+                                    "records": {
+                                        "type": "object",
+                                        "description": "Maps record result types to the number of "
+                                        + "records of each table with that result",
+                                        "additionalProperties": {
+                                            "type": "object",
+                                            "additionalProperties": {"type": "integer"},
+                                        },
+                                    },
+                                },
+                                "required": ["rows", "resultRows", "failedRows", "records"],
+                                "additionalProperties": False,
+                            }
+                        }
+                    },
+                },
+            }
+        },
+    },
+)
+@login_maybe_required
+@require_GET
+@models.Spdataset.validate_dataset_request(raise_404=True, lock_object=False)
+def upload_results_summary(request, ds) -> http.HttpResponse:
+    "Returns aggregate counts of the upload/validation results if any for the dataset <ds_id>."
+    return http.JsonResponse(ds.get_row_results_summary(), safe=False)
+
+
 @openapi(
     schema={
         "get": {
@@ -1179,7 +1386,7 @@ def create_recordset(request, ds) -> http.HttpResponse:
     if ds.uploadplan is None:
         return http.HttpResponseBadRequest("data set is missing upload plan")
 
-    if ds.rowresults is None:
+    if not ds.has_row_results():
         return http.HttpResponseBadRequest("data set is missing row upload results")
 
     if "name" not in request.POST:
@@ -159,7 +159,7 @@ describe('fetch notifications', () => {
   const firstFetchTime = new Date(testTime);
 
   overrideAjax(
-    formatUrl(`/notifications/messages/`, {
+    formatUrl(`/notifications/messages/wait/`, {
       since: formatDateForBackEnd(firstFetchTime),
     }),
     [
@@ -179,7 +179,7 @@ describe('fetch notifications', () => {
   );
 
   overrideAjax(
-    formatUrl(`/notifications/messages/`, {
+    formatUrl(`/notifications/messages/wait/`, {
       since: formatDateForBackEnd(secondFetchTime),
     }),
     [
@@ -52,12 +52,14 @@ export function useNotificationsFetch({
         rawServerTime = startFetchTimestamp.toISOString();
       }
 
-      // Use raw server time string for URL
-      const baseUrl = `/notifications/messages/`;
+      /*
+       * Use raw server time string for URL. Requests for new notifications
+       * wait on the server until one is created, if the server allows it
+       */
       const url =
         lastRawTimeRef.current === undefined
-          ? baseUrl
-          : formatUrl(baseUrl, {
+          ? `/notifications/messages/`
+          : formatUrl(`/notifications/messages/wait/`, {
               since: formatDateForServer(lastRawTimeRef.current),
             });
 
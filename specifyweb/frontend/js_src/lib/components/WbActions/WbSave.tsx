@@ -19,7 +19,7 @@ export const handleWorkbenchSave = async (
   handleSpreadsheetUpToDate: () => void
 ): Promise<void> => {
   // Clear validation
-  overwriteReadOnly(workbench.dataset, 'rowresults', null);
+  overwriteReadOnly(workbench.dataset, 'hasrowresults', false);
   workbench.validation.stopLiveValidation();
 
   // Send data
@@ -16,7 +16,6 @@ import type { Tables } from '../DataModel/types';
 import { useTitle } from '../Molecules/AppTitle';
 import { ProtectedAction } from '../Permissions/PermissionDenied';
 import { usesAttachments } from '../WorkBench/attachmentHelpers';
-import type { UploadResult } from '../WorkBench/resultsParser';
 import { savePlan } from './helpers';
 import { getLinesFromHeaders, getLinesFromUploadPlan } from './linesGetter';
 import type { MappingLine, ReadonlySpec } from './Mapper';
@@ -78,7 +77,7 @@ export type DatasetBrief = DatasetBriefBase & {
 export type Dataset = DatasetBase &
   DatasetBrief & {
     readonly columns: RA<string>;
-    readonly rowresults: RA<UploadResult> | null;
+    readonly hasrowresults: boolean;
     readonly rows: RA<RA<string>>;
     readonly uploadplan: UploadPlan | null;
     readonly visualorder: RA<number> | null;
@@ -25,7 +25,7 @@ const dataset: Dataset = {
   uploadresult: null,
   uploaderstatus: null,
   columns: [],
-  rowresults: null,
+  hasrowresults: false,
   rows: [],
   uploadplan: null,
   visualorder: null,
@@ -53,7 +53,7 @@ const dataset: Dataset = {
   uploadresult: null,
   uploaderstatus: null,
   columns: ['Catalog Number', 'Remarks'],
-  rowresults: null,
+  hasrowresults: false,
   rows: [['100']],
   uploadplan: null,
   visualorder: [1, 0],
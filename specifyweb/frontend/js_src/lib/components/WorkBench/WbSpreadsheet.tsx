@@ -202,15 +202,16 @@ function WbSpreadsheetComponent({
             manualColumnMove: writable(dataset.visualorder),
           });
         // Highlight validation cells
-        if (dataset.rowresults) {
-          validation.getValidationResults();
-          if (validation.validationMode === 'static' && !isUploaded)
-            workbench.utils.toggleCellTypes('invalidCells', 'remove');
-          workbench.cells.indexedCellMeta = undefined;
-        }
+        if (dataset.hasrowresults)
+          return validation.getValidationResults().then(() => {
+            if (validation.validationMode === 'static' && !isUploaded)
+              workbench.utils.toggleCellTypes('invalidCells', 'remove');
+            workbench.cells.indexedCellMeta = undefined;
+          });
+        return undefined;
       });
     });
-  }, [hot, dataset.rowresults]);
+  }, [hot, dataset.hasrowresults]);
 
   const {
     autoWrapCol,
@@ -20,6 +20,8 @@ import {
 } from './resultsParser';
 import type { Workbench } from './WbView';
 
+const VALIDATION_RESULTS_PAGE_SIZE = 1000;
+
 type Records = WritableArray<
   WritableArray<
     WritableArray<
@@ -86,7 +88,7 @@ export class WbValidation {
   public constructor(private readonly workbench: Workbench) {
     this.stopLiveValidation();
     this.validationMode =
-      this.workbench.dataset.rowresults === null ? 'off' : 'static';
+      this.workbench.dataset.hasrowresults ? 'static' : 'off';
   }
 
   public toggleDataCheck(): void {
@@ -480,19 +482,35 @@ export class WbValidation {
     );
   }
 
-  public getValidationResults(): void {
+  public async getValidationResults(): Promise<void> {
     if (this.workbench.mappings === undefined) return;
 
-    if (this.workbench.dataset.rowresults === null) {
+    if (!this.workbench.dataset.hasrowresults) {
       this.validationMode = 'off';
       return;
     }
 
-    this.workbench.hot?.batch(() => {
-      this.workbench.dataset.rowresults?.forEach((result, physicalRow) => {
-        this.applyRowValidationResults(physicalRow, result);
-      });
-    });
+    // Fetched in pages, so large data sets don't need one huge response
+    for (let offset = 0; ; offset += VALIDATION_RESULTS_PAGE_SIZE) {
+      const { data: results } = await ajax<RA<UploadResult | null> | null>(
+        `/api/workbench/upload_results/${this.workbench.dataset.id}/?offset=${offset}&limit=${VALIDATION_RESULTS_PAGE_SIZE}`,
+        { headers: { Accept: 'application/json' } }
+      );
+      if (
+        results === null ||
+        this.validationMode !== 'static' ||
+        this.workbench.hot?.isDestroyed !== false
+      )
+        return;
+
+      this.workbench.hot.batch(() =>
+        results.forEach((result, index) => {
+          if (result !== null)
+            this.applyRowValidationResults(offset + index, result);
+        })
+      );
+      if (results.length < VALIDATION_RESULTS_PAGE_SIZE) break;
+    }
 
     this.workbench.cells?.updateCellInfoStats();
   }
@@ -126,7 +126,7 @@ test('shows the selected row attachment', async () => {
     uploadresult: null,
     uploaderstatus: null,
     columns: ['catalogNumber', ATTACHMENTS_COLUMN],
-    rowresults: null,
+    hasrowresults: false,
     rows: [],
     uploadplan: null,
     visualorder: null,
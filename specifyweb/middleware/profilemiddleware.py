@@ -1,48 +1,211 @@
-import sys
+"""
+Per-request profiling.
+
+When REQUEST_PROFILING is set, the wall time of every request and the
+number and time of the SQL statements it runs, through both the Django
+and the SQLAlchemy connections, are logged on the specifyweb.profile
+logger, together with the slowest statements.
+
+A REQUEST_PROFILING_SAMPLE_RATE fraction of the requests, and requests
+with an X-Specify-Profile header matching REQUEST_PROFILING_TOKEN, are
+also run under cProfile, whether or not REQUEST_PROFILING is set. The
+profile is written to REQUEST_PROFILING_DIR, where it can be read with
+pstats or snakeviz. Only requests with the token get the timings back
+in a Server-Timing header, so they aren't disclosed to other clients.
+
+Time spent producing the content of streaming responses, such as
+attachment downloads, is not included.
+"""
+
+import cProfile
+import heapq
+import hmac
+import json
+import logging
+import os
+import random
+import re
 import tempfile
-import hotshot
-import hotshot.stats
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+from typing import NamedTuple
+
 from django.conf import settings
-from io import StringIO
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('specifyweb.profile')
+
+PROFILE_HEADER = 'X-Specify-Profile'
+
+# Statements are cut to this many characters in the log.
+STATEMENT_LOG_LENGTH = 500
+
+
+class Statement(NamedTuple):
+    duration: float
+    sql: str
+
+
+class SQLStatistics:
+    """The number and total time of the statements run through one kind
+    of connection, and the slowest of them."""
+
+    def __init__(self, slowest: int) -> None:
+        self.count = 0
+        self.duration = 0.0
+        self._keep = slowest
+        self._slowest: list[tuple[float, int, str]] = []
+
+    def record(self, duration: float, sql: str) -> None:
+        self.count += 1
+        self.duration += duration
+        entry = (duration, self.count, sql)
+        if len(self._slowest) < self._keep:
+            heapq.heappush(self._slowest, entry)
+        elif self._keep > 0 and duration > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, entry)
+
+    def slowest(self) -> list[Statement]:
+        return [Statement(duration, sql) for duration, _, sql in sorted(self._slowest, reverse=True)]
+
+
+class RequestProfile:
+    def __init__(self, slowest: int) -> None:
+        self.start = time.perf_counter()
+        self.django = SQLStatistics(slowest)
+        self.sqlalchemy = SQLStatistics(slowest)
+
+
+_active_profile: ContextVar[RequestProfile | None] = ContextVar('active_profile', default=None)
+
+
+def _record_django_statement(execute, sql, params, many, context):
+    profile = _active_profile.get()
+    tic = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if profile is not None:
+            profile.django.record(time.perf_counter() - tic, sql)
+
+
+def _before_sqlalchemy_statement(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('profile_statement_start', []).append(time.perf_counter())
+
+
+def _after_sqlalchemy_statement(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('profile_statement_start')
+    profile = _active_profile.get()
+    if starts:
+        tic = starts.pop()
+        if profile is not None:
+            profile.sqlalchemy.record(time.perf_counter() - tic, statement)
+
+
+def _listen_to_sqlalchemy() -> None:
+    from sqlalchemy import event
+    from specifyweb.backend.stored_queries.models import engine
+
+    if not event.contains(engine, 'before_cursor_execute', _before_sqlalchemy_statement):
+        event.listen(engine, 'before_cursor_execute', _before_sqlalchemy_statement)
+        event.listen(engine, 'after_cursor_execute', _after_sqlalchemy_statement)
+
+
+def server_timing(profile: RequestProfile, total: float) -> str:
+    return ', '.join([
+        f'total;dur={1000 * total:.1f}',
+        f'db;dur={1000 * profile.django.duration:.1f};desc="{profile.django.count} queries"',
+        f'sa;dur={1000 * profile.sqlalchemy.duration:.1f};desc="{profile.sqlalchemy.count} queries"',
+    ])
+
 
 class ProfileMiddleware:
-    """
-    Displays hotshot profiling for any view.
-    https://yoursite.com/yourview/?prof
-
-    Add the "prof" key to query string by appending ?prof (or &prof=)
-    and you'll see the profiling results in your browser.
-    It's set up to only be available in django's debug mode,
-    but you really shouldn't add this middleware to any production configuration.
-    * Only tested on Linux
-    """
-    def process_request(self, request):
-        if settings.DEBUG: # and request.GET.has_key('prof'):
-            self.tmpfile = tempfile.NamedTemporaryFile(delete=False)
-            self.prof = hotshot.Profile(self.tmpfile.name)
-
-    def process_view(self, request, callback, callback_args, callback_kwargs):
-        if settings.DEBUG: # and request.GET.has_key('prof'):
-            return self.prof.runcall(callback, request, *callback_args, **callback_kwargs)
-
-    def process_response(self, request, response):
-        if settings.DEBUG: # and request.GET.has_key('prof'):
-            self.prof.close()
-            print(self.tmpfile.name)
-
-            # out = StringIO()
-            # old_stdout = sys.stdout
-            # sys.stdout = out
-
-            # stats = hotshot.stats.load(self.tmpfile.name)
-            # #stats.strip_dirs()
-            # stats.sort_stats('cum', 'calls')
-            # stats.print_stats()
-
-            # sys.stdout = old_stdout
-            # stats_str = out.getvalue()
-
-            # if response and response.content and stats_str:
-            #     response.content = "<pre>" + stats_str + "</pre>"
+    """Reports the time and SQL statements of requests. Only active when
+    REQUEST_PROFILING, REQUEST_PROFILING_SAMPLE_RATE or
+    REQUEST_PROFILING_TOKEN is set."""
+
+    def __init__(self, get_response) -> None:
+        self.enabled = getattr(settings, 'REQUEST_PROFILING', False)
+        self.sample_rate = getattr(settings, 'REQUEST_PROFILING_SAMPLE_RATE', 0)
+        self.token = getattr(settings, 'REQUEST_PROFILING_TOKEN', None)
+        if not self.enabled and not self.sample_rate > 0 and self.token is None:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.slowest = getattr(settings, 'REQUEST_PROFILING_SLOW_STATEMENTS', 5)
+        self.directory = getattr(settings, 'REQUEST_PROFILING_DIR', None) or tempfile.gettempdir()
+        _listen_to_sqlalchemy()
+
+    def has_token(self, request) -> bool:
+        # Compared as bytes, since compare_digest rejects non-ASCII str.
+        return self.token is not None and hmac.compare_digest(
+            request.headers.get(PROFILE_HEADER, '').encode(), self.token.encode())
+
+    def __call__(self, request):
+        has_token = self.has_token(request)
+        sampled = self.sample_rate > 0 and random.random() < self.sample_rate
+        if not (self.enabled or has_token or sampled):
+            return self.get_response(request)
 
+        profile = RequestProfile(self.slowest)
+        cprofile = cProfile.Profile() if has_token or sampled else None
+        token = _active_profile.set(profile)
+        try:
+            with ExitStack() as stack:
+                for conn in connections.all():
+                    stack.enter_context(conn.execute_wrapper(_record_django_statement))
+                if cprofile is not None:
+                    try:
+                        cprofile.enable()
+                    except ValueError:
+                        # Another profiler is already active in this thread.
+                        cprofile = None
+                try:
+                    response = self.get_response(request)
+                finally:
+                    if cprofile is not None:
+                        cprofile.disable()
+        finally:
+            _active_profile.reset(token)
+
+        total = time.perf_counter() - profile.start
+        if has_token:
+            response['Server-Timing'] = server_timing(profile, total)
+        dump = self.dump(request, cprofile) if cprofile is not None else None
+        self.log(request, response, profile, total, dump)
         return response
+
+    def dump(self, request, cprofile: cProfile.Profile) -> str | None:
+        name = re.sub(r'[^A-Za-z0-9]+', '_', request.path).strip('_') or 'root'
+        path = os.path.join(
+            self.directory,
+            f'{time.strftime("%Y%m%dT%H%M%S")}-{os.getpid()}-{request.method}-{name[:100]}.prof',
+        )
+        try:
+            cprofile.dump_stats(path)
+        except OSError as e:
+            logger.warning("could not write request profile %s: %s", path, e)
+            return None
+        return path
+
+    def log(self, request, response, profile: RequestProfile, total: float, dump: str | None) -> None:
+        def statements(statistics: SQLStatistics) -> list[dict]:
+            return [
+                {'ms': round(1000 * s.duration, 2), 'sql': s.sql[:STATEMENT_LOG_LENGTH]}
+                for s in statistics.slowest()
+            ]
+
+        logger.info("%s", json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(1000 * total, 2),
+            'db_queries': profile.django.count,
+            'db_ms': round(1000 * profile.django.duration, 2),
+            'sa_queries': profile.sqlalchemy.count,
+            'sa_ms': round(1000 * profile.sqlalchemy.duration, 2),
+            'slowest_db': statements(profile.django),
+            'slowest_sa': statements(profile.sqlalchemy),
+            'profile': dump,
+        }))
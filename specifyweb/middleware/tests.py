@@ -0,0 +1,72 @@
+import os
+import tempfile
+
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+from django.test.utils import override_settings
+
+from specifyweb.specify.models import Collection
+
+from .profilemiddleware import ProfileMiddleware, SQLStatistics
+
+
+def view(request):
+    list(Collection.objects.all())
+    list(Collection.objects.filter(id=0))
+    return HttpResponse('OK')
+
+
+@override_settings(REQUEST_PROFILING=True)
+class ProfileMiddlewareTests(TestCase):
+
+    def test_not_used_unless_enabled(self) -> None:
+        with override_settings(REQUEST_PROFILING=False):
+            with self.assertRaises(MiddlewareNotUsed):
+                ProfileMiddleware(view)
+
+    def test_reports_queries(self) -> None:
+        with self.assertLogs('specifyweb.profile', 'INFO') as logs:
+            response = ProfileMiddleware(view)(RequestFactory().get('/context/user.json'))
+
+        self.assertNotIn('Server-Timing', response)
+        self.assertIn('"db_queries": 2', logs.output[0])
+        self.assertIn('"profile": null', logs.output[0])
+
+    @override_settings(REQUEST_PROFILING=False, REQUEST_PROFILING_TOKEN='secret')
+    def test_token_enables_profiling(self) -> None:
+        with tempfile.TemporaryDirectory() as directory, \
+                override_settings(REQUEST_PROFILING_DIR=directory):
+            middleware = ProfileMiddleware(view)
+            with self.assertNoLogs('specifyweb.profile', 'INFO'):
+                response = middleware(RequestFactory().get('/context/user.json'))
+            self.assertNotIn('Server-Timing', response)
+
+            with self.assertLogs('specifyweb.profile', 'INFO') as logs:
+                response = middleware(RequestFactory().get('/context/user.json', HTTP_X_SPECIFY_PROFILE='secret'))
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('desc="2 queries"', response['Server-Timing'])
+        self.assertIn('"db_queries": 2', logs.output[0])
+
+    def test_profiles_requests_with_token(self) -> None:
+        with tempfile.TemporaryDirectory() as directory, \
+                override_settings(REQUEST_PROFILING_TOKEN='secret', REQUEST_PROFILING_DIR=directory), \
+                self.assertLogs('specifyweb.profile', 'INFO'):
+            middleware = ProfileMiddleware(view)
+            middleware(RequestFactory().get('/api/specify/collection/'))
+            self.assertEqual(os.listdir(directory), [])
+
+            middleware(RequestFactory().get('/api/specify/collection/', HTTP_X_SPECIFY_PROFILE='sécret'))
+            self.assertEqual(os.listdir(directory), [])
+
+            middleware(RequestFactory().get('/api/specify/collection/', HTTP_X_SPECIFY_PROFILE='secret'))
+            [dump] = os.listdir(directory)
+            self.assertTrue(dump.endswith('-GET-api_specify_collection.prof'))
+
+    def test_keeps_slowest_statements(self) -> None:
+        statistics = SQLStatistics(slowest=2)
+        for duration, sql in [(0.1, 'a'), (0.3, 'b'), (0.2, 'c'), (0.05, 'd')]:
+            statistics.record(duration, sql)
+
+        self.assertEqual(statistics.count, 4)
+        self.assertEqual([s.sql for s in statistics.slowest()], ['b', 'c'])
@@ -223,7 +223,7 @@ TEMPLATES = [
 ]
 
 MIDDLEWARE = [
-#    'middleware.profilemiddleware.ProfileMiddleware',
+    'specifyweb.middleware.profilemiddleware.ProfileMiddleware',
     'django.middleware.gzip.GZipMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',
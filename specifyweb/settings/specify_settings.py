@@ -123,6 +123,90 @@ STATS_2_URL = "https://stats-2.specifycloud.org"
 # Must exist and be writeable by the web server process.
 WB_UPLOAD_LOG_DIR = "/home/specify/wb_upload_logs"
 
+# Maximum number of entries kept in the WorkBench match cache while
+# uploading or validating a data set. Least recently used entries are
+# evicted past this bound. None keeps every entry for the whole upload.
+WB_UPLOAD_CACHE_MAX_ENTRIES = None
+
+# Resolve the to-one matches of all rows of a WorkBench data set with a
+# few bulk queries before processing the rows one by one.
+WB_UPLOAD_PREFETCH_MATCHES = True
+
+# Validate large WorkBench data sets split into this many row ranges, each
+# handled by a separate worker task. 1 validates every data set serially.
+# Only data sets with at least WB_VALIDATION_SHARD_MIN_ROWS rows are split.
+WB_VALIDATION_SHARDS = 1
+WB_VALIDATION_SHARD_MIN_ROWS = 5000
+
+# Commit WorkBench uploads every this many rows, saving a checkpoint the
+# upload resumes from if it is interrupted. A row that fails rolls back the
+# chunks already committed. None uploads every data set in one transaction.
+WB_UPLOAD_CHUNK_SIZE = None
+
+# Number of seconds the result count of a query is cached for, per
+# collection. Records saved or deleted in that time aren't reflected in
+# the count until it expires. None counts the results every time.
+STORED_QUERY_COUNT_CACHE_TTL = None
+
+# Report the optimizer's estimate instead of counting the results of a
+# query estimated to have at least this many. None always counts exactly.
+STORED_QUERY_COUNT_ESTIMATE_THRESHOLD = None
+
+# Number of seconds the permission policies of a user in a collection are
+# cached for. Changes to policies and roles take effect immediately
+# regardless. None queries the policies for every permission check.
+PERMISSION_POLICY_CACHE_TTL = 300
+
+# Number of seconds the collection, user and agent of a request are cached
+# for. Changes to them take effect immediately regardless, but each one
+# makes every request load them again. None queries them for every request.
+REQUEST_CONTEXT_CACHE_TTL = None
+
+# Log the wall time and the number and time of the SQL queries of each
+# request, together with the slowest queries, on the specifyweb.profile
+# logger at INFO level.
+REQUEST_PROFILING = False
+
+# Fraction of the requests that are also run under cProfile and logged,
+# along with requests sending this token in an X-Specify-Profile header,
+# even if REQUEST_PROFILING is False. Requests with the token also get
+# the timings in a Server-Timing header. The profiles are written to
+# REQUEST_PROFILING_DIR, or the temporary directory if None.
+REQUEST_PROFILING_SAMPLE_RATE = 0
+REQUEST_PROFILING_TOKEN = None
+REQUEST_PROFILING_DIR = None
+
+# Number of the slowest queries of each kind logged per request.
+REQUEST_PROFILING_SLOW_STATEMENTS = 5
+
+# Query exports beyond these limits wait in a queue until running exports
+# finish. None removes the limit.
+EXPORT_MAX_CONCURRENT = 3
+EXPORT_MAX_CONCURRENT_PER_USER = 1
+
+# A running query export that hasn't reported progress for this many
+# seconds is taken to have died with its worker. It is failed, so it no
+# longer counts against the limits above. None never fails them.
+EXPORT_RUNNING_TIMEOUT = 3600
+
+# Number of queries of a Darwin Core archive run at the same time, each on
+# its own database connection. Query results waiting to be added to the
+# archive are kept in memory up to DWCA_EXPORT_SPOOL_SIZE bytes each, and
+# in temporary files beyond that.
+DWCA_EXPORT_WORKERS = 4
+DWCA_EXPORT_SPOOL_SIZE = 64 * 1024 * 1024
+
+# Records read by a batch edit query and the rows of the data set made from
+# them are kept in memory up to this many bytes, and in temporary files
+# beyond that.
+BATCH_EDIT_SPOOL_SIZE = 64 * 1024 * 1024
+
+# When set, tree node numbers are spaced this far apart so most new and
+# moved nodes fit in a gap instead of shifting the numbers of the rest of
+# the tree. Trees are re-spaced by a background job when a gap runs out.
+# None numbers tree nodes consecutively.
+TREE_NODE_NUMBER_GAP = None
+
 # Asynchronously generated exports are placed in
 # the following directory. This includes query result
 # exports and Darwin Core archives.
@@ -135,8 +219,28 @@ DEPOSITORY_DIR = '/home/specify/specify_depository'
 # are not left that refer to deleted exports.
 NOTIFICATION_TTL_DAYS = 7
 
+# Number of seconds a request for new notifications waits for one to be
+# created before answering, so they are delivered without polling. Each
+# waiting request occupies a web server worker, so only set this when the
+# server runs threaded or asynchronous workers, and below the proxy's read
+# timeout. None answers immediately.
+NOTIFICATION_WAIT_TIMEOUT = None
+
 DISABLE_AUDITING = False
 
+# Audit log entries written within a buffered block (uploads, merges and
+# API saves) are inserted together once this many records are logged,
+# and when the block ends.
+AUDIT_LOG_BUFFER_SIZE = 1000
+
+# Audit log entries older than the AUDIT_LIFESPAN_MONTHS global
+# preference are purged by a background task queued at most once in
+# this many seconds. The task deletes this many rows at a time,
+# pausing for this many seconds in between.
+AUDIT_LOG_PURGE_INTERVAL = 60 * 60
+AUDIT_LOG_PURGE_CHUNK_SIZE = 5000
+AUDIT_LOG_PURGE_PAUSE = 0.5
+
 # Configure OpenID Connect SSO by defining
 # identity providers below. An empty dict
 # disables OIC login.
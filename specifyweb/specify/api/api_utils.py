@@ -42,14 +42,19 @@ def objs_to_data_(
     """Return a collection structure with a list of the data of given objects
     and collection metadata.
     """
+    from specifyweb.specify.api.calculated_fields import batch_extra_fields
+
     offset, limit = int(offset), int(limit)
 
     if limit == 0:
-        objs = objs[offset:]
+        objs = list(objs[offset:])
     else:
-        objs = objs[offset:offset + limit]
+        objs = list(objs[offset:offset + limit])
+
+    with batch_extra_fields(objs):
+        objects = [mapper(o) for o in objs]
 
-    return {'objects': [mapper(o) for o in objs],
+    return {'objects': objects,
             'meta': {'limit': limit,
                      'offset': offset,
                      'total_count': total_count}}
\ No newline at end of file
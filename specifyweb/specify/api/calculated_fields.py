@@ -1,15 +1,22 @@
 import logging
 
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
 from typing import Dict, Any, List
 
-from django.db.models import Count, Sum, Value
-from django.db.models.functions import Coalesce
+from django.db.models import Count, F, Model, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from specifyweb.backend.cache.thread import ThreadCache
 
 # from . import models
 from specifyweb.specify.models import (
     Giftpreparation,
     Exchangeoutprep,
+    Exchangeinprep,
     Disposalpreparation,
+    Loanpreparation,
     Preparation,
     Disposal,
     Exchangeout,
@@ -24,6 +31,11 @@ from specifyweb.specify.models import (
 
 logger = logging.getLogger(__name__)
 
+# Extra fields computed by batch_extra_fields, by (model, id).
+_batched_extra_fields = ThreadCache[tuple[type, int], dict[str, Any]](
+    ContextVar("batched_extra_fields", default=None)
+)
+
 def calculate_totals_deaccession(obj, Model, related_field_name):
     total_preps = 0
     total_items = 0
@@ -40,7 +52,20 @@ def calc_prep_item_count(obj, prep_field_name, extra):
     extra["totalItems"] = model_preparations.aggregate(total=Sum("quantity"))["total"] or 0
     return extra
 
+def current_determination(data: dict[str, Any]) -> str | None:
+    dets = data["determinations"] or []
+    return next(
+        (det["resource_uri"] for det in dets if det["iscurrent"]), None
+    )
+
 def calculate_extra_fields(obj, data: dict[str, Any]) -> dict[str, Any]:
+    _, batched = _batched_extra_fields.get((obj.__class__, obj.id))
+    if batched:
+        extra = dict(batched)
+        if isinstance(obj, Collectionobject):
+            extra["currentdetermination"] = current_determination(data)
+        return extra
+
     extra: dict[str, Any] = {}
 
     if isinstance(obj, Preparation):
@@ -103,10 +128,7 @@ def calculate_extra_fields(obj, data: dict[str, Any]) -> dict[str, Any]:
         )
         extra["totalCountAmt"] = total_count_amount
 
-        dets = data["determinations"] or []
-        extra["currentdetermination"] = next(
-            (det["resource_uri"] for det in dets if det["iscurrent"]), None
-        )
+        extra["currentdetermination"] = current_determination(data)
 
         extra["isMemberOfCOG"] = Collectionobjectgroupjoin.objects.filter(childco=obj).exists()
 
@@ -186,3 +208,165 @@ def calculate_extra_fields(obj, data: dict[str, Any]) -> dict[str, Any]:
         extra["totalItems"] = total_items_disposals + total_items_exchangeouts + total_items_gifts
 
     return extra
+
+
+def _sums_by(queryset, key: str, ids, **aggregates) -> dict[int, dict[str, Any]]:
+    """Computes the aggregates over the rows of the queryset for each of the
+    given values of 'key' in one grouped query."""
+    rows = queryset.filter(**{f"{key}__in": ids}).values(key).annotate(**aggregates).order_by()
+    return {row.pop(key): row for row in rows}
+
+def _total(field) -> Coalesce:
+    return Coalesce(Sum(field), Value(0))
+
+def _positive_total(expression) -> Coalesce:
+    """The sum of the positive values of the expression, as summed by the
+    Preparation.ison* methods."""
+    return _total(Greatest(Coalesce(expression, Value(0)), Value(0)))
+
+def _preparation_quantities(key: str, ids) -> dict[str, dict[int, dict[str, Any]]]:
+    """The gift, exchange out and disposal quantities of preparations,
+    grouped by 'key'."""
+    return {
+        name: _sums_by(model.objects.all(), key, ids, total=_total("quantity"), positive=_positive_total(F("quantity")))
+        for name, model in (
+            ("gift", Giftpreparation),
+            ("exchangeout", Exchangeoutprep),
+            ("disposal", Disposalpreparation),
+        )
+    }
+
+def _actual_count(countamt, prep_id, quantities) -> int:
+    return max(
+        0,
+        (countamt or 0)
+        - quantities["gift"].get(prep_id, {}).get("total", 0)
+        - quantities["exchangeout"].get(prep_id, {}).get("total", 0)
+        - quantities["disposal"].get(prep_id, {}).get("total", 0),
+    )
+
+def _batch_preparations(preps) -> dict[int, dict[str, Any]]:
+    ids = [prep.id for prep in preps]
+    quantities = _preparation_quantities("preparation_id", ids)
+    on_loan = _sums_by(
+        Loanpreparation.objects.filter(isresolved=False), "preparation_id", ids,
+        positive=_positive_total(F("quantity") - F("quantityresolved")),
+    )
+    on_exchangein = _sums_by(
+        Exchangeinprep.objects.all(), "preparation_id", ids,
+        positive=_positive_total(F("quantity")),
+    )
+
+    def positive(sums, prep_id) -> bool:
+        return sums.get(prep_id, {}).get("positive", 0) > 0
+
+    return {
+        prep.id: {
+            "actualCountAmt": _actual_count(prep.countamt, prep.id, quantities),
+            "isonloan": positive(on_loan, prep.id),
+            "isongift": positive(quantities["gift"], prep.id),
+            "isondisposal": positive(quantities["disposal"], prep.id),
+            "isonexchangeout": positive(quantities["exchangeout"], prep.id),
+            "isonexchangein": positive(on_exchangein, prep.id),
+        }
+        for prep in preps
+    }
+
+def _batch_collectionobjects(cos) -> dict[int, dict[str, Any]]:
+    ids = [co.id for co in cos]
+    preps = list(Preparation.objects.filter(collectionobject_id__in=ids).values_list("id", "collectionobject_id", "countamt"))
+    prep_quantities = _preparation_quantities("preparation_id", [prep_id for prep_id, _, _ in preps])
+
+    extras: dict[int, dict[str, Any]] = {
+        co_id: {"actualTotalCountAmt": 0, "totalCountAmt": 0, "isMemberOfCOG": False}
+        for co_id in ids
+    }
+    for prep_id, co_id, countamt in preps:
+        extras[co_id]["actualTotalCountAmt"] += _actual_count(countamt, prep_id, prep_quantities)
+        extras[co_id]["totalCountAmt"] += countamt or 0
+    for co_id in Collectionobjectgroupjoin.objects.filter(childco_id__in=ids).values_list("childco_id", flat=True):
+        extras[co_id]["isMemberOfCOG"] = True
+    return extras
+
+def _batch_accessions(accessions) -> dict[int, dict[str, Any]]:
+    ids = [accession.id for accession in accessions]
+    key = "preparation__collectionobject__accession_id"
+    quantities = _preparation_quantities(key, ids)
+    preparations = _sums_by(
+        Preparation.objects.all(), "collectionobject__accession_id", ids,
+        count=Count("id"), total=_total("countamt"),
+    )
+    collectionobjects = _sums_by(Collectionobject.objects.all(), "accession_id", ids, count=Count("id"))
+
+    extras = {}
+    for accession_id in ids:
+        total = preparations.get(accession_id, {}).get("total", 0)
+        used = sum(quantities[name].get(accession_id, {}).get("total", 0) for name in quantities)
+        extras[accession_id] = {
+            "actualTotalCountAmt": int(total - used),
+            "totalCountAmt": int(total),
+            "preparationCount": preparations.get(accession_id, {}).get("count", 0),
+            "collectionObjectCount": collectionobjects.get(accession_id, {}).get("count", 0),
+        }
+    return extras
+
+def _prep_item_counts(queryset, key: str, ids) -> dict[int, dict[str, Any]]:
+    sums = _sums_by(queryset, key, ids, totalPreps=Count("id"), totalItems=_total("quantity"))
+    return {id: sums.get(id, {"totalPreps": 0, "totalItems": 0}) for id in ids}
+
+def _batch_deaccessions(deaccessions) -> dict[int, dict[str, Any]]:
+    ids = [deaccession.id for deaccession in deaccessions]
+    counts = [
+        _prep_item_counts(Disposalpreparation.objects.all(), "disposal__deaccession_id", ids),
+        _prep_item_counts(Exchangeoutprep.objects.all(), "exchangeout__deaccession_id", ids),
+        _prep_item_counts(Giftpreparation.objects.all(), "gift__deaccession_id", ids),
+    ]
+    return {
+        id: {
+            "totalPreps": sum(count[id]["totalPreps"] for count in counts),
+            "totalItems": sum(count[id]["totalItems"] for count in counts),
+        }
+        for id in ids
+    }
+
+BATCHED_EXTRA_FIELDS = {
+    Preparation: _batch_preparations,
+    Collectionobject: _batch_collectionobjects,
+    Accession: _batch_accessions,
+    Disposal: lambda objs: _prep_item_counts(Disposalpreparation.objects.all(), "disposal_id", [obj.id for obj in objs]),
+    Gift: lambda objs: _prep_item_counts(Giftpreparation.objects.all(), "gift_id", [obj.id for obj in objs]),
+    Exchangeout: lambda objs: _prep_item_counts(Exchangeoutprep.objects.all(), "exchangeout_id", [obj.id for obj in objs]),
+    Deaccession: _batch_deaccessions,
+}
+
+def _loaded_objects(objs) -> dict[type, list]:
+    """The given model instances and every instance loaded through their
+    related object and prefetch caches, by model. Anything other than a
+    model instance is skipped."""
+    found: dict[type, dict[int, Any]] = defaultdict(dict)
+    pending = list(objs)
+    while pending:
+        obj = pending.pop()
+        if not isinstance(obj, Model) or obj.pk is None or obj.pk in found[obj.__class__]:
+            continue
+        found[obj.__class__][obj.pk] = obj
+        pending.extend(obj._state.fields_cache.values())
+        for related in getattr(obj, "_prefetched_objects_cache", {}).values():
+            pending.extend(related)
+    return {model: list(by_id.values()) for model, by_id in found.items()}
+
+@contextmanager
+def batch_extra_fields(objs):
+    """Computes the extra fields of the given objects, and of the inlined
+    records loaded with them, with a few grouped queries per model rather
+    than several queries per object. calculate_extra_fields returns the
+    computed fields while the context is active.
+    """
+    with _batched_extra_fields.activate():
+        for model, model_objs in _loaded_objects(objs).items():
+            batch = BATCHED_EXTRA_FIELDS.get(model)
+            if batch is None:
+                continue
+            for id, extra in batch(model_objs).items():
+                _batched_extra_fields.set((model, id), extra)
+        yield
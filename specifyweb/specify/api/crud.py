@@ -14,7 +14,7 @@ from django.apps import apps
 from specifyweb.backend.permissions.permissions import check_field_permissions, check_table_permissions
 from specifyweb.backend.businessrules.exceptions import BusinessRuleException
 from specifyweb.backend.trees.utils import DISCIPLINE_TREE_MODELS
-from specifyweb.backend.workbench.upload.auditlog import auditlog
+from specifyweb.backend.workbench.upload.auditlog import auditlog, buffered_audit_log
 from specifyweb.specify import models
 from specifyweb.specify.api.api_utils import objs_to_data_, CollectionPayload
 from specifyweb.specify.utils.autonumbering import autonumber_and_save
@@ -31,7 +31,9 @@ logger = logging.getLogger(__name__)
 ReadPermChecker = Callable[[Any], None]
 
 def get_resource(name, id, checker: ReadPermChecker, recordsetid=None) -> dict:
-    from specifyweb.specify.api.serializers import _obj_to_data
+    from django.db.models import prefetch_related_objects
+    from specifyweb.specify.api.calculated_fields import batch_extra_fields
+    from specifyweb.specify.api.serializers import _obj_to_data, dependent_prefetch_lookups
 
     """Return a dict of the fields from row 'id' in model 'name'.
 
@@ -39,7 +41,9 @@ def get_resource(name, id, checker: ReadPermChecker, recordsetid=None) -> dict:
     data about the resource's relationship to the given record set.
     """
     obj = get_object_or_404(name, id=int(id))
-    data = _obj_to_data(obj, checker)
+    prefetch_related_objects([obj], *dependent_prefetch_lookups(obj.__class__))
+    with batch_extra_fields([obj]):
+        data = _obj_to_data(obj, checker)
     if recordsetid is not None:
         data['recordset_info'] = get_recordset_info(obj, recordsetid)
     return data
@@ -97,6 +101,7 @@ def create_obj(collection, agent, model, data: dict[str, Any], parent_obj=None,
 
 
 @transaction.atomic
+@buffered_audit_log()
 def post_resource(collection, agent, name: str, data, recordsetid: int | None=None):
     """Create a new resource in the database.
 
@@ -342,6 +347,7 @@ def prepare_discipline_for_delete(obj) -> None:
     delete_discipline_owned_setup_data(obj)
 
 @transaction.atomic
+@buffered_audit_log()
 def put_resource(collection, agent, name: str, id, version, data: dict[str, Any]):
     return update_obj(collection, agent, name, id, version, data)
 
@@ -455,6 +461,7 @@ def _handle_special_update_priors(obj, data):
     return data
 
 @transaction.atomic
+@buffered_audit_log()
 def delete_resource(collection, agent, name, id, version) -> None:
     """Delete the resource with 'id' and model named 'name' with optimistic
     locking 'version'.
@@ -478,12 +485,15 @@ def delete_resource(collection, agent, name, id, version) -> None:
     )
 
 def get_collection(logged_in_collection, model, checker: ReadPermChecker, control_params=GetCollectionForm.defaults, params={}) -> CollectionPayload:
-    from specifyweb.specify.api.serializers import _obj_to_data
+    from specifyweb.specify.api.serializers import _obj_to_data, dependent_prefetch_lookups
     
     """Return a list of structured data for the objects from 'model'
     subject to the request 'params'."""
 
     objs = apply_filters(logged_in_collection, params, model, control_params)
+    # Load the inlined records of the whole page together rather than
+    # separately for each object.
+    objs = objs.prefetch_related(*dependent_prefetch_lookups(objs.model, logged_in_collection))
 
     try:
         return objs_to_data_(objs, objs.count(), lambda o: _obj_to_data(o, checker), control_params['offset'], control_params['limit'])
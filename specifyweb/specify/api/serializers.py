@@ -1,9 +1,10 @@
 import json
+from functools import lru_cache
 from typing import Any
 from specifyweb.specify import models
 from specifyweb.specify.api.calculated_fields import calculate_extra_fields
 from specifyweb.specify.api.crud import ReadPermChecker
-from specifyweb.specify.models_utils.relationships import is_dependent_field
+from specifyweb.specify.models_utils.relationships import is_dependent_field, is_dependent_field_collection
 from sqlalchemy.engine import Row
 from django.db.models.fields import DateTimeField
 from urllib.parse import urlencode
@@ -119,6 +120,83 @@ def field_to_val(obj, field, checker: ReadPermChecker) -> Any:
         return getattr(obj, field.name, None)
     
 
+# How many levels of inlined relationships dependent_prefetch_lookups plans
+# for. Anything deeper is loaded per object as before.
+PREFETCH_MAX_DEPTH = 5
+
+# The relationships is_dependent_field follows to decide whether a
+# collecting event or paleo context is embedded in the object.
+EMBEDDING_DOMAIN_LOOKUPS = {
+    models.Collectionobject: ('collection__discipline',),
+    models.Collectingevent: ('discipline',),
+    models.Locality: ('discipline',),
+}
+
+@lru_cache(maxsize=None)
+def _serialized_relations(model) -> tuple[tuple[str, Any, bool], ...]:
+    """The relationships of the model that _obj_to_data loads, as
+    (name, related model, inlined) triples.
+
+    Dependent relationships are inlined. A reverse one-to-one is loaded
+    just for the id of the related object, as there is no FK column to
+    read it from.
+    """
+    relations = []
+    for field in model._meta.get_fields():
+        if field.one_to_many:
+            name = field.get_accessor_name()
+        elif field.many_to_one or field.one_to_one:
+            name = field.name
+        else:
+            continue
+        specify_field = model.specify_model.get_field(name)
+        if specify_field is None:
+            continue
+        if specify_field.dependent:
+            relations.append((name, field.related_model, True))
+        elif field.one_to_one and not field.concrete:
+            relations.append((name, field.related_model, False))
+    return tuple(relations)
+
+def _embedded_relations(model, collection) -> tuple[tuple[str, Any, bool], ...]:
+    """The collecting event or paleo context relationships of the model
+    that are embedded in the collection."""
+    if collection is None or model not in EMBEDDING_DOMAIN_LOOKUPS:
+        return ()
+    return tuple(
+        (name, model._meta.get_field(name).related_model, True)
+        for name in ('collectingevent', 'paleocontext')
+        if model.specify_model.get_field(name) is not None
+        and not model.specify_model.get_field(name).dependent
+        and is_dependent_field_collection(collection, model, name)
+    )
+
+def dependent_prefetch_lookups(model, collection=None) -> list[str]:
+    """Return the prefetch_related lookups for the relationships
+    _obj_to_data loads when serializing objects of 'model', so each
+    relationship is fetched for a whole page of objects in one query
+    instead of once per object.
+
+    If a collection is given, the collecting events and paleo contexts
+    embedded in it are planned for as well.
+    """
+    lookups: dict[str, None] = {}
+
+    def plan(model, prefix: str, depth: int, seen: frozenset) -> None:
+        for lookup in EMBEDDING_DOMAIN_LOOKUPS.get(model, ()):
+            lookups[prefix + lookup] = None
+        if depth >= PREFETCH_MAX_DEPTH:
+            return
+        for name, related_model, inlined in _serialized_relations(model) + _embedded_relations(model, collection):
+            if related_model in seen:
+                continue
+            lookups[prefix + name] = None
+            if inlined:
+                plan(related_model, prefix + name + '__', depth + 1, seen | {related_model})
+
+    plan(model, '', 0, frozenset([model]))
+    return list(lookups)
+
 def uri_for_model(model, id=None) -> str:
     """Given a Django model and optionally an id, return a URI
     for the collection or resource (if an id is given).
@@ -0,0 +1,210 @@
+import time
+from contextlib import ExitStack, contextmanager
+from unittest.mock import patch
+
+from django.core.management.base import BaseCommand
+
+from specifyweb.specify.datamodel import datamodel
+from specifyweb.specify.models import Collection, Agent
+from specifyweb.specify.models_utils.load_datamodel import (
+    Datamodel,
+    DoesNotExistError,
+    FieldDoesNotExistError,
+    Table,
+    TableDoesNotExistError,
+)
+
+# Lookups in the proportions serialization, query building and WorkBench
+# parsing make them: mostly fields of a few common tables.
+LOOKUPS = [
+    ('CollectionObject', 'catalogNumber'),
+    ('collectionobject', 'determinations'),
+    ('Determination', 'taxon'),
+    ('taxon', 'fullName'),
+    ('Agent', 'lastName'),
+    ('locality', 'localityName'),
+    ('CollectingEvent', 'locality'),
+    ('preparation', 'prepType'),
+    ('Accession', 'accessionNumber'),
+    ('spauditlogfield', 'newValue'),
+]
+
+QUERY_FIELDS = [
+    ('1.collectionobject.catalogNumber', False),
+    ('1,9-determinations,4.taxon.fullName', False),
+    ('1,9-determinations,4.taxon.Genus', False),
+    ('1,10,2.locality.localityName', False),
+    ('1,10,2,3.geography.Country', False),
+    ('1,5-cataloger.agent.lastName', False),
+    ('1,63-preparations,65.preptype.name', False),
+]
+
+
+# The lookups as they were before the datamodel was indexed, for comparison.
+
+def _linear_get_table_strict(self, tablename):
+    tablename = tablename.lower()
+    for table in self.tables:
+        if table.name.lower() == tablename:
+            return table
+    raise TableDoesNotExistError(f"No table with name: {tablename!r}")
+
+def _linear_get_table_by_id_strict(self, table_id, strict=False):
+    for table in self.tables:
+        if table.tableId == table_id:
+            return table
+    raise TableDoesNotExistError(f"No table with id: {table_id}")
+
+def _linear_reverse_relationship(self, relationship):
+    if relationship.relatedModelName is None or relationship.otherSideName is None:
+        return None
+    return self.get_table_strict(relationship.relatedModelName) \
+        .get_relationship(relationship.otherSideName)
+
+def _linear_get_field_strict(self, fieldname):
+    fieldname = fieldname.lower()
+    if self.all_fields:
+        for field in self.all_fields:
+            if fieldname and field.name and field.name.lower() == fieldname:
+                return field
+    for field in self.virtual_fields:
+        if fieldname and field.name and field.name.lower() == fieldname:
+            return field
+    raise FieldDoesNotExistError(f"Field {fieldname} not in table {self.name}.")
+
+@contextmanager
+def linear_lookups():
+    with ExitStack() as stack:
+        stack.enter_context(patch.object(Datamodel, 'get_table_strict', _linear_get_table_strict))
+        stack.enter_context(patch.object(Datamodel, 'get_table_by_id_strict', _linear_get_table_by_id_strict))
+        stack.enter_context(patch.object(Datamodel, 'reverse_relationship', _linear_reverse_relationship))
+        stack.enter_context(patch.object(Table, 'get_field_strict', _linear_get_field_strict))
+        yield
+
+
+def query_fields_json():
+    return [
+        dict(
+            position=position,
+            stringid=stringid,
+            isrelfld=is_relation,
+            operstart=8,
+            startvalue='',
+            isnot=False,
+            isdisplay=True,
+            sorttype=0,
+            formatname=None,
+            isstrict=False,
+        )
+        for position, (stringid, is_relation) in enumerate(QUERY_FIELDS)
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        'Time datamodel table, field and reverse relationship lookups with '
+        'the indexes and with linear scans. Given a collection and agent, '
+        'also time building a Collection Object query and validating a '
+        'synthetic WorkBench data set both ways. Nothing is committed to '
+        'the database.'
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('--lookups', type=int, default=100000)
+        parser.add_argument('--collection-id', type=int, default=None)
+        parser.add_argument('--agent-id', type=int, default=None)
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--rows', type=int, default=500)
+
+    def handle(self, *args, **options) -> None:
+        def compare(label, fn):
+            timings = {}
+            for mode in ('linear', 'indexed'):
+                with linear_lookups() if mode == 'linear' else ExitStack():
+                    fn()  # Warms up the indexes and caches.
+                    tic = time.perf_counter()
+                    count = fn()
+                    timings[mode] = time.perf_counter() - tic
+            self.stdout.write(
+                f"{label}: linear {1e6 * timings['linear'] / count:.2f} us/op, "
+                f"indexed {1e6 * timings['indexed'] / count:.2f} us/op, "
+                f"{timings['linear'] / timings['indexed']:.1f}x"
+            )
+
+        n_lookups = options['lookups']
+
+        def table_lookups():
+            for i in range(n_lookups):
+                datamodel.get_table_strict(LOOKUPS[i % len(LOOKUPS)][0])
+            return n_lookups
+
+        table_ids = [datamodel.get_table_strict(name).tableId for name, _ in LOOKUPS]
+
+        def table_id_lookups():
+            for i in range(n_lookups):
+                datamodel.get_table_by_id_strict(table_ids[i % len(table_ids)])
+            return n_lookups
+
+        tables = [(datamodel.get_table_strict(name), field) for name, field in LOOKUPS]
+
+        def field_lookups():
+            for i in range(n_lookups):
+                table, field = tables[i % len(tables)]
+                table.get_field_strict(field)
+            return n_lookups
+
+        relationships = []
+        for table in datamodel.tables:
+            for relationship in table.relationships:
+                try:
+                    if datamodel.reverse_relationship(relationship) is not None:
+                        relationships.append(relationship)
+                except DoesNotExistError:
+                    pass
+
+        def reverse_lookups():
+            for i in range(n_lookups):
+                datamodel.reverse_relationship(relationships[i % len(relationships)])
+            return n_lookups
+
+        compare('table by name', table_lookups)
+        compare('table by id', table_id_lookups)
+        compare('field by name', field_lookups)
+        compare('reverse relationship', reverse_lookups)
+
+        if options['collection_id'] is None or options['agent_id'] is None:
+            return
+
+        collection = Collection.objects.get(id=options['collection_id'])
+        agent = Agent.objects.get(id=options['agent_id'])
+        compare('query build', lambda: self.build_queries(collection, agent, options['queries']))
+        compare('upload row', lambda: self.validate_rows(collection, agent, options['rows']))
+
+    def build_queries(self, collection, agent, n_queries: int) -> int:
+        from specifyweb.backend.stored_queries import models
+        from specifyweb.backend.stored_queries.execution import build_query
+        from specifyweb.backend.stored_queries.queryfield import fields_from_json
+
+        with models.session_context() as session:
+            for _ in range(n_queries):
+                field_specs = fields_from_json(query_fields_json())
+                build_query(session, collection, agent.specifyuser, 1, field_specs)
+        return n_queries
+
+    def validate_rows(self, collection, agent, n_rows: int) -> int:
+        from specifyweb.backend.workbench.management.commands.benchmark_upload import (
+            BENCHMARK_PLAN,
+            synthetic_rows,
+        )
+        from specifyweb.backend.workbench.upload.upload import do_upload
+        from specifyweb.backend.workbench.upload.upload_plan_schema import parse_plan
+
+        do_upload(
+            collection,
+            list(synthetic_rows(n_rows)),
+            parse_plan(BENCHMARK_PLAN),
+            agent.id,
+            no_commit=True,
+            allow_partial=True,
+        )
+        return n_rows
@@ -1,6 +1,6 @@
-from typing import Union, Optional, TypeVar, cast, Literal
+from typing import Union, Optional, TypeVar, cast, Literal, NamedTuple
 from collections.abc import Callable
-from collections.abc import Iterable
+from collections.abc import Iterable, Mapping
 import warnings
 import logging
 
@@ -35,20 +35,51 @@ def strict_to_optional(f: Callable[[U], T], lookup: U, strict: bool) -> T | None
         raise
 
 
+class TableIndexes(NamedTuple):
+    size: int
+    by_name: Mapping[str, "Table"]
+    by_id: Mapping[int, "Table"]
+    by_classname: Mapping[str, "Table"]
+
+
+def _first_by_key(items: Iterable[T], key: Callable[[T], U]) -> Mapping[U, T]:
+    index: dict[U, T] = {}
+    for item in items:
+        index.setdefault(key(item), item)
+    return index
+
+
 class Datamodel:
     tables: list["Table"]
 
     def __init__(self, tables: list["Table"] = []):
         self.tables = tables
+        self._indexes: TableIndexes | None = None
+        self._reverse_relationships: dict[tuple["Relationship", str, str], "Relationship"] = {}
+
+    @property
+    def table_indexes(self) -> TableIndexes:
+        """Case insensitive lookups of the tables, built on first use. The
+        datamodel is static, but tables appended to it afterwards are still
+        found, as the indexes are rebuilt when the number of tables changes.
+        """
+        if self._indexes is None or self._indexes.size != len(self.tables):
+            self._indexes = TableIndexes(
+                size=len(self.tables),
+                by_name=_first_by_key(self.tables, lambda table: table.name.lower()),
+                by_id=_first_by_key(self.tables, lambda table: table.tableId),
+                by_classname=_first_by_key(self.tables, lambda table: table.classname.lower()),
+            )
+        return self._indexes
 
     def get_table(self, tablename: str, strict: bool = False) -> Optional["Table"]:
         return strict_to_optional(self.get_table_strict, tablename, strict)
 
     def get_table_strict(self, tablename: str) -> "Table":
         tablename = tablename.lower()
-        for table in self.tables:
-            if table.name.lower() == tablename:
-                return table
+        table = self.table_indexes.by_name.get(tablename)
+        if table is not None:
+            return table
         raise TableDoesNotExistError(
             _("No table with name: %(table_name)r") % {"table_name": tablename}
         )
@@ -57,21 +88,37 @@ class Datamodel:
         return strict_to_optional(self.get_table_by_id_strict, table_id, strict)
 
     def get_table_by_id_strict(self, table_id: int, strict: bool = False) -> "Table":
-        for table in self.tables:
-            if table.tableId == table_id:
-                return table
+        table = self.table_indexes.by_id.get(table_id)
+        if table is not None:
+            return table
         raise TableDoesNotExistError(
             _("No table with id: %(table_id)d") % {"table_id": table_id}
         )
 
+    def get_table_by_classname(self, classname: str, strict: bool = False) -> Optional["Table"]:
+        return strict_to_optional(self.get_table_by_classname_strict, classname, strict)
+
+    def get_table_by_classname_strict(self, classname: str) -> "Table":
+        table = self.table_indexes.by_classname.get(classname.lower())
+        if table is not None:
+            return table
+        raise TableDoesNotExistError(
+            _("No table with class name: %(classname)r") % {"classname": classname}
+        )
+
     def reverse_relationship(
         self, relationship: "Relationship"
     ) -> Optional["Relationship"]:
         if relationship.relatedModelName is None or relationship.otherSideName is None:
             return None
-        return self.get_table_strict(relationship.relatedModelName).get_relationship(
-            cast(str, relationship.otherSideName)
-        )
+        key = (relationship, relationship.relatedModelName, relationship.otherSideName)
+        reverse = self._reverse_relationships.get(key)
+        if reverse is None:
+            reverse = self.get_table_strict(relationship.relatedModelName).get_relationship(
+                cast(str, relationship.otherSideName)
+            )
+            self._reverse_relationships[key] = reverse
+        return reverse
 
 
 class Table:
@@ -139,6 +186,8 @@ class Table:
         self.sp7_only = sp7_only
         self.django_app = django_app
         self.virtual_fields = virtual_fields if virtual_fields is not None else []
+        self._field_index: Mapping[str, Union["Field", "Relationship"]] | None = None
+        self._field_index_key: tuple | None = None
 
     @property
     def name(self) -> str:
@@ -171,6 +220,21 @@ class Table:
         return list(self._all_fields())
 
 
+    @property
+    def field_index(self) -> Mapping[str, Union["Field", "Relationship"]]:
+        """The fields, relationships, id field and virtual fields of the
+        table by lower case name, taking them in that order if names clash.
+        Rebuilt when fields are added to or removed from the table.
+        """
+        key = (len(self.fields), len(self.relationships), len(self.virtual_fields), self.idField)
+        if self._field_index is None or self._field_index_key != key:
+            self._field_index = _first_by_key(
+                (field for field in (*self._all_fields(), *self.virtual_fields) if field.name),
+                lambda field: field.name.lower(),
+            )
+            self._field_index_key = key
+        return self._field_index
+
     def is_virtual_field(self, fieldname: str) -> bool:
         return fieldname in [f.name for f in self.virtual_fields] if self.virtual_fields else False
    
@@ -179,14 +243,9 @@ class Table:
 
     def get_field_strict(self, fieldname: str) -> Union["Field", "Relationship"]:
         fieldname = fieldname.lower()
-        if self.all_fields:
-            for field in self.all_fields:
-                if fieldname and field.name and field.name.lower() == fieldname:
-                    return field
-        if self.virtual_fields:
-            for field in self.virtual_fields:
-                if fieldname and field.name and field.name.lower() == fieldname:
-                    return field
+        field = self.field_index.get(fieldname)
+        if field is not None:
+            return field
         # if self.table == 'collectionobject' and fieldname == 'age': # TODO: This is temporary for testing, more conprehensive solution to come.
         #     return Field(name='age', column='age', indexed=False, unique=False, required=False, type='java.lang.Integer', length=0)
         raise FieldDoesNotExistError(_("Field %(field_name)s not in table %(table_name)s. ") % {'field_name':fieldname, 'table_name':self.name} +
@@ -4,9 +4,12 @@ Tests for py
 
 import json
 from unittest import skip
+from unittest.mock import patch
 from datetime import datetime
 from django.db.models import Max, QuerySet
+from django.db import connection
 from django.test import TestCase, Client, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
 
 from specifyweb.backend.permissions.models import UserPolicy
 from specifyweb.specify import models
@@ -15,6 +18,7 @@ from specifyweb.backend.businessrules.rules.cogtype_rules import SYSTEM_COGTYPES
 from specifyweb.backend.businessrules.orm_signal_handler import connect_signal, disconnect_signal
 from specifyweb.specify.api.crud import create_obj, delete_resource, get_collection, get_resource, post_resource, update_obj
 from specifyweb.specify.api.exceptions import MissingVersionException, RecordSetException, StaleObjectException
+from specifyweb.specify.api.validators import GetCollectionForm
 from specifyweb.specify.models_utils.model_extras import Specifyuser
 from specifyweb.specify.models import (
     Institution,
@@ -44,7 +48,7 @@ from specifyweb.specify.models import (
 import datetime
 
 from specifyweb.specify.models_utils.relationships import get_recordset_info, get_related_or_none
-from specifyweb.specify.api.serializers import obj_to_data, uri_for_model
+from specifyweb.specify.api.serializers import dependent_prefetch_lookups, obj_to_data, uri_for_model
 from specifyweb.specify.utils import scoping
 
 def get_table(name: str):
@@ -873,6 +877,62 @@ class InlineApiTests(ApiTests):
 
         self.assertFalse(models.Collectionobject.objects.filter(catalognumber=redundant_catalog_number).exists())
 
+class PrefetchPlanTests(ApiTests):
+    def test_plan_follows_dependent_relationships(self):
+        lookups = dependent_prefetch_lookups(models.Collectionobject)
+        self.assertIn("determinations", lookups)
+        self.assertIn("determinations__determinationcitations", lookups)
+        self.assertIn("preparations__preparationattachments", lookups)
+        self.assertIn("collectionobjectattribute", lookups)
+        self.assertIn("collection__discipline", lookups)
+        self.assertNotIn("cataloger", lookups)
+        self.assertNotIn("collectingevent", lookups)
+
+    def test_plan_includes_embedded_collecting_event(self):
+        self.collection.isembeddedcollectingevent = True
+        self.collection.save()
+        lookups = dependent_prefetch_lookups(models.Collectionobject, self.collection)
+        self.assertIn("collectingevent", lookups)
+        self.assertIn("collectingevent__collectors", lookups)
+        self.assertIn("collectingevent__discipline", lookups)
+
+    def _count_queries(self, limit):
+        control_params = {**GetCollectionForm.defaults, "limit": limit}
+        # Calculated fields query per object on their own.
+        with patch("specifyweb.specify.api.serializers.calculate_extra_fields", return_value={}), \
+                CaptureQueriesContext(connection) as queries:
+            data = get_collection(self.collection, "collectionobject", skip_perms_check, control_params)
+        self.assertEqual(len(data["objects"]), limit)
+        return len(queries)
+
+    def test_collection_queries_do_not_grow_with_page_size(self):
+        preptype = Preptype.objects.create(collection=self.collection)
+        for co in self.collectionobjects:
+            for i in range(2):
+                co.determinations.create(iscurrent=False, number1=i)
+                co.preparations.create(collectionmemberid=self.collection.id, preptype=preptype)
+
+        self.assertEqual(
+            self._count_queries(1),
+            self._count_queries(len(self.collectionobjects)),
+        )
+
+    def test_get_resource_queries_do_not_grow_with_inlined_records(self):
+        co = self.collectionobjects[0]
+        preptype = Preptype.objects.create(collection=self.collection)
+
+        def count_queries():
+            with patch("specifyweb.specify.api.serializers.calculate_extra_fields", return_value={}), \
+                    CaptureQueriesContext(connection) as queries:
+                get_resource("collectionobject", co.id, skip_perms_check)
+            return len(queries)
+
+        co.preparations.create(collectionmemberid=self.collection.id, preptype=preptype)
+        with_one = count_queries()
+        for _ in range(4):
+            co.preparations.create(collectionmemberid=self.collection.id, preptype=preptype)
+        self.assertEqual(with_one, count_queries())
+
 class InlineApiRemoteToOneTests(ApiTests): 
     def setUp(self): 
         super().setUp()
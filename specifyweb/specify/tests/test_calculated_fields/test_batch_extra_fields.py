@@ -0,0 +1,71 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from specifyweb.specify.api.calculated_fields import (
+    batch_extra_fields,
+    calculate_extra_fields,
+)
+from specifyweb.specify.api.crud import get_collection
+from specifyweb.specify.api.validators import GetCollectionForm
+from specifyweb.specify.models import Accession, Deaccession, Disposalpreparation
+from specifyweb.specify.tests.test_calculated_fields.test_calculate_extra_fields import (
+    TestPrepsAvailableDefaults,
+)
+
+
+class TestBatchExtraFields(TestPrepsAvailableDefaults):
+
+    def assertBatchMatches(self, objs, data=lambda obj: {}):
+        expected = [calculate_extra_fields(obj, data(obj)) for obj in objs]
+        with batch_extra_fields(objs):
+            with self.assertNumQueries(0):
+                batched = [calculate_extra_fields(obj, data(obj)) for obj in objs]
+        self.assertEqual(batched, expected)
+
+    def test_preparations(self):
+        self._preps_available_interacted()
+        self.assertBatchMatches(self._prep_list)
+
+    def test_collection_objects(self):
+        self._preps_available_interacted()
+        self.assertBatchMatches(
+            self.collectionobjects, lambda obj: dict(determinations=[])
+        )
+
+    def test_accessions(self):
+        with_preps = Accession.objects.create(division_id=self.division.id)
+        empty = Accession.objects.create(division_id=self.division.id)
+
+        self._preps_available_interacted()
+        for co in self.collectionobjects[:3]:
+            self._update(co, dict(accession=with_preps))
+
+        self.assertBatchMatches([with_preps, empty])
+
+    def test_interactions(self):
+        deaccession = Deaccession.objects.create()
+        prep = self._create_prep(self.collectionobjects[0], None, countamt=5)
+        Disposalpreparation.objects.create(
+            preparation=prep, quantity=2, disposal=self.disposal
+        )
+        self._update(self.disposal, dict(deaccession=deaccession))
+        self._update(self.gift, dict(deaccession=deaccession))
+        self._preps_available_interacted()
+
+        self.assertBatchMatches(
+            [self.gift, self.exchangeout, self.disposal, deaccession, Deaccession.objects.create()]
+        )
+
+    def test_listing_queries_do_not_grow_with_page_size(self):
+        self._preps_available_interacted()
+
+        def count_queries(limit):
+            control_params = {**GetCollectionForm.defaults, "limit": limit}
+            with CaptureQueriesContext(connection) as queries:
+                data = get_collection(
+                    self.collection, "preparation", lambda obj: None, control_params
+                )
+            self.assertEqual(len(data["objects"]), limit)
+            return len(queries)
+
+        self.assertEqual(count_queries(1), count_queries(len(self._prep_list)))
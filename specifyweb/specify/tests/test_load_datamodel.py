@@ -1,5 +1,6 @@
 from django.test import TestCase
 from specifyweb.specify.datamodel import datamodel
+from specifyweb.specify.models_utils.load_datamodel import FieldDoesNotExistError, Relationship, TableDoesNotExistError
 from specifyweb.specify.models_utils.sp7_build_models import build_model_code, generate_build_model_functions_code, \
     generate_build_model_imports_code
 
@@ -28,3 +29,48 @@ for table in datamodel.tables:
         setattr(DatamodelTests,
                 'test_attachments_field_dependent_in_' + table.name,
                 make_attachments_field_dependent_test(table))
+
+
+class DatamodelIndexTests(TestCase):
+
+    def test_tables_are_found_case_insensitively(self):
+        for table in datamodel.tables:
+            self.assertIs(datamodel.get_table_strict(table.name.upper()), table)
+            self.assertIs(datamodel.get_table_by_id_strict(table.tableId), table)
+            self.assertIs(datamodel.get_table_by_classname_strict(table.classname.lower()), table)
+        with self.assertRaises(TableDoesNotExistError):
+            datamodel.get_table_strict('notatable')
+        self.assertIsNone(datamodel.get_table_by_id(-1))
+
+    def test_fields_are_found_case_insensitively(self):
+        for table in datamodel.tables:
+            for field in [*table.all_fields, *table.virtual_fields]:
+                self.assertEqual(
+                    table.get_field_strict(field.name.upper()).name.lower(),
+                    field.name.lower(),
+                )
+        with self.assertRaises(FieldDoesNotExistError):
+            datamodel.get_table_strict('collectionobject').get_field_strict('notafield')
+
+    def test_added_relationship_is_found(self):
+        locality = datamodel.get_table_strict('locality')
+        locality.get_field('localityname')
+        relationship = Relationship(
+            name='benchmarkEvents',
+            type='one-to-many',
+            required=False,
+            relatedModelName='CollectingEvent',
+            otherSideName='locality',
+        )
+        locality.relationships.append(relationship)
+        try:
+            self.assertIs(locality.get_relationship('BenchmarkEvents'), relationship)
+        finally:
+            locality.relationships.remove(relationship)
+        self.assertIsNone(locality.get_field('benchmarkevents'))
+
+    def test_reverse_relationship(self):
+        determinations = datamodel.get_table_strict('collectionobject').get_relationship('determinations')
+        reverse = datamodel.reverse_relationship(determinations)
+        self.assertIs(reverse, datamodel.get_table_strict('determination').get_relationship('collectionobject'))
+        self.assertIs(datamodel.reverse_relationship(determinations), reverse)